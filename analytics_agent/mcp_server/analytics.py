@@ -1,38 +1,42 @@
-import asyncio
-import json
 import os
+import sys
 import logging
 
-import mcp.server.stdio
-
 from pathlib import Path
 
-from google.adk.tools.function_tool import FunctionTool
-from google.adk.tools.mcp_tool.conversion_utils import adk_to_mcp_tool_type
-from mcp import types as mcp_types
-from mcp.server.lowlevel import NotificationOptions, Server
-from mcp.server.models import InitializationOptions
-from google.cloud import bigquery
-
 from dotenv import load_dotenv
 
-from chain import convert_natural_language_to_sql
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.bq_cache import BigQueryResultCache
+from common.bq_guard import QueryBudgetExceeded, QueryGuard
+from common.bq_results import InvalidContinuationToken, ResultPager
+from common.executor import ToolPolicy
+from common.lazy import LazyObject, WarmUp
+from common.log_pipeline import configure_logging
+from common.local_backend import DuckDBBackend
+from common.tool_server import SCHEMA_CACHE_FILE, ToolServer
+
+from chain import convert_natural_language_to_sql, model, schema_catalog
+from rollups import ROLLUPS, RollupRouter, refresh_rollup
 
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str((Path(__file__).parent / "credentials" / "credentials.json").resolve())
 LOG_FILE_PATH = os.path.join(os.path.dirname(__file__), "mcp_server_activity.log")
 
 load_dotenv()
 
-logging.basicConfig(
-  level=logging.DEBUG,
-  format="%(asctime)s - %(levelname)s -[%(filename)s:%(lineno)d] - %(message)s",
-  handlers=[
-    logging.FileHandler(LOG_FILE_PATH, mode="a")
-  ] 
-)
+configure_logging(LOG_FILE_PATH)
+
+def new_bigquery_client():
+    from google.cloud import bigquery
+    return bigquery.Client()
 
-app = Server("analytics_server")
-client = bigquery.Client()
+client = LazyObject(new_bigquery_client, "bigquery.Client")
+schema_catalog.sync_with(client)
+query_guard = QueryGuard(client)
+result_cache = BigQueryResultCache(client, guard=query_guard)
+result_pager = ResultPager(result_cache, local_backend=DuckDBBackend())
+rollup_router = RollupRouter(ROLLUPS, table_modified=result_cache.table_modified)
+warm_up = WarmUp([client.get, model.get, schema_catalog.ensure_synced])
 
 def convert_to_sql(user_input: str) -> str:
     """Gera uma query SQL que busca a resposta para o problema de negócio questionado pelo usuário.
@@ -48,18 +52,36 @@ def convert_to_sql(user_input: str) -> str:
     return sql
 
 def query_to_bq(query: str) -> str:
-    """Executa a query SQL no BigQuery e retorna o resultado.
+    """Valida o custo da query SQL com um dry run, executa-a no BigQuery e retorna a primeira página do resultado, em markdown ou CSV.
 
     Args:
     query(str): Query SQL a ser executada.
 
     Returns:
-    str: Resultado da execução da query.
+    str: Primeira página do resultado da query e, se houver mais linhas, o token para buscar as próximas.
     """
-    query_job = client.query(query)
-    rows = list(query_job.result())
-    logging.info(f"Resultado da busca no BQ: {str(rows)}")
-    return str(rows)
+    try:
+        result = result_pager.first_page(query_guard.apply_limit(query))
+    except QueryBudgetExceeded as e:
+        logging.warning(f"Query recusada pelo limite de custo: {e}")
+        return str(e)
+    logging.info(f"Resultado da busca no BQ: {result}")
+    return result
+
+def fetch_more_results(continuation_token: str) -> str:
+    """Busca a próxima página do resultado de uma consulta anterior, sem executar a query novamente.
+
+    Args:
+    continuation_token(str): Token de continuação retornado junto da página anterior.
+
+    Returns:
+    str: A próxima página do resultado e, se ainda houver linhas, um novo token de continuação.
+    """
+    try:
+        return result_pager.next_page(continuation_token)
+    except InvalidContinuationToken as e:
+        logging.error(f"Erro ao buscar mais resultados: {e}")
+        return str(e)
 
 def get_analysis(user_input: str) -> str:
     """Executa a cadeia de comandos para gerar uma query SQL e executá-la no BigQuery, retornando o resultado da busca.
@@ -70,82 +92,41 @@ def get_analysis(user_input: str) -> str:
     Returns:
     str: Resultado da execução da query (uma tabela de dados em formato str).
     """
-    query = convert_to_sql(user_input)
+    query = rollup_router.route(convert_to_sql(user_input))
     result = query_to_bq(query)
     return result
 
-ADK_ANALYTICS_TOOLS = {
-    "get_analysis": FunctionTool(func=get_analysis)
-}
-
-@app.list_tools()
-async def list_mcp_tools() -> list[mcp_types.Tool]:
-    """MCP handler que lista as tools que este server expõe."""
-    logging.info("MCP Server: Iniciou a listagem de tools.")
-    mcp_tools_list = []
-    for tool_name, adk_tool_instance in ADK_ANALYTICS_TOOLS.items():
-        if not adk_tool_instance.name:
-            adk_tool_instance.name = tool_name
-        
-        mcp_tools_schema = adk_to_mcp_tool_type(adk_tool_instance)
-        mcp_tools_list.append(mcp_tools_schema)
-    return mcp_tools_list
-
-@app.call_tool()
-async def call_mcp_tool(name: str, arguments: dict) -> list[mcp_types.TextContent]:
-    """MCP handler para executar a chamada da tool solicitada pelo MCP client."""
-    logging.info(f"MCP Server: Iniciou a chamada da tool {name} com os args: {arguments}")
-
-    if name in ADK_ANALYTICS_TOOLS:
-        adk_tool_instance = ADK_ANALYTICS_TOOLS[name]
-        try:
-            adk_tool_response = await adk_tool_instance.run_async(
-               args=arguments,
-               tool_context=None
-            )
-            logging.info(f"MCP Server: Tool {name} executada. Resposta: {adk_tool_response}")
-            response_text = json.dumps(adk_tool_response, indent=2)
-            return [mcp_types.TextContent(type="text", text=response_text)]
-        except Exception as e:
-            logging.error(f"MCP Server: Erro ao executar tool {name}. Resposta: {e}")
-            payload = {
-                "success": False,
-                "message": f"Falha ao executar tool '{name}': {str(e)}"
-            }
-            error_text = json.dumps(payload)
-            return [mcp_types.TextContent(type="text", text=error_text)]
-    else:
-        logging.error(f"MCP Server: Erro ao executar tool. Tool não implementada.")
-        payload = {
-        "success": False,
-        "message": f"Tool não implementada neste servidor."
-        }
-        error_text = json.dumps(payload)
-        return [mcp_types.TextContent(type="text", text=error_text)]
-
-async def run_mcp_stdio_server():
-    """Executa o MCP server, trabalhando no stdio"""
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name=app.name,
-                server_version="0.1.0",
-                capabilities=app.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={}
-                )
-            )
-        )
+def refresh_rollups(full_refresh: bool) -> str:
+    """Atualiza as agregações pré-calculadas (rollups) da tabela fato, usadas para responder às análises mais comuns. Deve ser executada após cada carga da ETL.
+
+    Args:
+    full_refresh(bool): Se True, recria os rollups por completo; caso contrário, recalcula apenas o último período já agregado e os seguintes.
 
+    Returns:
+    str: O resultado da atualização de cada rollup.
+    """
+    try:
+        return "\n".join(refresh_rollup(client, rollup, full_refresh) for rollup in ROLLUPS)
+    except Exception as e:
+        logging.error(f"Erro ao atualizar os rollups: {e}")
+        return f"Ocorreu um erro ao atualizar os rollups: {e}"
+
+server = ToolServer(
+    "analytics_server",
+    tools={
+        "get_analysis": get_analysis,
+        "fetch_more_results": fetch_more_results,
+        "refresh_rollups": refresh_rollups
+    },
+    policies={
+        "get_analysis": ToolPolicy(max_concurrency=8),
+        "fetch_more_results": ToolPolicy(max_concurrency=8),
+        "refresh_rollups": ToolPolicy(max_concurrency=1, timeout_seconds=0)
+    },
+    default_port=8102,
+    schema_cache_path=Path(__file__).parent / SCHEMA_CACHE_FILE,
+    warm_up=warm_up
+)
 
 if __name__ == "__main__":
-  logging.info(f"Iniciando servidor MCP.")
-  try:
-    asyncio.run(run_mcp_stdio_server())
-  except Exception as e:
-    logging.critical(f"Servidor MCP encontrou um erro não tratado: {e}", exc_info=True)
-  finally:
-    logging.info(f"Servidor MCP encerrando.")
-    logging.info(f"\n\n")
\ No newline at end of file
+  server.run()
@@ -0,0 +1,283 @@
+import logging
+import os
+import re
+
+from dataclasses import dataclass
+
+from google.api_core.exceptions import NotFound
+
+from common.bq_cache import STRING_LITERAL_PATTERN, normalize_sql
+
+DATASET = os.getenv("ANALYTICS_DATASET", "third-zephyr-464615-d6.fraud_detection")
+FACT_TABLE = "fact-transaction"
+
+STAR_SCHEMA = {
+    "fact-transaction": ["transaction_id", "card_id", "merchant_id", "date_id", "amount", "transaction_type"],
+    "dim-date": [
+        "date_id", "full_date", "year", "month", "day", "month_name", "day_name", "day_of_week",
+        "day_of_month", "day_of_year", "week_of_year", "quarter", "month_year"
+    ],
+    "dim-merchant": ["merchant_id", "merchant_city", "merchant_state", "mcc"],
+    "dim-card": [
+        "card_id", "client_id", "card_brand", "card_type", "card_number", "expires", "has_chip",
+        "num_cards_issued", "credit_limit", "acct_open_date", "year_pin_last_changed", "card_on_dark_web"
+    ],
+    "dim-user": [
+        "user_id", "current_age", "retirement_age", "birth_year", "birth_month", "gender", "per_capita_income",
+        "yearly_income", "total_debt", "credit_score", "num_credit_cards"
+    ]
+}
+STAR_COLUMNS = {column for columns in STAR_SCHEMA.values() for column in columns}
+
+# Chave da tabela fato e da dimensão usadas em cada JOIN, e o alias usado nas queries de carga.
+DIMENSION_JOINS = {
+    "dim-date": ("date_id", "date_id", "d"),
+    "dim-merchant": ("merchant_id", "merchant_id", "m"),
+    "dim-card": ("card_id", "card_id", "c")
+}
+
+MEASURES = {
+    "sum_amount": "SUM(t.amount)",
+    "transaction_count": "COUNT(*)",
+    "min_amount": "MIN(t.amount)",
+    "max_amount": "MAX(t.amount)"
+}
+
+AGGREGATE_PATTERNS = [
+    (re.compile(r"\bSUM\s*\(\s*(?:\w+\.)?amount\s*\)", re.IGNORECASE), "SUM(sum_amount)"),
+    (re.compile(r"\bCOUNT\s*\(\s*(?:\*|1|(?:\w+\.)?transaction_id)\s*\)", re.IGNORECASE), "SUM(transaction_count)"),
+    (re.compile(r"\bAVG\s*\(\s*(?:\w+\.)?amount\s*\)", re.IGNORECASE), "SAFE_DIVIDE(SUM(sum_amount), SUM(transaction_count))"),
+    (re.compile(r"\bMIN\s*\(\s*(?:\w+\.)?amount\s*\)", re.IGNORECASE), "MIN(min_amount)"),
+    (re.compile(r"\bMAX\s*\(\s*(?:\w+\.)?amount\s*\)", re.IGNORECASE), "MAX(max_amount)")
+]
+# Agregações que o rollup sabe responder, já reescritas sobre as suas medidas.
+MEASURE_AGGREGATE_PATTERN = re.compile("|".join(re.escape(replacement) for _, replacement in AGGREGATE_PATTERNS), re.IGNORECASE)
+AGGREGATE_FUNCTIONS = {
+    "ANY_VALUE", "APPROX_COUNT_DISTINCT", "APPROX_QUANTILES", "APPROX_TOP_COUNT", "APPROX_TOP_SUM", "ARRAY_AGG",
+    "ARRAY_CONCAT_AGG", "AVG", "BIT_AND", "BIT_OR", "BIT_XOR", "CORR", "COUNT", "COUNTIF", "COVAR_POP", "COVAR_SAMP",
+    "GROUPING", "LOGICAL_AND", "LOGICAL_OR", "MAX", "MAX_BY", "MIN", "MIN_BY", "STDDEV", "STDDEV_POP", "STDDEV_SAMP",
+    "STRING_AGG", "SUM", "VAR_POP", "VAR_SAMP", "VARIANCE"
+}
+# Palavras das cláusulas SELECT/WHERE/GROUP BY/HAVING/ORDER BY/LIMIT que não são colunas.
+SQL_KEYWORDS = {
+    "AND", "AS", "ASC", "BETWEEN", "BY", "CASE", "DESC", "ELSE", "END", "ESCAPE", "FALSE", "FIRST", "FROM", "GROUP",
+    "HAVING", "IN", "IS", "LAST", "LIKE", "LIMIT", "NOT", "NULL", "NULLS", "OFFSET", "OR", "ORDER", "THEN", "TRUE",
+    "WHEN", "WHERE", "INTERVAL", "DATE", "DATETIME", "TIMESTAMP", "TIME", "BOOL", "BYTES", "FLOAT64", "INT64",
+    "NUMERIC", "BIGNUMERIC", "STRING", "WEEK", "DAYOFWEEK", "DAYOFYEAR"
+}
+IDENTIFIER_PATTERN = re.compile(r"\b([A-Za-z_]\w*)\b(\s*\()?")
+OUTPUT_ALIAS_PATTERN = re.compile(r"\bAS\s+(\w+)", re.IGNORECASE)
+GROUP_BY_PATTERN = re.compile(r"\bGROUP\s+BY\b", re.IGNORECASE)
+UNSUPPORTED_PATTERN = re.compile(r"\(\s*SELECT\b|\bWITH\b|\bUNION\b|\bDISTINCT\b|\bOVER\s*\(|\b(RIGHT|FULL|CROSS)\s+(OUTER\s+)?JOIN\b", re.IGNORECASE)
+CLAUSE_PATTERN = re.compile(r"^SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<source>.+?)(?P<rest>\s+(WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT)\b.*)?$", re.IGNORECASE | re.DOTALL)
+TABLE_ALIAS_PATTERN = re.compile(r"`?([\w\-]+\.[\w\-]+\.[\w\-]+)`?\s+(?:AS\s+)?(\w+)", re.IGNORECASE)
+JOIN_PATTERN = re.compile(r"\bJOIN\b", re.IGNORECASE)
+LEFT_JOIN_PATTERN = re.compile(r"\bLEFT\s+(?:OUTER\s+)?JOIN\b", re.IGNORECASE)
+JOIN_CONDITION_PATTERN = re.compile(r"\bON\s+(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)", re.IGNORECASE)
+
+
+@dataclass
+class Rollup:
+    """Agregação pré-calculada da tabela fato por um conjunto de colunas das dimensões.
+
+    `window_key` é a expressão (sobre colunas de `dim-date`, prefixadas por `{prefix}`) que delimita
+    a atualização incremental: o último período já agregado e os seguintes são recalculados a cada carga.
+    """
+    name: str
+    dimensions: dict[str, list[str]]
+    window_key: str
+
+    @property
+    def table_id(self) -> str:
+        return f"{DATASET}.{self.name}"
+
+    @property
+    def columns(self) -> set[str]:
+        return {column for columns in self.dimensions.values() for column in columns}
+
+    @property
+    def source_tables(self) -> list[str]:
+        return [f"{DATASET}.{table}" for table in dict.fromkeys([FACT_TABLE, *self.dimensions])]
+
+    def build_sql(self, watermark: int | None = None) -> str:
+        """Query que agrega a tabela fato nas colunas do rollup, a partir de `watermark` se informado."""
+        select = []
+        for table, columns in self.dimensions.items():
+            alias = "t" if table == FACT_TABLE else DIMENSION_JOINS[table][2]
+            select.extend(f"{alias}.{column}" for column in columns)
+        joins = [
+            f"LEFT JOIN `{DATASET}.{table}` {alias} ON t.{fact_key} = {alias}.{dimension_key}"
+            for table, (fact_key, dimension_key, alias) in DIMENSION_JOINS.items()
+            if table in self.dimensions
+        ]
+        measures = [f"{expression} AS {name}" for name, expression in MEASURES.items()]
+        where = f"\nWHERE {self.window_key.format(prefix='d.')} >= {int(watermark)}" if watermark is not None else ""
+        return (
+            f"SELECT {', '.join(select + measures)}\n"
+            f"FROM `{DATASET}.{FACT_TABLE}` t\n" + "\n".join(joins) + where +
+            f"\nGROUP BY {', '.join(select)}"
+        )
+
+
+ROLLUPS = [
+    Rollup(
+        name="rollup_month_card",
+        dimensions={
+            "dim-date": ["year", "month", "month_name", "quarter", "month_year"],
+            "dim-card": ["card_brand", "card_type"],
+            "fact-transaction": ["transaction_type"]
+        },
+        window_key="{prefix}year * 100 + {prefix}month"
+    ),
+    Rollup(
+        name="rollup_date_state",
+        dimensions={
+            "dim-date": STAR_SCHEMA["dim-date"],
+            "dim-merchant": ["merchant_state"],
+            "fact-transaction": ["transaction_type"]
+        },
+        window_key="{prefix}date_id"
+    )
+]
+
+
+def _table_exists(client, table_id: str) -> bool:
+    try:
+        client.get_table(table_id)
+        return True
+    except NotFound:
+        return False
+
+
+def refresh_rollup(client, rollup: Rollup, full_refresh: bool = False) -> str:
+    """Atualiza o rollup no BigQuery: recria a tabela inteira ou recalcula apenas o último período e os seguintes."""
+    watermark = None
+    if not full_refresh and _table_exists(client, rollup.table_id):
+        rows = list(client.query(f"SELECT MAX({rollup.window_key.format(prefix='')}) AS watermark FROM `{rollup.table_id}`").result())
+        watermark = rows[0]["watermark"] if rows else None
+
+    if watermark is None:
+        client.query(f"CREATE OR REPLACE TABLE `{rollup.table_id}` AS\n{rollup.build_sql()}").result()
+        logging.info(f"Rollup {rollup.name} recriado.")
+        return f"{rollup.name}: recriado por completo."
+
+    columns = ", ".join([column for columns in rollup.dimensions.values() for column in columns] + list(MEASURES))
+    client.query(
+        f"DELETE FROM `{rollup.table_id}` WHERE {rollup.window_key.format(prefix='')} >= {int(watermark)};\n"
+        f"INSERT INTO `{rollup.table_id}` ({columns})\n{rollup.build_sql(watermark)};"
+    ).result()
+    logging.info(f"Rollup {rollup.name} atualizado a partir de {watermark}.")
+    return f"{rollup.name}: atualizado a partir de {watermark}."
+
+
+class RollupRouter:
+    """Reescreve queries de agregação sobre a tabela fato para lerem de um rollup equivalente.
+
+    A query só é reescrita se for um SELECT simples da fato com LEFT JOINs pelas chaves das
+    dimensões, com GROUP BY ou agregação, cujas agregações sejam todas SUM/AVG/MIN/MAX de
+    `amount` ou contagens de transações, e se todas as demais colunas usadas existirem no
+    rollup. Os rollups são montados com LEFT JOIN: transações com chaves sem correspondência
+    nas dimensões entram nos totais, num grupo NULL. Por isso, queries com INNER JOIN (que
+    descartam essas transações) ou com JOIN a uma dimensão que o rollup não inclui continuam
+    na tabela fato. Rollups desatualizados em relação às tabelas de origem são ignorados.
+    """
+
+    def __init__(self, rollups: list[Rollup], table_modified=None):
+        self.rollups = rollups
+        self.table_modified = table_modified
+        self.enabled = os.getenv("ROLLUPS_ENABLED", "true").lower() != "false"
+
+    def _is_fresh(self, rollup: Rollup) -> bool:
+        if self.table_modified is None:
+            return True
+        try:
+            rollup_modified = self.table_modified(rollup.table_id)
+            return all(self.table_modified(table_id) <= rollup_modified for table_id in rollup.source_tables)
+        except NotFound:
+            return False
+
+    def _source_aliases(self, source: str) -> dict[str, str] | None:
+        """Mapeia alias -> tabela da cláusula FROM, ou None se os JOINs não forem LEFT JOINs pelas chaves das dimensões."""
+        if len(JOIN_PATTERN.findall(source)) != len(LEFT_JOIN_PATTERN.findall(source)):
+            return None
+        aliases = {}
+        for table_id, alias in TABLE_ALIAS_PATTERN.findall(source):
+            project_dataset, _, table = table_id.rpartition(".")
+            if project_dataset != DATASET or table not in STAR_SCHEMA or alias.upper() in ("ON", "JOIN", "LEFT", "OUTER", "INNER"):
+                return None
+            aliases[alias] = table
+        if FACT_TABLE not in aliases.values():
+            return None
+
+        joined = {table for table in aliases.values() if table != FACT_TABLE}
+        if len(joined) != len(aliases) - 1 or len(JOIN_CONDITION_PATTERN.findall(source)) != len(joined):
+            return None
+        for left_alias, left_column, right_alias, right_column in JOIN_CONDITION_PATTERN.findall(source):
+            sides = {aliases.get(left_alias): left_column, aliases.get(right_alias): right_column}
+            dimension = next((table for table in sides if table in DIMENSION_JOINS), None)
+            if dimension is None or FACT_TABLE not in sides:
+                return None
+            fact_key, dimension_key, _ = DIMENSION_JOINS[dimension]
+            if sides[FACT_TABLE] != fact_key or sides[dimension] != dimension_key:
+                return None
+        return aliases
+
+    def route(self, sql: str) -> str:
+        """Retorna a query reescrita sobre o menor rollup capaz de respondê-la, ou a query original."""
+        if not self.enabled:
+            return sql
+        try:
+            return self._route(sql)
+        except Exception as e:
+            logging.warning(f"Rollup: não foi possível avaliar a query, executando a original: {e}")
+            return sql
+
+    def _route(self, sql: str) -> str:
+        normalized = normalize_sql(sql)
+        code = STRING_LITERAL_PATTERN.sub("''", normalized)
+        match = CLAUSE_PATTERN.match(normalized)
+        if UNSUPPORTED_PATTERN.search(code) or match is None:
+            return sql
+        aliases = self._source_aliases(match.group("source"))
+        if aliases is None:
+            return sql
+
+        select = self._rewrite(match.group("select"), aliases)
+        rest = self._rewrite(match.group("rest") or "", aliases)
+        select_code, rest_code = STRING_LITERAL_PATTERN.sub("''", select), STRING_LITERAL_PATTERN.sub("''", rest)
+        if not self._is_aggregation(select_code + rest_code):
+            return sql
+        used_columns = self._columns(select_code, rest_code)
+        if not used_columns <= STAR_COLUMNS | set(MEASURES):
+            return sql
+        used_columns &= STAR_COLUMNS
+        joined = set(aliases.values()) - {FACT_TABLE}
+        for rollup in self.rollups:
+            if used_columns <= rollup.columns and joined <= rollup.dimensions.keys() and self._is_fresh(rollup):
+                routed = f"SELECT {select} FROM `{rollup.table_id}`{rest}"
+                logging.info(f"Rollup: query respondida pelo rollup {rollup.name}: {routed}")
+                return routed
+        return sql
+
+    @staticmethod
+    def _is_aggregation(code: str) -> bool:
+        """Indica se a query agrupa ou agrega, e se todas as suas agregações são medidas do rollup."""
+        remaining, measures = MEASURE_AGGREGATE_PATTERN.subn("", code)
+        if measures == 0 and not GROUP_BY_PATTERN.search(code):
+            return False
+        return not any(call and name.upper() in AGGREGATE_FUNCTIONS for name, call in IDENTIFIER_PATTERN.findall(remaining))
+
+    @staticmethod
+    def _columns(select: str, rest: str) -> set[str]:
+        """Identificadores da query que não são funções, palavras reservadas nem aliases de saída usados após o SELECT."""
+        def identifiers(code: str) -> set[str]:
+            return {name.lower() for name, call in IDENTIFIER_PATTERN.findall(code) if not call and name.upper() not in SQL_KEYWORDS}
+
+        output_aliases = {alias.lower() for alias in OUTPUT_ALIAS_PATTERN.findall(select)}
+        return identifiers(OUTPUT_ALIAS_PATTERN.sub("", select)) | (identifiers(rest) - output_aliases)
+
+    def _rewrite(self, clause: str, aliases: dict[str, str]) -> str:
+        """Troca as agregações de `amount` pelas medidas do rollup e remove os aliases das colunas."""
+        for pattern, replacement in AGGREGATE_PATTERNS:
+            clause = pattern.sub(replacement, clause)
+        return re.sub(r"\b(\w+)\.(\w+)\b", lambda ref: ref.group(2) if ref.group(1) in aliases else ref.group(0), clause)
@@ -0,0 +1,334 @@
+"""Cache de resultados de queries do BigQuery, invalidado pela data de modificação das tabelas lidas.
+
+O cliente só precisa expor `query(sql)`, `get_job(job_id, location=...)` e
+`get_table(table_id).modified`. Os jobs retornados expõem `job_id`, `location` e
+`result(start_index=..., max_results=...)`, cujo retorno tem `total_rows` e `to_arrow()`.
+Assim, o cliente falso de `tests/fakes.py` substitui o `bigquery.Client` nos testes.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, replace
+
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+DEFAULT_DISK_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_METADATA_TTL_SECONDS = 30
+
+STRING_LITERAL_PATTERN = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)")
+TABLE_PATTERN = re.compile(
+    r"`([\w\-]+\.[\w\-]+\.[\w\-]+)`|\b(?:FROM|JOIN)\s+([\w\-]+\.[\w\-]+\.[\w\-]+)\b",
+    re.IGNORECASE
+)
+QUOTED_LITERAL_PATTERN = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+FUNCTION_FROM_PATTERN = re.compile(r"\b(?:EXTRACT|TRIM|SUBSTRING)\s*\([^()]*?\bFROM\b", re.IGNORECASE)
+CTE_PATTERN = re.compile(r"(?:\bWITH(?:\s+RECURSIVE)?|,)\s*`?(\w+)`?\s+AS\s*\(", re.IGNORECASE)
+TABLE_REFERENCE_PATTERN = re.compile(
+    r"\b(?:FROM|JOIN)\s+((?:`[^`]+`|[\w\-]+)(?:\.(?:`[^`]+`|[\w\-]+))*)(?![\w\-.`]|\s*\()",
+    re.IGNORECASE
+)
+VOLATILE_PATTERN = re.compile(
+    r"\b(CURRENT_(DATE|DATETIME|TIME|TIMESTAMP)|NOW|RAND|GENERATE_UUID|SESSION_USER)\s*\(",
+    re.IGNORECASE
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """Remove comentários, espaços redundantes e o ';' final, preservando os literais de texto."""
+    parts = STRING_LITERAL_PATTERN.split(sql.strip())
+    normalized = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            normalized.append(part)
+            continue
+        part = re.sub(r"--[^\n]*|#[^\n]*|/\*.*?\*/", " ", part, flags=re.DOTALL)
+        normalized.append(re.sub(r"\s+", " ", part))
+    return "".join(normalized).strip().rstrip(";").strip()
+
+
+def referenced_tables(sql: str) -> list[str]:
+    """Tabelas totalmente qualificadas (projeto.dataset.tabela) referenciadas pela query."""
+    return sorted({quoted or bare for quoted, bare in TABLE_PATTERN.findall(sql)})
+
+
+def qualified_tables(sql: str, project: str | None) -> list[str] | None:
+    """Tabelas lidas pela query, com as referências 'dataset.tabela' completadas com o projeto do cliente.
+
+    Retorna None se alguma tabela não puder ser identificada (ex.: sem o dataset, que dependeria
+    do dataset padrão do job): sem saber o que a query lê, o cache não tem como invalidá-la.
+    """
+    sql = QUOTED_LITERAL_PATTERN.sub("''", normalize_sql(sql))
+    sql = FUNCTION_FROM_PATTERN.sub("(", sql)
+    ctes = {name.lower() for name in CTE_PATTERN.findall(sql)}
+    tables = set(referenced_tables(sql))
+    for reference in TABLE_REFERENCE_PATTERN.findall(sql):
+        parts = reference.replace("`", "").split(".")
+        if len(parts) == 3:
+            tables.add(".".join(parts))
+        elif len(parts) == 2 and project:
+            tables.add(f"{project}.{'.'.join(parts)}")
+        elif not (len(parts) == 1 and parts[0].lower() in ctes):
+            return None
+    return sorted(tables)
+
+
+@dataclass
+class QueryResult:
+    """Uma página do resultado de uma query: as linhas a partir de `start_index` e o total de linhas da query."""
+    table: pa.Table
+    total_rows: int
+    start_index: int = 0
+    job_id: str | None = None
+    location: str | None = None
+    tables_modified: dict | None = None
+    created_at: float = 0.0
+    estimated_bytes: int | None = None
+    bytes_processed: int | None = None
+    from_cache: bool = False
+
+    @property
+    def size_bytes(self) -> int:
+        return self.table.nbytes
+
+
+class BigQueryResultCache:
+    """Cache LRU, em memória e opcionalmente em disco (Arrow), dos resultados de queries do BigQuery.
+
+    Cada página é armazenada separadamente, com chave formada pela SQL normalizada, o projeto
+    do cliente, a linha inicial e o tamanho da página. Cada entrada guarda a data de
+    modificação das tabelas lidas pela query e só é reaproveitada enquanto nenhuma delas mudar.
+    Queries com alguma tabela não identificável (ver `qualified_tables`) ou com funções não
+    determinísticas não são armazenadas.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_bytes: int | None = None,
+        disk_directory: str | None = None,
+        disk_max_bytes: int | None = None,
+        ttl_seconds: int | None = None,
+        metadata_ttl_seconds: int | None = None,
+        guard=None
+    ):
+        self.client = client
+        self.guard = guard
+        self.max_bytes = max_bytes or int(os.getenv("BQ_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.disk_directory = disk_directory or os.getenv("BQ_CACHE_DIR") or None
+        self.disk_max_bytes = disk_max_bytes or int(os.getenv("BQ_CACHE_DISK_MAX_BYTES", DEFAULT_DISK_MAX_BYTES))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("BQ_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        self.metadata_ttl_seconds = metadata_ttl_seconds if metadata_ttl_seconds is not None else int(
+            os.getenv("BQ_CACHE_METADATA_TTL_SECONDS", DEFAULT_METADATA_TTL_SECONDS)
+        )
+        self.enabled = os.getenv("BQ_CACHE_ENABLED", "true").lower() != "false"
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, QueryResult] = OrderedDict()
+        self._total_bytes = 0
+        self._modified: dict[str, tuple[float, str]] = {}
+        self._lock = threading.RLock()
+        if self.disk_directory:
+            os.makedirs(self.disk_directory, exist_ok=True)
+
+    def key(self, sql: str, start_index: int = 0, max_results: int | None = None) -> str:
+        project = getattr(self.client, "project", "") or ""
+        raw_key = f"{project}\n{normalize_sql(sql)}\n{start_index}\n{max_results}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def query(
+        self,
+        sql: str,
+        start_index: int = 0,
+        max_results: int | None = None,
+        job_id: str | None = None,
+        location: str | None = None
+    ) -> QueryResult:
+        """Retorna até `max_results` linhas da query a partir de `start_index`, do cache quando as tabelas lidas não mudaram.
+
+        Quando `job_id` é informado, as linhas são lidas da tabela de resultado do job já executado,
+        sem executar a query novamente; se o job tiver expirado, a query é repetida. Antes de cada
+        nova execução, o `guard` (se houver) estima o custo e pode recusá-la.
+        """
+        tables = qualified_tables(sql, getattr(self.client, "project", None)) if self.enabled else None
+        if not tables or VOLATILE_PATTERN.search(sql):
+            return self._execute(sql, start_index, max_results, job_id, location)
+
+        key = self.key(sql, start_index, max_results)
+        tables_modified = {table_id: self.table_modified(table_id) for table_id in tables}
+        cached = self._get(key)
+        if cached is not None and cached.tables_modified == tables_modified and time.time() - cached.created_at <= self.ttl_seconds:
+            self.hits += 1
+            logging.info(f"Cache BQ: resultado servido do cache ({cached.table.num_rows} linhas).")
+            return replace(cached, from_cache=True)
+        if cached is not None:
+            logging.info("Cache BQ: tabelas alteradas desde a última execução, repetindo a query.")
+            self.invalidate(key)
+
+        self.misses += 1
+        result = self._execute(sql, start_index, max_results, job_id, location)
+        result.tables_modified = tables_modified
+        result.created_at = time.time()
+        self._put(key, result)
+        return result
+
+    def _execute(
+        self,
+        sql: str,
+        start_index: int,
+        max_results: int | None,
+        job_id: str | None,
+        location: str | None
+    ) -> QueryResult:
+        if job_id:
+            try:
+                return self._read_rows(self.client.get_job(job_id, location=location), start_index, max_results)
+            except Exception as e:
+                logging.info(f"Cache BQ: resultado do job {job_id} indisponível ({e}), repetindo a query.")
+        if self.guard is None:
+            return self._read_rows(self.client.query(sql), start_index, max_results)
+
+        plan = self.guard.check(sql)
+        job = self.client.query(sql, job_config=plan.job_config)
+        result = self._read_rows(job, start_index, max_results)
+        result.estimated_bytes = plan.estimated_bytes
+        result.bytes_processed = getattr(job, "total_bytes_processed", None)
+        logging.info(
+            f"Cache BQ: bytes processados estimados {plan.estimated_bytes}, reais {result.bytes_processed}."
+        )
+        return result
+
+    def _read_rows(self, job, start_index: int, max_results: int | None) -> QueryResult:
+        rows = job.result(start_index=start_index or None, max_results=max_results)
+        table = rows.to_arrow()
+        total_rows = rows.total_rows if rows.total_rows is not None else start_index + table.num_rows
+        return QueryResult(
+            table=table,
+            total_rows=total_rows,
+            start_index=start_index,
+            job_id=getattr(job, "job_id", None),
+            location=getattr(job, "location", None)
+        )
+
+    def table_modified(self, table_id: str) -> str:
+        """Data de modificação da tabela, consultada no máximo a cada `metadata_ttl_seconds`."""
+        now = time.time()
+        with self._lock:
+            cached = self._modified.get(table_id)
+        if cached is not None and now - cached[0] < self.metadata_ttl_seconds:
+            return cached[1]
+        modified = self.client.get_table(table_id).modified
+        modified = modified.isoformat() if modified is not None else ""
+        with self._lock:
+            self._modified[table_id] = (now, modified)
+        return modified
+
+    def _get(self, key: str) -> QueryResult | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._load(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def _put(self, key: str, entry: QueryResult) -> None:
+        self._remember(key, entry)
+        self._store(key, entry)
+
+    def _remember(self, key: str, entry: QueryResult) -> None:
+        if entry.size_bytes > self.max_bytes:
+            logging.info(f"Cache BQ: resultado com {entry.size_bytes} bytes excede o limite em memória.")
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous.size_bytes
+            self._entries[key] = entry
+            self._total_bytes += entry.size_bytes
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.size_bytes
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry.size_bytes
+        if self.disk_directory:
+            for path in self._disk_paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = list(self._entries)
+        for key in keys:
+            self.invalidate(key)
+        with self._lock:
+            self._modified.clear()
+
+    def _disk_paths(self, key: str) -> tuple[str, str]:
+        base = os.path.join(self.disk_directory, key)
+        return base + ".arrow", base + ".json"
+
+    def _store(self, key: str, entry: QueryResult) -> None:
+        if not self.disk_directory or entry.size_bytes > self.disk_max_bytes:
+            return
+        data_path, meta_path = self._disk_paths(key)
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.disk_directory)
+            os.close(fd)
+            feather.write_feather(entry.table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, data_path)
+            with open(meta_path, "w") as meta_file:
+                meta = {key: value for key, value in asdict(entry).items() if key not in ("table", "from_cache")}
+                json.dump(meta, meta_file)
+        except OSError as e:
+            logging.warning(f"Cache BQ: não foi possível gravar o resultado em disco: {e}")
+            return
+        self._evict_disk()
+
+    def _load(self, key: str) -> QueryResult | None:
+        if not self.disk_directory:
+            return None
+        data_path, meta_path = self._disk_paths(key)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            table = feather.read_table(data_path, memory_map=True)
+            os.utime(data_path)
+        except (OSError, ValueError, TypeError, pa.ArrowInvalid):
+            return None
+        return QueryResult(table=table, **meta)
+
+    def _evict_disk(self) -> None:
+        """Remove os resultados em disco usados há mais tempo até caberem em `disk_max_bytes`."""
+        files = []
+        for name in os.listdir(self.disk_directory):
+            if name.endswith(".arrow"):
+                stat = os.stat(os.path.join(self.disk_directory, name))
+                files.append((stat.st_mtime, stat.st_size, name[:-len(".arrow")]))
+        total = sum(size for _, size, _ in files)
+        for _, size, key in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            for path in self._disk_paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._total_bytes}
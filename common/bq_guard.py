@@ -0,0 +1,99 @@
+"""Verificação de custo das queries geradas antes da execução no BigQuery.
+
+O cliente só precisa aceitar `query(sql, job_config=...)` e, com `job_config.dry_run`, retornar
+um job com `total_bytes_processed`; o cliente falso de `tests/fakes.py` o substitui nos testes.
+"""
+import logging
+import os
+import re
+
+from dataclasses import dataclass
+
+from common.bq_cache import normalize_sql
+from common.lazy import lazy_import
+
+bigquery = lazy_import("google.cloud.bigquery")
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+DEFAULT_AUTO_LIMIT = 1000
+
+SELECT_PATTERN = re.compile(r"^\(?\s*(SELECT|WITH)\b", re.IGNORECASE)
+AGGREGATION_PATTERN = re.compile(
+    r"\bGROUP\s+BY\b|\b(COUNT|COUNTIF|SUM|AVG|MIN|MAX|ANY_VALUE|ARRAY_AGG|STRING_AGG|"
+    r"STDDEV\w*|VAR_\w+|VARIANCE|APPROX_\w+|LOGICAL_AND|LOGICAL_OR)\s*\(",
+    re.IGNORECASE
+)
+LIMIT_PATTERN = re.compile(r"\bLIMIT\s+\d+(\s+OFFSET\s+\d+)?\s*\)?\s*$", re.IGNORECASE)
+
+
+class QueryBudgetExceeded(ValueError):
+    pass
+
+
+@dataclass
+class QueryPlan:
+    estimated_bytes: int | None
+    job_config: object | None = None
+
+
+def format_bytes(size: int | None) -> str:
+    if size is None:
+        return "desconhecido"
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class QueryGuard:
+    """Prepara e valida as queries geradas pelo LLM antes de executá-las.
+
+    Queries de listagem (sem agregação nem LIMIT) recebem um LIMIT automático. Antes da
+    execução, um dry run estima os bytes processados: queries acima do orçamento são
+    recusadas, e as demais são executadas com `maximum_bytes_billed` igual ao orçamento.
+    """
+
+    def __init__(self, client, max_bytes: int | None = None, auto_limit: int | None = None):
+        self.client = client
+        self.max_bytes = max_bytes or int(os.getenv("BQ_MAX_BYTES_PROCESSED", DEFAULT_MAX_BYTES))
+        self.auto_limit = auto_limit if auto_limit is not None else int(os.getenv("BQ_AUTO_LIMIT", DEFAULT_AUTO_LIMIT))
+        self.dry_run_enabled = os.getenv("BQ_DRY_RUN_ENABLED", "true").lower() != "false"
+
+    def apply_limit(self, sql: str) -> str:
+        """Adiciona `LIMIT auto_limit` a queries SELECT sem agregação e sem LIMIT próprio."""
+        normalized = normalize_sql(sql)
+        if (
+            not self.auto_limit
+            or not SELECT_PATTERN.match(normalized)
+            or AGGREGATION_PATTERN.search(normalized)
+            or LIMIT_PATTERN.search(normalized)
+        ):
+            return sql
+        logging.info(f"Guard BQ: query sem agregação, adicionado LIMIT {self.auto_limit}.")
+        return f"{normalized}\nLIMIT {self.auto_limit}"
+
+    def estimate(self, sql: str) -> int:
+        """Executa um dry run e retorna a quantidade de bytes que a query processaria."""
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        return self.client.query(sql, job_config=job_config).total_bytes_processed
+
+    def check(self, sql: str) -> QueryPlan:
+        """Estima o custo da query e recusa a execução se ela ultrapassar o orçamento.
+
+        Raises:
+            QueryBudgetExceeded: Se a estimativa for maior que `max_bytes`.
+        """
+        if not self.dry_run_enabled:
+            return QueryPlan(estimated_bytes=None)
+
+        estimated_bytes = self.estimate(sql)
+        logging.info(f"Guard BQ: dry run estimou {format_bytes(estimated_bytes)} processados.")
+        if estimated_bytes > self.max_bytes:
+            raise QueryBudgetExceeded(
+                f"A query processaria {format_bytes(estimated_bytes)}, acima do limite de {format_bytes(self.max_bytes)}. "
+                "Refaça a consulta selecionando apenas as colunas necessárias e filtrando as linhas."
+            )
+        return QueryPlan(
+            estimated_bytes=estimated_bytes,
+            job_config=bigquery.QueryJobConfig(maximum_bytes_billed=self.max_bytes)
+        )
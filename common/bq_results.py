@@ -0,0 +1,165 @@
+import base64
+import csv
+import io
+import json
+import logging
+import os
+
+import pyarrow as pa
+
+from common.bq_cache import BigQueryResultCache, QueryResult
+from common.bq_guard import format_bytes
+from common.local_backend import LOCAL, LocalQueryError
+
+DEFAULT_PAGE_ROWS = 100
+DEFAULT_MAX_CHARS = 20000
+MARKDOWN = "markdown"
+CSV = "csv"
+
+
+class InvalidContinuationToken(ValueError):
+    pass
+
+
+def encode_token(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_token(token: str) -> dict:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token.strip().encode("ascii")))
+        return {
+            "sql": state["sql"],
+            "offset": int(state["offset"]),
+            "job_id": state.get("job_id"),
+            "location": state.get("location")
+        }
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidContinuationToken(f"Token de continuação inválido: {e}") from e
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _markdown_line(values) -> str:
+    return "| " + " | ".join(_format_value(value).replace("|", "\\|").replace("\n", " ") for value in values) + " |\n"
+
+
+def _csv_line(values) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow([_format_value(value) for value in values])
+    return buffer.getvalue()
+
+
+def render_rows(table: pa.Table, result_format: str, max_chars: int) -> tuple[str, int]:
+    """Renderiza as linhas em markdown ou CSV até atingir `max_chars` caracteres.
+
+    Returns:
+        tuple: O texto renderizado e a quantidade de linhas que couberam nele.
+    """
+    render_line = _csv_line if result_format == CSV else _markdown_line
+    header = render_line(table.column_names)
+    if render_line is _markdown_line:
+        header += "|" + "---|" * table.num_columns + "\n"
+
+    lines = [header]
+    size = len(header)
+    rendered_rows = 0
+    for batch in table.to_batches():
+        columns = [column.to_pylist() for column in batch.columns]
+        for values in zip(*columns):
+            line = render_line(values)
+            if rendered_rows and size + len(line) > max_chars:
+                return "".join(lines), rendered_rows
+            lines.append(line)
+            size += len(line)
+            rendered_rows += 1
+    return "".join(lines), rendered_rows
+
+
+def _cost_note(result: QueryResult) -> str:
+    if result.from_cache:
+        return " Resultado servido do cache, sem custo de processamento."
+    if result.estimated_bytes is None and result.bytes_processed is None:
+        return ""
+    return (
+        f" Bytes processados: estimados {format_bytes(result.estimated_bytes)}, "
+        f"reais {format_bytes(result.bytes_processed)}."
+    )
+
+
+class ResultPager:
+    """Entrega o resultado de uma query em páginas limitadas por linhas e por tamanho do texto.
+
+    Cada página lê do BigQuery apenas `page_rows` linhas. Se o resultado tiver mais linhas, a
+    resposta termina com um token de continuação, que carrega a SQL, o job e a próxima linha a
+    ser lida, e permite buscar a página seguinte sem executar a query de novo.
+
+    Com um `local_backend` ativo, as queries cujas tabelas existem no snapshot local são
+    executadas nele, e as demais (ou as que falharem localmente) vão para o BigQuery.
+    """
+
+    def __init__(
+        self,
+        cache: BigQueryResultCache,
+        page_rows: int | None = None,
+        max_chars: int | None = None,
+        result_format: str | None = None,
+        local_backend=None
+    ):
+        self.cache = cache
+        self.local_backend = local_backend
+        self.page_rows = page_rows or int(os.getenv("BQ_PAGE_ROWS", DEFAULT_PAGE_ROWS))
+        self.max_chars = max_chars or int(os.getenv("BQ_PAGE_MAX_CHARS", DEFAULT_MAX_CHARS))
+        self.result_format = (result_format or os.getenv("BQ_RESULT_FORMAT", MARKDOWN)).lower()
+
+    def first_page(self, sql: str) -> str:
+        return self._page({"sql": sql, "offset": 0})
+
+    def next_page(self, continuation_token: str) -> str:
+        return self._page(decode_token(continuation_token))
+
+    def _query(self, state: dict) -> QueryResult:
+        backend = self.local_backend
+        if backend is not None and backend.enabled and not state.get("job_id"):
+            if backend.mode == LOCAL or backend.can_run(state["sql"]):
+                try:
+                    return backend.query(state["sql"], start_index=state["offset"], max_results=self.page_rows)
+                except LocalQueryError as e:
+                    if backend.mode == LOCAL:
+                        raise
+                    logging.warning(f"{e} Executando no BigQuery.")
+        return self.cache.query(
+            state["sql"],
+            start_index=state["offset"],
+            max_results=self.page_rows,
+            job_id=state.get("job_id"),
+            location=state.get("location")
+        )
+
+    def _page(self, state: dict) -> str:
+        offset = state["offset"]
+        result = self._query(state)
+        text, rendered_rows = render_rows(result.table, self.result_format, self.max_chars)
+        next_offset = offset + rendered_rows
+        logging.info(f"Resultado BQ: linhas {offset + 1}-{next_offset} de {result.total_rows}.")
+
+        if not result.total_rows:
+            return "A query não retornou linhas." + _cost_note(result)
+        if next_offset >= result.total_rows:
+            return f"{text}\nLinhas {offset + 1}-{next_offset} de {result.total_rows}.{_cost_note(result)}"
+
+        token = encode_token({
+            "sql": state["sql"],
+            "offset": next_offset,
+            "job_id": result.job_id,
+            "location": result.location
+        })
+        return (
+            f"{text}\nLinhas {offset + 1}-{next_offset} de {result.total_rows}.{_cost_note(result)} "
+            f"Para ver as próximas linhas, chame a tool fetch_more_results com o continuation_token abaixo.\n"
+            f"continuation_token: {token}"
+        )
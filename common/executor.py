@@ -0,0 +1,185 @@
+import asyncio
+import contextlib
+import functools
+import inspect
+import logging
+import multiprocessing
+import os
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+THREAD = "thread"
+PROCESS = "process"
+INLINE = "inline"
+DEFAULT_TIMEOUT_SECONDS = 300
+
+
+class ToolTimeout(TimeoutError):
+    pass
+
+
+@dataclass
+class ToolPolicy:
+    """Define onde uma tool é executada e quantas chamadas simultâneas ela aceita.
+
+    Tools com o mesmo `group` compartilham o mesmo limite de concorrência. `timeout_seconds`
+    substitui o tempo limite padrão (MCP_TOOL_TIMEOUT_SECONDS) e 0 o desativa; com
+    `cache_ttl_seconds`, respostas idênticas são reaproveitadas pelo `ResponseCacheMiddleware`.
+    """
+    backend: str = THREAD
+    max_concurrency: int | None = None
+    group: str | None = None
+    timeout_seconds: float | None = None
+    cache_ttl_seconds: float | None = None
+
+
+def parse_policy_overrides(value: str) -> dict[str, dict]:
+    """Lê ajustes de política no formato 'tool=backend:limite:timeout,outra_tool=:2', usado em MCP_TOOL_POLICIES.
+
+    Cada campo é opcional: um campo vazio (ou omitido) mantém o valor da política declarada pelo
+    servidor, inclusive o `group` e o cache, que não podem ser alterados por aqui.
+    """
+    overrides = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, spec = item.partition("=")
+        backend, limit, timeout = (spec.split(":") + ["", ""])[:3]
+        fields = {}
+        if backend.strip():
+            fields["backend"] = backend.strip()
+        if limit.strip():
+            fields["max_concurrency"] = int(limit)
+        if timeout.strip():
+            fields["timeout_seconds"] = float(timeout)
+        overrides[name.strip()] = fields
+    return overrides
+
+
+def merge_policies(policies: dict[str, ToolPolicy], overrides: dict[str, dict]) -> dict[str, ToolPolicy]:
+    """Aplica os ajustes campo a campo sobre as políticas existentes (ou sobre a política padrão)."""
+    merged = dict(policies)
+    for name, fields in overrides.items():
+        merged[name] = replace(merged.get(name, ToolPolicy()), **fields)
+    return merged
+
+
+def _missing_args(func, args: dict) -> list[str]:
+    return [
+        name for name, param in inspect.signature(func).parameters.items()
+        if param.default is inspect.Parameter.empty
+        and param.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+        and name not in args
+    ]
+
+
+class ToolExecutor:
+    """Executa as tools síncronas fora do event loop do servidor MCP.
+
+    Tools de I/O (BigQuery, GCS, Document AI, LLM) usam um pool de threads; tools de CPU
+    sem estado em memória podem usar um pool de processos. Assim, uma tool demorada não
+    bloqueia `list_tools` nem as demais chamadas.
+    """
+
+    def __init__(
+        self,
+        policies: dict[str, ToolPolicy] | None = None,
+        thread_workers: int | None = None,
+        process_workers: int | None = None
+    ):
+        self.thread_workers = thread_workers or int(os.getenv("MCP_THREAD_WORKERS", min(32, (os.cpu_count() or 1) + 4)))
+        self.process_workers = process_workers or int(os.getenv("MCP_PROCESS_WORKERS", os.cpu_count() or 1))
+        self.default_timeout = float(os.getenv("MCP_TOOL_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS))
+        self.policies = merge_policies(policies or {}, parse_policy_overrides(os.getenv("MCP_TOOL_POLICIES", "")))
+        self._pools: dict[str, Executor] = {}
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def policy(self, name: str) -> ToolPolicy:
+        return self.policies.get(name, ToolPolicy())
+
+    def _pool(self, backend: str) -> Executor:
+        if backend not in self._pools:
+            if backend == PROCESS:
+                self._pools[backend] = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pools[backend] = ThreadPoolExecutor(
+                    max_workers=self.thread_workers,
+                    thread_name_prefix="mcp-tool"
+                )
+        return self._pools[backend]
+
+    def _semaphore(self, name: str, policy: ToolPolicy) -> asyncio.Semaphore | None:
+        if not policy.max_concurrency:
+            return None
+        key = policy.group or name
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(policy.max_concurrency)
+        return self._semaphores[key]
+
+    @staticmethod
+    def _release_when_done(semaphore: asyncio.Semaphore, worker) -> None:
+        """Libera o limite de concorrência só quando a função no pool terminar (ou for descartada da fila)."""
+        loop = asyncio.get_running_loop()
+
+        def release(_):
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(semaphore.release)
+        worker.add_done_callback(release)
+
+    def timeout(self, policy: ToolPolicy) -> float | None:
+        timeout = self.default_timeout if policy.timeout_seconds is None else policy.timeout_seconds
+        return timeout or None
+
+    async def run(self, name: str, func, args: dict):
+        """Executa a função da tool com os argumentos recebidos, respeitando a política configurada para ela.
+
+        Funções assíncronas rodam no event loop; as síncronas, no backend da política. Se o tempo
+        limite estourar ou o cliente cancelar a chamada, a espera é cancelada e a tarefa ainda na
+        fila do pool é descartada; uma função síncrona que já começou roda até o fim na sua thread
+        ou processo, mas o resultado é ignorado. Até lá, ela continua ocupando o limite de
+        concorrência da sua política, para que a próxima chamada não a sobreponha.
+        """
+        policy = self.policy(name)
+        missing_args = _missing_args(func, args)
+        if missing_args:
+            missing_args_str = "\n".join(missing_args)
+            return {"error": f"Invoking `{name}()` failed as the following mandatory input parameters are not present:\n{missing_args_str}"}
+
+        parameters = inspect.signature(func).parameters
+        call = functools.partial(func, **{key: value for key, value in args.items() if key in parameters})
+        timeout = self.timeout(policy)
+        semaphore = self._semaphore(name, policy)
+        if semaphore is not None:
+            await semaphore.acquire()
+        worker = None
+        try:
+            if inspect.iscoroutinefunction(func):
+                awaitable = call()
+            elif policy.backend == INLINE:
+                return call()
+            else:
+                logging.debug(f"Executando tool {name} no backend '{policy.backend}'.")
+                worker = self._pool(policy.backend).submit(call)
+                awaitable = asyncio.wrap_future(worker)
+            deadline = asyncio.timeout(timeout)
+            try:
+                async with deadline:
+                    return await awaitable
+            except TimeoutError:
+                if not deadline.expired():
+                    raise
+                logging.error(f"Tool {name} excedeu o tempo limite de {timeout:g}s.")
+                raise ToolTimeout(f"A tool excedeu o tempo limite de {timeout:g}s.") from None
+        finally:
+            if semaphore is not None:
+                if worker is not None and not worker.done():
+                    self._release_when_done(semaphore, worker)
+                else:
+                    semaphore.release()
+
+    def shutdown(self) -> None:
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
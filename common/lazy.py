@@ -0,0 +1,105 @@
+"""Carregamento preguiçoso de módulos e clientes pesados, para que os servidores MCP iniciem rápido.
+
+Os clientes (BigQuery, GCS, Document AI, LLM) e os módulos mais lentos de importar só são
+criados no primeiro uso. Depois do handshake com o agente, um aquecimento em segundo plano
+(`WarmUp`) pode carregá-los antecipadamente, para que a primeira chamada de tool não pague
+esse custo.
+"""
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+
+
+def lazy_import(name: str):
+    """Importa o módulo `name` de forma preguiçosa: o código do módulo só é executado no primeiro acesso a um atributo.
+
+    Submódulos (ex.: `pyarrow.csv`) também são preguiçosos e não forçam o carregamento do pacote
+    pai quando ele já foi importado com `lazy_import`. Os módulos que o usam com anotações de tipo
+    (ex.: `pd.DataFrame`) precisam de `from __future__ import annotations`, senão as anotações
+    forçam o carregamento.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    parent_name, _, child_name = name.rpartition(".")
+    parent = sys.modules.get(parent_name) if parent_name else None
+    spec = _find_submodule_spec(name, parent) if parent is not None else importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    if parent is not None:
+        setattr(parent, child_name, module)
+    return module
+
+
+def _find_submodule_spec(name: str, parent):
+    """Localiza o submódulo sem carregar o pacote pai, que também pode ter sido importado com `lazy_import`.
+
+    `importlib.util.find_spec` lê `parent.__path__` por acesso normal de atributo, o que executaria
+    o pacote preguiçoso (ex.: `lazy_import("pyarrow.csv")` carregaria o pyarrow inteiro).
+    """
+    path = object.__getattribute__(parent, "__path__")
+    for finder in sys.meta_path:
+        spec = finder.find_spec(name, path)
+        if spec is not None:
+            return spec
+    raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+
+
+class LazyObject:
+    """Proxy que cria o objeto com `factory()` no primeiro acesso a um atributo, uma única vez (thread-safe)."""
+
+    def __init__(self, factory, name: str | None = None):
+        self._factory = factory
+        self._name = name or getattr(factory, "__name__", "objeto")
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    self._instance = self._factory()
+                    logging.info(f"Lazy: {self._name} criado em {time.perf_counter() - start:.2f}s.")
+        return self._instance
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+
+class WarmUp:
+    """Executa, uma única vez e numa thread em segundo plano, as funções que carregam módulos e clientes.
+
+    Desativado com MCP_WARMUP=false; nesse caso, tudo é carregado apenas no primeiro uso.
+    """
+
+    def __init__(self, tasks: list):
+        self.tasks = tasks
+        self.enabled = os.getenv("MCP_WARMUP", "true").lower() != "false"
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started or not self.enabled:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name="mcp-warmup", daemon=True).start()
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        for task in self.tasks:
+            try:
+                task()
+            except Exception as e:
+                logging.warning(f"Aquecimento: falha ao executar {getattr(task, '__name__', task)}: {e}")
+        logging.info(f"Aquecimento concluído em {time.perf_counter() - start:.2f}s.")
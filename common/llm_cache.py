@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    namespace TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    template_hash TEXT NOT NULL,
+    question TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, question_key, template_hash)
+)
+"""
+
+
+def normalize_question(question: str) -> str:
+    """Normaliza a pergunta para que variações de caixa, espaços e pontuação final gerem a mesma chave."""
+    question = unicodedata.normalize("NFKC", question).casefold()
+    question = re.sub(r"\s+", " ", question).strip()
+    return question.rstrip(" ?!.;")
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Cache persistente, em SQLite, das respostas do LLM para perguntas em linguagem natural.
+
+    A chave é a pergunta normalizada somada ao hash do prompt de sistema: quando o template
+    muda, as traduções antigas deixam de ser encontradas e são removidas. As entradas expiram
+    após `ttl_seconds` e, acima de `max_entries`, as menos usadas recentemente são descartadas.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        ttl_seconds: int | None = None,
+        max_entries: int | None = None
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds or int(os.getenv("LLM_CACHE_TTL_SECONDS") or DEFAULT_TTL_SECONDS)
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES") or DEFAULT_MAX_ENTRIES)
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() != "false"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._template_hash = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(_SCHEMA)
+        return self._connection
+
+    def _prepare(self, template_hash: str) -> None:
+        """Remove as traduções feitas com outras versões do template, na primeira consulta com o template atual."""
+        if template_hash == self._template_hash:
+            return
+        removed = self._connect().execute(
+            "DELETE FROM translations WHERE namespace = ? AND template_hash != ?",
+            (self.namespace, template_hash)
+        ).rowcount
+        if removed:
+            logging.info(f"Cache LLM ({self.namespace}): template alterado, {removed} traduções invalidadas.")
+        self._template_hash = template_hash
+
+    def get(self, question: str, template: str) -> str | None:
+        """Retorna a resposta armazenada para a pergunta e o template, ou None se ausente ou expirada."""
+        if not self.enabled:
+            return None
+        key, template_hash, now = hash_text(normalize_question(question)), hash_text(template), time.time()
+        with self._lock:
+            connection = self._connect()
+            self._prepare(template_hash)
+            row = connection.execute(
+                "SELECT response, created_at FROM translations WHERE namespace = ? AND question_key = ? AND template_hash = ?",
+                (self.namespace, key, template_hash)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                connection.execute(
+                    "UPDATE translations SET last_used_at = ?, hits = hits + 1 WHERE namespace = ? AND question_key = ? AND template_hash = ?",
+                    (now, self.namespace, key, template_hash)
+                )
+                self.hits += 1
+                logging.info(f"Cache LLM ({self.namespace}): hit para '{question}'.")
+                return row[0]
+            if row is not None:
+                connection.execute(
+                    "DELETE FROM translations WHERE namespace = ? AND question_key = ? AND template_hash = ?",
+                    (self.namespace, key, template_hash)
+                )
+            self.misses += 1
+            return None
+
+    def put(self, question: str, template: str, response: str) -> None:
+        if not self.enabled:
+            return
+        normalized, template_hash, now = normalize_question(question), hash_text(template), time.time()
+        with self._lock:
+            connection = self._connect()
+            self._prepare(template_hash)
+            connection.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (self.namespace, hash_text(normalized), template_hash, normalized, response, now, now)
+            )
+            self._evict(connection, now)
+
+    def entries(self, template: str) -> list[tuple[str, str]]:
+        """Retorna os pares (pergunta normalizada, resposta) ainda válidos para o template."""
+        template_hash = hash_text(template)
+        with self._lock:
+            connection = self._connect()
+            self._prepare(template_hash)
+            return connection.execute(
+                "SELECT question, response FROM translations WHERE namespace = ? AND template_hash = ? AND created_at >= ? ORDER BY created_at",
+                (self.namespace, template_hash, time.time() - self.ttl_seconds)
+            ).fetchall()
+
+    def get_or_create(self, question: str, template: str, create) -> str:
+        """Retorna a resposta em cache ou a gera com `create()` e a armazena."""
+        response = self.get(question, template)
+        if response is None:
+            response = create()
+            self.put(question, template, response)
+        return response
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        connection.execute(
+            "DELETE FROM translations WHERE namespace = ? AND created_at < ?",
+            (self.namespace, now - self.ttl_seconds)
+        )
+        connection.execute(
+            """
+            DELETE FROM translations WHERE namespace = ? AND question_key IN (
+                SELECT question_key FROM translations WHERE namespace = ?
+                ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def stats(self) -> dict:
+        """Contadores de acertos e falhas desde o início do processo e quantidade de entradas armazenadas."""
+        with self._lock:
+            entries = self._connect().execute(
+                "SELECT COUNT(*) FROM translations WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM translations WHERE namespace = ?", (self.namespace,))
@@ -0,0 +1,133 @@
+"""Backend local de consultas: DuckDB sobre um snapshot em Parquet das tabelas do BigQuery.
+
+O snapshot é um diretório com um arquivo (ou diretório de arquivos) Parquet por tabela, em
+`<dataset>/<tabela>.parquet` ou diretamente em `<tabela>.parquet`; hífens no nome da tabela
+também podem ser trocados por '_', o que permite usar a pasta `final_datasets` gerada pela ETL.
+Para gerar o snapshot a partir do BigQuery:
+
+    python -m common.local_backend <diretório> <projeto.dataset.tabela> [...]
+"""
+import logging
+import os
+import re
+import threading
+
+import duckdb
+import pyarrow.parquet as pq
+
+from common.bq_cache import QueryResult, normalize_sql, referenced_tables
+from common.sql_dialect import bigquery_to_duckdb
+
+BIGQUERY = "bigquery"
+AUTO = "auto"
+LOCAL = "local"
+
+
+class LocalQueryError(Exception):
+    pass
+
+
+def _view_name(table_id: str) -> str:
+    return re.sub(r"\W", "_", table_id)
+
+
+class DuckDBBackend:
+    """Executa as queries no DuckDB quando todas as tabelas lidas existem no snapshot local.
+
+    O modo (QUERY_BACKEND) pode ser 'bigquery' (desativado), 'auto' (local quando possível,
+    com fallback para o BigQuery) ou 'local' (somente local, para testes e benchmarks offline).
+    """
+
+    def __init__(self, snapshot_directory: str | None = None, mode: str | None = None):
+        self.snapshot_directory = snapshot_directory or os.getenv("LOCAL_SNAPSHOT_DIR") or None
+        self.mode = (mode or os.getenv("QUERY_BACKEND", BIGQUERY)).lower()
+        self._connection = None
+        self._views: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in (AUTO, LOCAL) and self.snapshot_directory is not None
+
+    def snapshot_path(self, table_id: str) -> str | None:
+        """Caminho do Parquet da tabela no snapshot, ou None se ela não tiver sido exportada."""
+        _, dataset, table = table_id.split(".")
+        for directory in [os.path.join(self.snapshot_directory, dataset), self.snapshot_directory]:
+            for name in dict.fromkeys([table, table.replace("-", "_")]):
+                path = os.path.join(directory, name + ".parquet")
+                if os.path.isfile(path):
+                    return path
+                if os.path.isdir(path):
+                    return os.path.join(path, "*.parquet")
+        return None
+
+    def can_run(self, sql: str) -> bool:
+        tables = referenced_tables(sql)
+        return self.enabled and bool(tables) and all(self.snapshot_path(table_id) for table_id in tables)
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        if self._connection is None:
+            self._connection = duckdb.connect()
+        return self._connection
+
+    def _view(self, table_id: str) -> str:
+        """Cria (ou recria, se o snapshot mudou de lugar) a view que lê o Parquet da tabela."""
+        path = self.snapshot_path(table_id)
+        if path is None:
+            raise LocalQueryError(f"A tabela {table_id} não existe no snapshot local {self.snapshot_directory}.")
+        view_name = _view_name(table_id)
+        with self._lock:
+            if self._views.get(table_id) != path:
+                escaped_path = path.replace("'", "''")
+                self._connect().execute(f"CREATE OR REPLACE VIEW \"{view_name}\" AS SELECT * FROM read_parquet('{escaped_path}')")
+                self._views[table_id] = path
+        return view_name
+
+    def query(self, sql: str, start_index: int = 0, max_results: int | None = None) -> QueryResult:
+        """Executa a query no DuckDB e retorna até `max_results` linhas a partir de `start_index`.
+
+        Raises:
+            LocalQueryError: Se alguma tabela não estiver no snapshot ou a query falhar no DuckDB.
+        """
+        view_names = {table_id: self._view(table_id) for table_id in referenced_tables(sql)}
+        translated = bigquery_to_duckdb(normalize_sql(sql), view_names)
+        page_sql = f"SELECT * FROM ({translated}) AS result"
+        if max_results:
+            page_sql += f" LIMIT {int(max_results)}"
+        if start_index:
+            page_sql += f" OFFSET {int(start_index)}"
+
+        with self._lock:
+            cursor = self._connect().cursor()
+        try:
+            total_rows = cursor.execute(f"SELECT COUNT(*) FROM ({translated}) AS result").fetchone()[0]
+            table = cursor.execute(page_sql).to_arrow_table()
+        except duckdb.Error as e:
+            raise LocalQueryError(f"Falha ao executar a query no DuckDB: {e}") from e
+        finally:
+            cursor.close()
+        logging.info(f"Backend local: query executada no DuckDB ({total_rows} linhas).")
+        return QueryResult(table=table, total_rows=total_rows, start_index=start_index)
+
+
+def snapshot_tables(client, table_ids: list[str], directory: str) -> list[str]:
+    """Exporta as tabelas do BigQuery para `<directory>/<dataset>/<tabela>.parquet`."""
+    paths = []
+    for table_id in table_ids:
+        _, dataset, table = table_id.split(".")
+        path = os.path.join(directory, dataset, table + ".parquet")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(client.list_rows(table_id).to_arrow(), path + ".tmp")
+        os.replace(path + ".tmp", path)
+        logging.info(f"Backend local: tabela {table_id} exportada para {path}.")
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    import sys
+
+    from google.cloud import bigquery
+
+    logging.basicConfig(level=logging.INFO)
+    snapshot_tables(bigquery.Client(), sys.argv[2:], sys.argv[1])
@@ -0,0 +1,160 @@
+"""Log dos servidores MCP em segundo plano: a chamada de tool nunca espera pela escrita em disco.
+
+Cada `logging.*` só formata a mensagem e a coloca numa fila; uma thread (`QueueListener`) grava
+as mensagens no arquivo, uma por linha em JSON, com rotação por tamanho. No caminho da chamada:
+
+- mensagens maiores que MCP_LOG_MAX_MESSAGE_CHARS são truncadas (ex.: respostas inteiras de tools);
+- cada nível tem um limite de mensagens por segundo (MCP_LOG_RATE_LIMITS, ex.: "DEBUG=100,INFO=200");
+  WARNING e acima não são limitados por padrão;
+- com a fila cheia, a mensagem é descartada em vez de bloquear.
+
+Os descartes são contados e informados no campo "dropped" da próxima mensagem gravada.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_LEVEL = "DEBUG"
+DEFAULT_MAX_MESSAGE_CHARS = 2000
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_RATE_LIMITS = "DEBUG=100,INFO=200"
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def parse_rate_limits(value: str) -> dict[int, float]:
+    """Lê limites no formato 'DEBUG=100,INFO=200' (mensagens por segundo), usado em MCP_LOG_RATE_LIMITS."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        level, _, rate = item.partition("=")
+        limits[logging.getLevelName(level.strip().upper())] = float(rate)
+    return limits
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Uma mensagem por linha, em JSON, com nível, origem, thread e descartes anteriores."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        dropped = getattr(record, "dropped", None)
+        if dropped:
+            entry["dropped"] = dropped
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LevelRateLimiter(logging.Filter):
+    """Limita as mensagens por segundo de cada nível (token bucket, com rajadas de até um segundo)."""
+
+    def __init__(self, limits: dict[int, float]):
+        super().__init__()
+        self.limits = limits
+        self._tokens = dict(limits)
+        self._updated = {level: time.monotonic() for level in limits}
+        self._dropped: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.limits.get(record.levelno)
+        if rate is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens[record.levelno] = min(rate, self._tokens[record.levelno] + (now - self._updated[record.levelno]) * rate)
+            self._updated[record.levelno] = now
+            if self._tokens[record.levelno] < 1:
+                self._dropped[record.levelname] = self._dropped.get(record.levelname, 0) + 1
+                return False
+            self._tokens[record.levelno] -= 1
+            if self._dropped:
+                record.dropped = {**getattr(record, "dropped", {}), **self._dropped}
+                self._dropped = {}
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Coloca a mensagem já formatada e truncada na fila, sem nunca esperar por espaço nela."""
+
+    def __init__(self, log_queue: queue.Queue, max_message_chars: int):
+        super().__init__(log_queue)
+        self.max_message_chars = max_message_chars
+        self._dropped: dict[str, int] = {}
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if len(message) > self.max_message_chars:
+            message = f"{message[:self.max_message_chars]}... (+{len(message) - self.max_message_chars} caracteres)"
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        if self._dropped:
+            record.dropped = dict(Counter(getattr(record, "dropped", {})) + Counter(self._dropped))
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Os descartes que esta mensagem informaria passam para a próxima que entrar na fila.
+            self._dropped = dict(Counter(getattr(record, "dropped", {})) + Counter({"fila cheia": 1}))
+        else:
+            self._dropped = {}
+
+
+def configure_logging(log_file_path: str) -> None:
+    """Configura o log do servidor MCP no arquivo indicado (o stdout é do protocolo, no modo stdio)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file_path,
+        maxBytes=int(os.getenv("MCP_LOG_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        backupCount=int(os.getenv("MCP_LOG_BACKUP_COUNT", DEFAULT_BACKUP_COUNT)),
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonLinesFormatter())
+
+    log_queue = queue.Queue(maxsize=int(os.getenv("MCP_LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)))
+    queue_handler = NonBlockingQueueHandler(
+        log_queue,
+        max_message_chars=int(os.getenv("MCP_LOG_MAX_MESSAGE_CHARS", DEFAULT_MAX_MESSAGE_CHARS))
+    )
+    queue_handler.addFilter(LevelRateLimiter(parse_rate_limits(os.getenv("MCP_LOG_RATE_LIMITS", DEFAULT_RATE_LIMITS))))
+
+    logging.basicConfig(level=os.getenv("MCP_LOG_LEVEL", DEFAULT_LEVEL).upper(), handlers=[queue_handler])
+    _listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Grava as mensagens que ainda estão na fila e encerra a thread de log."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
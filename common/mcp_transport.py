@@ -0,0 +1,92 @@
+"""Transportes dos servidores MCP: stdio (um processo por sessão) ou HTTP persistente.
+
+No modo HTTP (MCP_TRANSPORT=http), o servidor fica no ar entre as sessões e atende os agentes
+pelo transporte streamable HTTP do MCP em `http://<MCP_HTTP_HOST>:<MCP_HTTP_PORT>/mcp`. Para
+iniciá-lo, a partir da raiz do projeto:
+
+    MCP_TRANSPORT=http uv run analytics_agent/mcp_server/analytics.py
+
+Os agentes se conectam a ele quando a variável de URL do servidor (ex.: ANALYTICS_MCP_SERVER_URL)
+estiver definida e o servidor estiver respondendo; caso contrário, iniciam o servidor via stdio.
+"""
+import logging
+import os
+import socket
+
+from urllib.parse import urlparse
+
+STDIO = "stdio"
+HTTP = "http"
+DEFAULT_HOST = "127.0.0.1"
+MCP_PATH = "/mcp"
+
+
+def http_transport_enabled() -> bool:
+    return os.getenv("MCP_TRANSPORT", STDIO).lower() == HTTP
+
+
+async def run_mcp_http_server(app, default_port: int) -> None:
+    """Executa o MCP server como serviço HTTP persistente, compartilhado por todas as sessões dos agentes."""
+    import uvicorn
+
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+
+    session_manager = StreamableHTTPSessionManager(app=app)
+
+    async def handle_mcp_request(scope, receive, send):
+        await session_manager.handle_request(scope, receive, send)
+
+    http_app = Starlette(
+        routes=[Mount(MCP_PATH, app=handle_mcp_request)],
+        lifespan=lambda _: session_manager.run()
+    )
+    host = os.getenv("MCP_HTTP_HOST", DEFAULT_HOST)
+    port = int(os.getenv("MCP_HTTP_PORT", default_port))
+    logging.info(f"Servidor MCP {app.name} atendendo em http://{host}:{port}{MCP_PATH}")
+    config = uvicorn.Config(http_app, host=host, port=port, log_config=None, lifespan="on")
+    await uvicorn.Server(config).serve()
+
+
+def server_reachable(url: str, timeout: float = 0.5) -> bool:
+    """Verifica se há um servidor aceitando conexões no host e porta da URL."""
+    parsed = urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        with socket.create_connection((parsed.hostname, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def connection_params(server_path: str, url_variable: str):
+    """Parâmetros de conexão do MCPToolset: o servidor HTTP persistente, se configurado e no ar, ou stdio.
+
+    Args:
+        server_path(str): Caminho do script do servidor MCP, iniciado com `uv run` no modo stdio.
+        url_variable(str): Variável de ambiente com a URL do servidor persistente.
+
+    Returns:
+        StreamableHTTPConnectionParams | StdioConnectionParams: Os parâmetros de conexão.
+    """
+    from google.adk.tools.mcp_tool.mcp_toolset import (
+        StdioConnectionParams,
+        StdioServerParameters,
+        StreamableHTTPConnectionParams
+    )
+
+    url = os.getenv(url_variable)
+    if url:
+        if server_reachable(url):
+            return StreamableHTTPConnectionParams(url=url, timeout=120)
+        logging.warning(f"Servidor MCP em {url} não está respondendo; iniciando {server_path} via stdio.")
+    return StdioConnectionParams(
+        server_params=StdioServerParameters(
+            command="uv",
+            args=["run", server_path],
+            # O .env do agente pode ter MCP_TRANSPORT=http para o servidor persistente; o processo filho usa stdio.
+            env={"MCP_TRANSPORT": STDIO}
+        ),
+        timeout=120
+    )
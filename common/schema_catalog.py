@@ -0,0 +1,235 @@
+"""Catálogo compacto do schema das tabelas, usado para montar os prompts de conversão para SQL.
+
+O catálogo parte de um arquivo JSON com as tabelas, colunas, descrições e relacionamentos, e pode
+ser sincronizado com os metadados do BigQuery (`client.get_table(table_id).schema`): tipos e
+colunas passam a refletir as tabelas reais, e as descrições do JSON completam as que faltarem.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+
+from common.semantic_cache import STOPWORDS, HashingEmbedder, _strip_accents
+
+DEFAULT_COLUMN_THRESHOLD = 0.25
+TIE_RATIO = 0.95
+TERM_PATTERN = re.compile(r"[^\W\d_]{3,}")
+# Palavras que descrevem a agregação pedida, e não uma coluna: casariam com nomes como 'total_debt'.
+AGGREGATION_TERMS = frozenset(
+    "total totais soma media medias numero quantidade contagem maior maiores menor menores "
+    "maximo minimo top ranking".split()
+)
+
+
+@dataclass
+class Column:
+    name: str
+    type: str
+    description: str = ""
+
+
+@dataclass
+class Table:
+    table_id: str
+    description: str = ""
+    columns: list[Column] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return self.table_id.rsplit(".", 1)[1]
+
+
+def _split_reference(reference: str) -> tuple[str, str]:
+    table_id, _, column = reference.rpartition(".")
+    return table_id, column
+
+
+class SchemaCatalog:
+    """Tabelas e relacionamentos do banco, com seleção das tabelas relevantes para cada pergunta.
+
+    Cada coluna é indexada pelo nome da tabela, pelo nome da coluna e pela descrição. Os termos da
+    pergunta são comparados a esse índice: entram no prompt as tabelas das colunas encontradas, as
+    tabelas necessárias para ligá-las pelos relacionamentos, e a descrição apenas dessas colunas.
+    """
+
+    def __init__(self, tables: list[Table], relationships: list[list[str]], embedder=None):
+        self.tables = {table.table_id: table for table in tables}
+        self.relationships = relationships
+        self.embedder = embedder or HashingEmbedder()
+        self.column_threshold = float(os.getenv("SCHEMA_COLUMN_THRESHOLD", DEFAULT_COLUMN_THRESHOLD))
+        self.sync_enabled = os.getenv("SCHEMA_CATALOG_SYNC", "false").lower() == "true"
+        self._sync_client = None
+        self._sync_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._build_index()
+
+    @classmethod
+    def load(cls, path: str, embedder=None) -> "SchemaCatalog":
+        with open(path) as catalog_file:
+            data = json.load(catalog_file)
+        tables = [
+            Table(table["table_id"], table.get("description", ""), [Column(**column) for column in table["columns"]])
+            for table in data["tables"]
+        ]
+        return cls(tables, data.get("relationships", []), embedder)
+
+    def _build_index(self) -> None:
+        self._entries = [
+            (table.table_id, column.name)
+            for table in self.tables.values()
+            for column in table.columns
+        ]
+        documents = [
+            f"{self.tables[table_id].name.replace('-', ' ')} {self.tables[table_id].description} "
+            f"{column_name.replace('_', ' ')} {self._column(table_id, column_name).description}"
+            for table_id, column_name in self._entries
+        ]
+        vectors = self.embedder.embed(documents) if documents else np.zeros((0, 1), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self._vectors = vectors / np.where(norms == 0, 1, norms)
+
+    def _column(self, table_id: str, column_name: str) -> Column:
+        return next(column for column in self.tables[table_id].columns if column.name == column_name)
+
+    def sync(self, client) -> None:
+        """Atualiza tipos e colunas a partir dos metadados do BigQuery, mantendo as descrições conhecidas."""
+        with self._lock:
+            for table in self.tables.values():
+                try:
+                    metadata = client.get_table(table.table_id)
+                except Exception as e:
+                    logging.warning(f"Catálogo: não foi possível ler os metadados de {table.table_id}: {e}")
+                    continue
+                known = {column.name: column for column in table.columns}
+                table.columns = [
+                    Column(
+                        name=schema_field.name,
+                        type=schema_field.field_type,
+                        description=schema_field.description or getattr(known.get(schema_field.name), "description", "")
+                    )
+                    for schema_field in metadata.schema
+                ]
+                table.description = getattr(metadata, "description", None) or table.description
+            self._build_index()
+        logging.info(f"Catálogo: schema sincronizado com o BigQuery ({len(self.tables)} tabelas).")
+
+    def sync_with(self, client) -> None:
+        """Agenda a sincronização com o BigQuery (se SCHEMA_CATALOG_SYNC=true) para o primeiro uso do catálogo."""
+        if self.sync_enabled:
+            self._sync_client = client
+
+    def ensure_synced(self) -> None:
+        """Executa a sincronização agendada por `sync_with`, uma única vez."""
+        with self._sync_lock:
+            client, self._sync_client = self._sync_client, None
+            if client is not None:
+                self.sync(client)
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash do catálogo completo, que muda sempre que alguma tabela, coluna ou descrição muda."""
+        self.ensure_synced()
+        data = json.dumps([asdict(table) for table in self.tables.values()], sort_keys=True)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _connect_tables(self, selected: list[str]) -> list[str]:
+        """Adiciona as tabelas intermediárias necessárias para ligar as selecionadas pelos relacionamentos."""
+        graph = {table_id: set() for table_id in self.tables}
+        for left, right in self.relationships:
+            left_table, right_table = _split_reference(left)[0], _split_reference(right)[0]
+            graph.setdefault(left_table, set()).add(right_table)
+            graph.setdefault(right_table, set()).add(left_table)
+
+        connected = list(selected[:1])
+        for target in selected[1:]:
+            if target in connected:
+                continue
+            previous = {connected[0]: None}
+            queue = deque([connected[0]])
+            while queue and target not in previous:
+                current = queue.popleft()
+                for neighbor in graph.get(current, ()):
+                    if neighbor not in previous:
+                        previous[neighbor] = current
+                        queue.append(neighbor)
+            node = target if target in previous else None
+            path = []
+            while node is not None:
+                path.append(node)
+                node = previous[node]
+            connected.extend(table_id for table_id in reversed(path) if table_id not in connected)
+            if target not in connected:
+                connected.append(target)
+        return connected
+
+    def select(self, question: str) -> tuple[list[str], set[tuple[str, str]]]:
+        """Seleciona as tabelas e colunas relevantes para a pergunta.
+
+        Cada termo da pergunta vota nas colunas mais parecidas com ele no índice (a melhor e as quase
+        empatadas com ela), desde que a similaridade passe de `column_threshold`. Se nenhum termo votar, todas as tabelas são usadas.
+
+        Returns:
+            tuple: Os ids das tabelas selecionadas e os pares (tabela, coluna) relevantes.
+        """
+        self.ensure_synced()
+        terms = list(dict.fromkeys(
+            term for term in TERM_PATTERN.findall(_strip_accents(question.lower()))
+            if term not in STOPWORDS and term not in AGGREGATION_TERMS
+        ))
+        with self._lock:
+            if not terms or not self._entries:
+                return list(self.tables), set()
+            term_vectors = self.embedder.embed(terms)
+            norms = np.linalg.norm(term_vectors, axis=1, keepdims=True)
+            scores = (term_vectors / np.where(norms == 0, 1, norms)) @ self._vectors.T
+            entries = list(self._entries)
+
+        votes = (scores >= self.column_threshold) & (scores >= scores.max(axis=1, keepdims=True) * TIE_RATIO)
+        relevant_columns = {entries[index] for index in np.flatnonzero(votes.any(axis=0))}
+        if not relevant_columns:
+            return list(self.tables), set()
+        selected = list(dict.fromkeys(table_id for table_id, _ in sorted(relevant_columns, key=entries.index)))
+        return self._connect_tables(selected), relevant_columns
+
+    def render(self, table_ids: list[str] | None = None, relevant_columns: set | None = None) -> str:
+        """Renderiza as tabelas de forma compacta: uma linha por tabela e colunas como 'nome TIPO'.
+
+        Apenas as colunas relevantes (ou todas, se `relevant_columns` for None) trazem a descrição.
+        """
+        lines = []
+        table_ids = table_ids or list(self.tables)
+        for table_id in table_ids:
+            table = self.tables[table_id]
+            lines.append(f"`{table_id}` -- {table.description}")
+            for column in table.columns:
+                described = relevant_columns is None or (table_id, column.name) in relevant_columns
+                description = f": {column.description}" if described and column.description else ""
+                lines.append(f"  {column.name} {column.type}{description}")
+        relationships = [
+            f"  {left} = {right}" for left, right in self.relationships
+            if _split_reference(left)[0] in table_ids and _split_reference(right)[0] in table_ids
+        ]
+        if relationships:
+            lines.append("Relacionamentos:")
+            lines.extend(relationships)
+        return "\n".join(lines)
+
+    def prompt_for(self, question: str) -> str:
+        """Schema compacto, só com as tabelas e descrições relevantes para a pergunta."""
+        table_ids, relevant_columns = self.select(question)
+        logging.info(f"Catálogo: tabelas selecionadas para a pergunta: {[self.tables[table_id].name for table_id in table_ids]}")
+        return self.render(table_ids, relevant_columns)
+
+    def summary(self, indent: str = "") -> str:
+        """Resumo de uma linha por tabela (descrição e nomes das colunas), usado nos prompts dos agentes."""
+        return "\n".join(
+            f"{indent}- `{table.table_id}` ({table.description.rstrip('.')}): {', '.join(column.name for column in table.columns)}"
+            for table in self.tables.values()
+        )
@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from common.llm_cache import TranslationCache, hash_text, normalize_question
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_DIMENSIONS = 1024
+LITERAL_PATTERN = re.compile(r"\d+(?:[.,]\d+)?|'[^']*'|\"[^\"]*\"")
+# Palavras que invertem ou trocam o filtro da pergunta: mesmo com similaridade alta, perguntas que diferem
+# nelas ("com chip"/"sem chip", "crédito"/"débito", "crescente"/"decrescente") pedem SQLs diferentes.
+POLARITY_WORDS = frozenset(
+    "nao sem nunca nenhum nenhuma exceto excluindo fora not without except never "
+    "credito debito crescente decrescente asc desc maior maiores menor menores mais menos "
+    "maximo minimo primeiro primeiros ultimo ultimos acima abaixo antes depois "
+    "online presencial chip swipe masculino feminino homens mulheres".split()
+)
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de da do das dos em na no nas nos ao aos pela pelo pelas pelos "
+    "por para com e ou que qual quais quanto quantos quantas eh sao foi foram me mostre liste "
+    "the of in on for by to and what which show list".split()
+)
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def question_literals(question: str) -> frozenset[str]:
+    """Números e textos entre aspas da pergunta, que precisam ser iguais para reaproveitar uma SQL."""
+    return frozenset(LITERAL_PATTERN.findall(normalize_question(question)))
+
+
+def question_polarity(question: str) -> frozenset[str]:
+    """Negações e valores de filtro opostos presentes na pergunta (ver POLARITY_WORDS)."""
+    return frozenset(re.findall(r"\w+", _strip_accents(normalize_question(question)))) & POLARITY_WORDS
+
+
+class HashingEmbedder:
+    """Embedder local e determinístico: palavras e trigramas de caracteres projetados por hash num vetor fixo.
+
+    Palavras sem conteúdo (artigos, preposições, pronomes interrogativos) são ignoradas.
+    Captura variações de flexão, acentuação e ordem das palavras, mas não sinônimos, e dá
+    similaridade alta a perguntas opostas ("com chip"/"sem chip"); por isso não é usado por
+    padrão, só quando passado explicitamente ao `SemanticCache`.
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _features(self, text: str):
+        for word in re.findall(r"\w+", _strip_accents(normalize_question(text))):
+            if word in STOPWORDS:
+                continue
+            yield word, 1.0
+            padded = f"#{word}#"
+            for start in range(len(padded) - 2):
+                yield padded[start:start + 3], 0.5
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                sign = 1.0 if digest >> 63 else -1.0
+                vectors[row, digest % self.dimensions] += sign * weight
+        return vectors
+
+
+class LangchainEmbedder:
+    """Adapta um modelo de embeddings do LangChain (`embed_documents`) à interface `embed`."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def embedder_from_env():
+    """Usa o modelo de SEMANTIC_CACHE_EMBEDDING_MODEL (Gemini) quando definido; caso contrário, None."""
+    model_name = os.getenv("SEMANTIC_CACHE_EMBEDDING_MODEL")
+    if not model_name:
+        return None
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return LangchainEmbedder(GoogleGenerativeAIEmbeddings(model=model_name))
+
+
+class VectorIndex:
+    """Índice em memória de vetores normalizados, com busca por similaridade de cosseno."""
+
+    def __init__(self):
+        self._vectors = None
+        self._size = 0
+        self.payloads: list = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, vectors: np.ndarray, payloads: list) -> None:
+        vectors = _normalize(vectors)
+        if self._vectors is None:
+            self._vectors = np.empty((max(64, len(vectors)), vectors.shape[1]), dtype=np.float32)
+        needed = self._size + len(vectors)
+        if needed > len(self._vectors):
+            grown = np.empty((max(needed, 2 * len(self._vectors)), self._vectors.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._vectors[self._size:needed] = vectors
+        self._size = needed
+        self.payloads.extend(payloads)
+
+    def search(self, vector: np.ndarray, top_k: int = 5) -> list[tuple[float, object]]:
+        if not self._size:
+            return []
+        scores = self._vectors[:self._size] @ _normalize(vector.reshape(1, -1))[0]
+        top_k = min(top_k, self._size)
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[i]), self.payloads[i]) for i in best]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class SemanticCache:
+    """Camada de busca por similaridade na frente do TranslationCache.
+
+    Uma pergunta sem correspondência exata reaproveita a resposta da pergunta já traduzida
+    mais parecida, desde que a similaridade atinja `threshold` e que as duas perguntas tenham
+    os mesmos números e textos entre aspas e as mesmas negações e valores de filtro opostos
+    (`question_polarity`).
+    O índice é reconstruído a partir do cache persistente na primeira consulta e sempre que
+    o template muda.
+
+    Só fica ativo com um embedder: o modelo de SEMANTIC_CACHE_EMBEDDING_MODEL ou um passado
+    explicitamente. Sem ele, apenas o cache de perguntas idênticas é usado.
+    """
+
+    def __init__(self, cache: TranslationCache, embedder=None, threshold: float | None = None):
+        self.cache = cache
+        self.embedder = embedder or embedder_from_env()
+        self.threshold = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD") or DEFAULT_THRESHOLD)
+        self.enabled = self.embedder is not None and os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() != "false"
+        self.semantic_hits = 0
+        self._index = VectorIndex()
+        self._template_hash = None
+        self._lock = threading.Lock()
+
+    def _load(self, template: str) -> None:
+        template_hash = hash_text(template)
+        if template_hash == self._template_hash:
+            return
+        self._index = VectorIndex()
+        entries = self.cache.entries(template)
+        if entries:
+            questions = [question for question, _ in entries]
+            self._index.add(
+                self.embedder.embed(questions),
+                [(question, question_literals(question), question_polarity(question), response) for question, response in entries]
+            )
+        self._template_hash = template_hash
+        logging.info(f"Cache semântico ({self.cache.namespace}): índice carregado com {len(entries)} perguntas.")
+
+    def lookup(self, question: str, template: str) -> str | None:
+        """Retorna a resposta da pergunta semelhante mais próxima, ou None se nenhuma atingir o limiar."""
+        with self._lock:
+            self._load(template)
+            if not len(self._index):
+                return None
+            literals, polarity = question_literals(question), question_polarity(question)
+            for score, (cached_question, cached_literals, cached_polarity, response) in self._index.search(self.embedder.embed([question])[0]):
+                if score < self.threshold:
+                    break
+                if cached_literals == literals and cached_polarity == polarity:
+                    self.semantic_hits += 1
+                    logging.info(f"Cache semântico ({self.cache.namespace}): '{question}' ~ '{cached_question}' ({score:.3f}).")
+                    return response
+        return None
+
+    def _remember(self, question: str, template: str, response: str) -> None:
+        self.cache.put(question, template, response)
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._template_hash == hash_text(template):
+                normalized = normalize_question(question)
+                self._index.add(
+                    self.embedder.embed([normalized]),
+                    [(normalized, question_literals(normalized), question_polarity(normalized), response)]
+                )
+
+    def get_or_create(self, question: str, template: str, create) -> str:
+        """Busca por pergunta idêntica, depois por pergunta semelhante; só chama `create()` se ambas falharem."""
+        response = self.cache.get(question, template)
+        if response is not None:
+            return response
+        if self.enabled and self.cache.enabled:
+            response = self.lookup(question, template)
+        if response is None:
+            response = create()
+        self._remember(question, template, response)
+        return response
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "semantic_hits": self.semantic_hits, "indexed": len(self._index)}
@@ -0,0 +1,111 @@
+"""Tradução das construções mais comuns do SQL do BigQuery para o dialeto do DuckDB."""
+import re
+
+from common.bq_cache import STRING_LITERAL_PATTERN
+
+PLACEHOLDER = "\x00{}\x00"
+PLACEHOLDER_PATTERN = re.compile("\x00(\\d+)\x00")
+
+
+def _protect_literals(sql: str, table_names: dict[str, str]) -> tuple[str, list[str]]:
+    """Substitui literais e identificadores entre crases por marcadores, já convertidos para o DuckDB."""
+    literals = []
+
+    def protect(match: re.Match) -> str:
+        text = match.group(0)
+        if text.startswith("`"):
+            name = text[1:-1]
+            converted = f'"{table_names[name]}"' if name in table_names else '"' + name.replace('"', '""') + '"'
+        else:
+            content = re.sub(r"\\(.)", r"\1", text[1:-1])
+            converted = "'" + content.replace("'", "''") + "'"
+        literals.append(converted)
+        return PLACEHOLDER.format(len(literals) - 1)
+
+    return STRING_LITERAL_PATTERN.sub(protect, sql), literals
+
+
+def _restore_literals(code: str, literals: list[str]) -> str:
+    return PLACEHOLDER_PATTERN.sub(lambda match: literals[int(match.group(1))], code)
+
+
+def _rewrite_calls(code: str, names: str, build) -> str:
+    """Reescreve as chamadas das funções `names` com `build(nome, argumentos)`, respeitando parênteses aninhados."""
+    pattern = re.compile(rf"\b({names})\s*\(", re.IGNORECASE)
+    parts = []
+    position = 0
+    while (match := pattern.search(code, position)) is not None:
+        depth, index, argument_start, arguments = 1, match.end(), match.end(), []
+        while index < len(code) and depth:
+            char = code[index]
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif char == "," and depth == 1:
+                arguments.append(code[argument_start:index])
+                argument_start = index + 1
+            index += 1
+        if depth:
+            break
+        arguments.append(code[argument_start:index - 1])
+        arguments = [_rewrite_calls(argument, names, build).strip() for argument in arguments]
+        parts.append(code[position:match.start()])
+        parts.append(build(match.group(1).upper(), arguments) or code[match.start():index])
+        position = index
+    parts.append(code[position:])
+    return "".join(parts)
+
+
+def _part(argument: str) -> str:
+    return "'" + argument.strip().lower() + "'"
+
+
+def _translate_function(name: str, arguments: list[str]) -> str | None:
+    if name.endswith("_TRUNC") and len(arguments) == 2:
+        return f"date_trunc({_part(arguments[1])}, {arguments[0]})"
+    if name.endswith("_DIFF") and len(arguments) == 3:
+        return f"date_diff({_part(arguments[2])}, {arguments[1]}, {arguments[0]})"
+    if name.endswith("_ADD") and len(arguments) == 2:
+        return f"({arguments[0]} + {arguments[1]})"
+    if name.endswith("_SUB") and len(arguments) == 2:
+        return f"({arguments[0]} - {arguments[1]})"
+    if name.startswith("FORMAT_") and len(arguments) >= 2:
+        return f"strftime({arguments[1]}, {arguments[0]})"
+    if name == "PARSE_DATE" and len(arguments) == 2:
+        return f"CAST(strptime({arguments[1]}, {arguments[0]}) AS DATE)"
+    if name.startswith("PARSE_") and len(arguments) == 2:
+        return f"strptime({arguments[1]}, {arguments[0]})"
+    if name == "SAFE_DIVIDE" and len(arguments) == 2:
+        return f"(({arguments[0]}) / NULLIF({arguments[1]}, 0))"
+    if name == "EXTRACT" and re.match(r"DAYOFWEEK\s+FROM\b", arguments[0], re.IGNORECASE):
+        return f"(EXTRACT({arguments[0]}) + 1)"
+    return None
+
+
+FUNCTION_NAMES = (
+    "DATE_TRUNC|DATETIME_TRUNC|TIMESTAMP_TRUNC|DATE_DIFF|DATETIME_DIFF|TIMESTAMP_DIFF|"
+    "DATE_ADD|DATETIME_ADD|TIMESTAMP_ADD|DATE_SUB|DATETIME_SUB|TIMESTAMP_SUB|"
+    "FORMAT_DATE|FORMAT_DATETIME|FORMAT_TIMESTAMP|PARSE_DATE|PARSE_DATETIME|PARSE_TIMESTAMP|"
+    "SAFE_DIVIDE|EXTRACT"
+)
+
+
+def bigquery_to_duckdb(sql: str, table_names: dict[str, str]) -> str:
+    """Converte uma query do BigQuery para o DuckDB.
+
+    Args:
+        sql(str): Query no dialeto do BigQuery.
+        table_names(dict): Nome da view local para cada tabela `projeto.dataset.tabela` referenciada.
+
+    Returns:
+        str: A query equivalente no dialeto do DuckDB.
+    """
+    code, literals = _protect_literals(sql, table_names)
+    for table_id, view_name in table_names.items():
+        code = re.sub(rf"(?<![\w.\-]){re.escape(table_id)}(?![\w\-])", f'"{view_name}"', code)
+    code = _rewrite_calls(code, FUNCTION_NAMES, _translate_function)
+    code = re.sub(r"\bSAFE_CAST\s*\(", "TRY_CAST(", code, flags=re.IGNORECASE)
+    code = re.sub(r"\bFLOAT64\b", "DOUBLE", code, flags=re.IGNORECASE)
+    code = re.sub(r"\bAS\s+(BIG)?NUMERIC\b", "AS DECIMAL(38, 9)", code, flags=re.IGNORECASE)
+    return _restore_literals(code, literals)
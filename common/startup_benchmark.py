@@ -0,0 +1,68 @@
+"""Benchmark do tempo de inicialização dos servidores MCP: até o handshake e até a resposta do `list_tools`.
+
+Cada servidor é iniciado via stdio, como fazem os agentes, com o aquecimento em segundo plano
+desativado para não interferir na medição. Para usar como verificação de regressão, informe o
+tempo máximo aceitável; o comando termina com código 1 se algum servidor passar dele:
+
+    python -m common.startup_benchmark --runs 5 --max-seconds 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVERS = [
+    ROOT / "data_agent" / "mcp_server" / "etl.py",
+    ROOT / "analytics_agent" / "mcp_server" / "analytics.py",
+    ROOT / "legal_agent" / "mcp_server" / "legal.py"
+]
+
+
+async def measure(server_path: Path) -> tuple[float, float]:
+    """Retorna os segundos até o fim do handshake e até a resposta do `list_tools`."""
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[str(server_path)],
+        env={**os.environ, "MCP_TRANSPORT": "stdio", "MCP_WARMUP": "false"},
+        cwd=str(server_path.parent)
+    )
+    start = time.perf_counter()
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                initialized = time.perf_counter() - start
+                await session.list_tools()
+                listed = time.perf_counter() - start
+    return initialized, listed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("servers", nargs="*", type=Path, default=SERVERS, help="Scripts dos servidores MCP.")
+    parser.add_argument("--runs", type=int, default=3, help="Quantidade de inicializações por servidor.")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Tempo máximo aceitável até o list_tools (mediana).")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'servidor':<16}{'handshake (s)':>16}{'list_tools (s)':>16}")
+    for server_path in args.servers:
+        results = [asyncio.run(measure(server_path)) for _ in range(args.runs)]
+        initialized = statistics.median(result[0] for result in results)
+        listed = statistics.median(result[1] for result in results)
+        over_limit = args.max_seconds is not None and listed > args.max_seconds
+        failed = failed or over_limit
+        print(f"{server_path.stem:<16}{initialized:>16.2f}{listed:>16.2f}{'  acima do limite' if over_limit else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
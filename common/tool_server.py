@@ -0,0 +1,332 @@
+"""Base comum dos servidores MCP dos agentes: registro das tools, execução, middlewares e transporte.
+
+Cada servidor (etl, analytics, legal) só declara as suas tools e as políticas de execução delas:
+
+    server = ToolServer("analytics_server", tools={"get_analysis": get_analysis}, default_port=8102)
+
+    if __name__ == "__main__":
+        server.run()
+
+O `ToolServer` cuida do resto: gera os schemas MCP das tools uma única vez (e os guarda em disco,
+para que o servidor não precise importar o ADK a cada inicialização), executa cada chamada no
+backend definido pela `ToolPolicy` com o tempo limite configurado, passa as chamadas pelos
+middlewares (métricas, cache de respostas ou outros) e atende via stdio ou HTTP.
+"""
+import asyncio
+import functools
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import logging
+import os
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import mcp.server.stdio
+
+from mcp import types as mcp_types
+from mcp.server.lowlevel import NotificationOptions, Server
+from mcp.server.models import InitializationOptions
+
+from common.executor import ToolExecutor, ToolPolicy
+from common.mcp_transport import http_transport_enabled, run_mcp_http_server
+
+SCHEMA_CACHE_FILE = ".tool_schemas.json"
+SCHEMA_CACHE_VERSION = 1
+ERROR_PREFIX = "Ocorreu um erro"
+DEFAULT_RESPONSE_CACHE_ENTRIES = 256
+
+
+def _package_version(name: str) -> str:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return ""
+
+
+def tool_fingerprint(name: str, func) -> str:
+    """Hash do que define o schema de uma tool: nome, assinatura, docstring e versões do ADK e do MCP."""
+    parts = [
+        name,
+        func.__qualname__,
+        str(inspect.signature(func)),
+        inspect.getdoc(func) or "",
+        _package_version("google-adk"),
+        _package_version("mcp")
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class ToolSchemaCache:
+    """Schemas MCP das tools, gerados pelo ADK uma única vez e guardados em disco.
+
+    Gerar os schemas exige importar o ADK, que leva vários segundos; com o arquivo válido, o
+    servidor responde o `list_tools` sem importá-lo. Cada schema é regerado quando a assinatura
+    ou a docstring da função mudam, ou quando o ADK ou o MCP são atualizados.
+    """
+
+    def __init__(self, path: str | Path | None):
+        self.path = Path(path) if path else None
+        self._schemas: list[mcp_types.Tool] | None = None
+
+    def schemas(self, tools: dict) -> list[mcp_types.Tool]:
+        if self._schemas is None:
+            self._schemas = self._load_or_build(tools)
+        return self._schemas
+
+    def _read(self) -> dict:
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Schemas das tools: arquivo {self.path} ignorado: {e}")
+            return {}
+        return data.get("tools", {}) if data.get("version") == SCHEMA_CACHE_VERSION else {}
+
+    def _write(self, entries: dict) -> None:
+        if self.path is None:
+            return
+        temporary_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            temporary_path.write_text(
+                json.dumps({"version": SCHEMA_CACHE_VERSION, "tools": entries}, ensure_ascii=False, indent=2),
+                encoding="utf-8"
+            )
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            logging.warning(f"Schemas das tools: não foi possível gravar {self.path}: {e}")
+
+    def _load_or_build(self, tools: dict) -> list[mcp_types.Tool]:
+        stored = self._read()
+        entries = {}
+        schemas = []
+        rebuilt = []
+        for name, func in tools.items():
+            fingerprint = tool_fingerprint(name, func)
+            entry = stored.get(name)
+            if not entry or entry.get("fingerprint") != fingerprint:
+                entry = {"fingerprint": fingerprint, "schema": self._build(name, func)}
+                rebuilt.append(name)
+            entries[name] = entry
+            schemas.append(mcp_types.Tool.model_validate(entry["schema"]))
+
+        if rebuilt or entries.keys() != stored.keys():
+            self._write(entries)
+        logging.info(f"Schemas das tools: {len(schemas) - len(rebuilt)} do cache, {len(rebuilt)} gerados {rebuilt}.")
+        return schemas
+
+    @staticmethod
+    def _build(name: str, func) -> dict:
+        from google.adk.tools.function_tool import FunctionTool
+        from google.adk.tools.mcp_tool.conversion_utils import adk_to_mcp_tool_type
+
+        adk_tool = FunctionTool(func=func)
+        if not adk_tool.name:
+            adk_tool.name = name
+        return adk_to_mcp_tool_type(adk_tool).model_dump(mode="json", exclude_none=True)
+
+
+@dataclass
+class ToolMetrics:
+    calls: int = 0
+    errors: int = 0
+    cancelled: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+class MetricsMiddleware:
+    """Conta as chamadas, os erros e o tempo de execução de cada tool e registra cada chamada no log."""
+
+    def __init__(self):
+        self.tools: dict[str, ToolMetrics] = {}
+
+    async def __call__(self, name: str, arguments: dict, call_next):
+        metrics = self.tools.setdefault(name, ToolMetrics())
+        start = time.perf_counter()
+        try:
+            return await call_next(name, arguments)
+        except asyncio.CancelledError:
+            metrics.cancelled += 1
+            raise
+        except Exception:
+            metrics.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.calls += 1
+            metrics.total_seconds += elapsed
+            metrics.max_seconds = max(metrics.max_seconds, elapsed)
+            logging.info(f"Métricas: tool {name} levou {elapsed:.3f}s.")
+
+    def summary(self) -> str:
+        return "\n".join(
+            f"{name}: {metrics.calls} chamadas, {metrics.errors} erros, {metrics.cancelled} canceladas, "
+            f"média {metrics.total_seconds / metrics.calls:.3f}s, máximo {metrics.max_seconds:.3f}s"
+            for name, metrics in self.tools.items() if metrics.calls
+        )
+
+
+class ResponseCacheMiddleware:
+    """Reaproveita a resposta de chamadas idênticas (mesma tool e mesmos argumentos) por um tempo limitado.
+
+    Só vale para as tools cuja `ToolPolicy` define `cache_ttl_seconds`. Respostas de erro
+    (exceções ou textos que começam com "Ocorreu um erro") não são guardadas.
+    """
+
+    def __init__(self, policy_for, max_entries: int | None = None):
+        self.policy_for = policy_for
+        self.max_entries = max_entries or int(os.getenv("MCP_RESPONSE_CACHE_ENTRIES", DEFAULT_RESPONSE_CACHE_ENTRIES))
+        self._responses: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    async def __call__(self, name: str, arguments: dict, call_next):
+        ttl = self.policy_for(name).cache_ttl_seconds
+        if not ttl:
+            return await call_next(name, arguments)
+
+        key = f"{name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+        cached = self._responses.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            self._responses.move_to_end(key)
+            logging.info(f"Cache de respostas: tool {name} respondida do cache.")
+            return cached[1]
+
+        response = await call_next(name, arguments)
+        if not (isinstance(response, str) and response.startswith(ERROR_PREFIX)):
+            self._responses[key] = (time.monotonic(), response)
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+        return response
+
+
+class ToolServer:
+    """Servidor MCP com as tools registradas, executadas pelo `ToolExecutor` através dos middlewares.
+
+    Os middlewares são chamados na ordem da lista, como `await middleware(name, arguments, call_next)`,
+    e podem alterar os argumentos, responder sem executar a tool ou tratar o resultado. Por padrão,
+    toda chamada passa pelo `MetricsMiddleware` e pelo `ResponseCacheMiddleware`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        tools: dict,
+        default_port: int,
+        policies: dict[str, ToolPolicy] | None = None,
+        schema_cache_path: str | Path | None = None,
+        middlewares: list | None = None,
+        warm_up=None,
+        on_shutdown: list | None = None
+    ):
+        self.app = Server(name)
+        self.default_port = default_port
+        self.tools = {}
+        self.executor = ToolExecutor(policies=policies)
+        self.schema_cache = ToolSchemaCache(schema_cache_path)
+        self.metrics = MetricsMiddleware()
+        self.middlewares = [self.metrics, ResponseCacheMiddleware(self.executor.policy), *(middlewares or [])]
+        self.warm_up = warm_up
+        self.on_shutdown = list(on_shutdown or [])
+        for tool_name, func in tools.items():
+            self.register(tool_name, func)
+
+        self.app.list_tools()(self.list_tools)
+        self.app.call_tool()(self.call_tool)
+
+    def register(self, name: str, func, policy: ToolPolicy | None = None) -> None:
+        """Registra a função `func` como a tool `name`, opcionalmente com a sua política de execução."""
+        self.tools[name] = func
+        if policy is not None:
+            self.executor.policies[name] = policy
+
+    async def list_tools(self) -> list[mcp_types.Tool]:
+        """MCP handler que lista as tools que este server expõe."""
+        logging.info("MCP Server: Iniciou a listagem de tools.")
+        if self.warm_up is not None:
+            self.warm_up.start()
+        return self.schema_cache.schemas(self.tools)
+
+    async def _execute(self, name: str, arguments: dict):
+        return await self.executor.run(name, self.tools[name], arguments)
+
+    async def call_tool(self, name: str, arguments: dict) -> list[mcp_types.TextContent]:
+        """MCP handler para executar a chamada da tool solicitada pelo MCP client."""
+        logging.info(f"MCP Server: Iniciou a chamada da tool {name} com os args: {arguments}")
+
+        if name not in self.tools:
+            logging.error(f"MCP Server: Erro ao executar tool. Tool não implementada.")
+            return self._error(f"Tool não implementada neste servidor.")
+
+        call = self._execute
+        for middleware in reversed(self.middlewares):
+            call = functools.partial(middleware, call_next=call)
+        try:
+            response = await call(name, arguments)
+        except asyncio.CancelledError:
+            logging.warning(f"MCP Server: Chamada da tool {name} cancelada pelo cliente.")
+            raise
+        except Exception as e:
+            logging.error(f"MCP Server: Erro ao executar tool {name}. Resposta: {e}")
+            return self._error(f"Falha ao executar tool '{name}': {str(e)}")
+
+        logging.info(f"MCP Server: Tool {name} executada. Resposta: {response}")
+        return [mcp_types.TextContent(type="text", text=json.dumps(response, indent=2))]
+
+    @staticmethod
+    def _error(message: str) -> list[mcp_types.TextContent]:
+        payload = {
+            "success": False,
+            "message": message
+        }
+        return [mcp_types.TextContent(type="text", text=json.dumps(payload))]
+
+    async def run_stdio(self) -> None:
+        """Executa o MCP server, trabalhando no stdio"""
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await self.app.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name=self.app.name,
+                    server_version="0.1.0",
+                    capabilities=self.app.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={}
+                    )
+                )
+            )
+
+    async def serve(self) -> None:
+        """Executa o MCP server no stdio ou, com MCP_TRANSPORT=http, como servidor HTTP persistente."""
+        if http_transport_enabled():
+            await run_mcp_http_server(self.app, default_port=self.default_port)
+        else:
+            await self.run_stdio()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()
+        for callback in self.on_shutdown:
+            try:
+                callback()
+            except Exception as e:
+                logging.warning(f"Falha ao encerrar {getattr(callback, '__name__', callback)}: {e}")
+        summary = self.metrics.summary()
+        if summary:
+            logging.info(f"Métricas das tools nesta execução:\n{summary}")
+
+    def run(self) -> None:
+        """Ponto de entrada do script do servidor: atende até o cliente encerrar e libera os recursos."""
+        logging.info(f"Iniciando servidor MCP.")
+        try:
+            asyncio.run(self.serve())
+        except Exception as e:
+            logging.critical(f"Servidor MCP encontrou um erro não tratado: {e}", exc_info=True)
+        finally:
+            self.shutdown()
+            logging.info(f"Servidor MCP encerrando.")
@@ -1,9 +1,11 @@
 from pathlib import Path
 
 from google.adk.agents import LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters, StdioConnectionParams
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
 from dotenv import load_dotenv
 
+from common.mcp_transport import connection_params
+
 load_dotenv()
 PATH_TO_MCP_SERVER = str((Path(__file__).parent / "mcp_server" / "etl.py").resolve())
 
@@ -15,6 +17,11 @@ prompt = """
     - Ao iniciar uma conversa, apresente-se e liste as ferramentas que pode executar com uma breve explicação do que fazem.
     - Ao executar alguma ferramenta, retorne um pequeno resumo do que foi feito.
     - Caso alguma ferramenta retorne exemplos, utilize-os na resposta final. Quando possível, formate os exemplos como tabelas
+    - Para conhecer uma tabela, prefira 'profile_table', que retorna schema, nulos, valores distintos, mínimo, máximo e exemplos numa única leitura.
+    - Quando a mesma transformação precisar ser aplicada em várias colunas, utilize 'fill_null_batch' ou 'remove_symbols_batch' numa única chamada, em vez de chamar 'fill_null' ou 'remove_symbols' coluna a coluna.
+    - Para gerar o modelo final de dados (star schema) a partir das tabelas extraídas, utilize 'build_star_schema'.
+    - Ao aplicar mais de uma transformação na mesma tabela, abra uma sessão com 'start_table_session', aplique as transformações e grave todas de uma vez com 'commit_table' (ou descarte-as com 'rollback_table').
+    - As transformações são aplicadas numa cópia de trabalho da tabela. Ao concluir o tratamento de uma tabela, exporte-a de volta para CSV com 'export_table'.
 </Instruções>
 """
 
@@ -25,13 +32,7 @@ root_agent = LlmAgent(
     instruction=prompt,
     tools=[
         MCPToolset(
-            connection_params=StdioConnectionParams(
-                server_params=StdioServerParameters(
-                    command="uv",
-                    args=["run", PATH_TO_MCP_SERVER]
-                ),
-                timeout=120
-            )
+            connection_params=connection_params(PATH_TO_MCP_SERVER, "DATA_MCP_SERVER_URL")
         )
     ]
 )
\ No newline at end of file
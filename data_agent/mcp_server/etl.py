@@ -1,36 +1,143 @@
-import asyncio
-import json
+from __future__ import annotations
+
 import os
+import sys
 import logging
-import pandas as pd
-
-import mcp.server.stdio
 
 from pathlib import Path
-from google.adk.tools.function_tool import FunctionTool
-from google.adk.tools.mcp_tool.conversion_utils import adk_to_mcp_tool_type
-from google.cloud.storage import Client, transfer_manager
-
-from mcp import types as mcp_types
-from mcp.server.lowlevel import NotificationOptions, Server
-from mcp.server.models import InitializationOptions
 
 from dotenv import load_dotenv
 
+# Os módulos locais leem as variáveis ETL_* ao serem importados.
+load_dotenv()
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.executor import ToolPolicy
+from common.lazy import WarmUp, lazy_import
+from common.log_pipeline import configure_logging
+from common.tool_server import SCHEMA_CACHE_FILE, ToolServer
+
+from gcs_sync import sync_bucket
+from star_schema import build_star_schema as build_star_schema_tables
+from table_cache import table_cache, file_fingerprint
+from table_session import sessions
+from table_profile import TableProfile, profile_batches, profiles
+from working_copy import (
+  convert_to_working_copy,
+  ensure_working_copy,
+  export_csv,
+  iter_batches,
+  pandas_dtype,
+  read_arrow,
+  read_frame,
+  read_schema,
+  rewrite_batches,
+  should_stream,
+  transform_columns,
+  working_copy_path,
+  write_columns,
+  write_frame
+)
+
+pa = lazy_import("pyarrow")
+pd = lazy_import("pandas")
+
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str((Path(__file__).parent / "credentials" / "credentials.json").resolve())
 LOG_FILE_PATH = os.path.join(os.path.dirname(__file__), "mcp_server_activity.log")
 
-logging.basicConfig(
-  level=logging.DEBUG,
-  format="%(asctime)s - %(levelname)s -[%(filename)s:%(lineno)d] - %(message)s",
-  handlers=[
-    logging.FileHandler(LOG_FILE_PATH, mode="a")
-  ] 
-)
-load_dotenv()
+# Os workers do pool de processos (spawn) reimportam este módulo como __mp_main__; só o processo do
+# servidor grava no arquivo, para que dois RotatingFileHandler não rotacionem o mesmo log.
+if __name__ != "__mp_main__":
+  configure_logging(LOG_FILE_PATH)
+
+SYMBOLS_PATTERN = r"[^0-9.,]+"
+COMPACT_DTYPES = ["float32", "float64", "Int8", "Int16", "Int32", "Int64", "category", "string"]
+
+def _read_table(table_path: str, columns: list[str] | None = None) -> pd.DataFrame:
+  """Lê a tabela da sessão aberta ou, na ausência dela, da cópia de trabalho colunar.
+
+  Quando `columns` é informado e a tabela não está em cache, apenas essas colunas são lidas.
+  O DataFrame retornado é compartilhado e não deve ser alterado in-place.
+  """
+  session = sessions.get(table_path)
+  if session is not None:
+    return session.df if columns is None else session.df[columns]
+
+  working_path = ensure_working_copy(table_path)
+  if columns is None:
+    return table_cache.get(working_path, read_frame)
+  cached_df = table_cache.peek(working_path)
+  if cached_df is not None:
+    return cached_df[columns]
+  return read_frame(working_path, columns=columns)
+
+def _cached_profile(table_path: str) -> TableProfile | None:
+  """Retorna o perfil da tabela calculado por profile_table, caso ainda seja válido para a cópia de trabalho."""
+  if sessions.get(table_path) is not None:
+    return None
+  return profiles.get(ensure_working_copy(table_path))
+
+def _table_dtypes(table_path: str) -> pd.Series:
+  session = sessions.get(table_path)
+  if session is not None:
+    return session.df.dtypes
+  profile = _cached_profile(table_path)
+  if profile is not None:
+    return profile.dtypes()
+  return read_schema(table_path).empty_table().to_pandas(types_mapper=pandas_dtype).dtypes
+
+def _null_counts(table_path: str) -> pd.Series:
+  session = sessions.get(table_path)
+  if session is not None:
+    return session.df.isnull().sum()
+  profile = _cached_profile(table_path)
+  if profile is not None:
+    return profile.null_counts()
+  table = read_arrow(table_path)
+  return pd.Series({name: table.column(name).null_count for name in table.column_names}, dtype="int64")
+
+def _streaming(table_path: str) -> bool:
+  """Indica se a ferramenta deve processar a tabela em blocos (tabela grande e sem sessão aberta)."""
+  return sessions.get(table_path) is None and should_stream(table_path)
+
+def _write_table(df: pd.DataFrame, table_path: str, step: str) -> None:
+  """Aplica a transformação na sessão aberta ou, sem sessão, grava a cópia de trabalho."""
+  if sessions.get(table_path) is not None:
+    sessions.apply(table_path, df, step)
+    logging.info(f"Sessão: passo '{step}' aplicado em memória na tabela {table_path}.")
+    return
+  try:
+    write_frame(df, table_path)
+  finally:
+    table_cache.invalidate(working_copy_path(table_path))
+
+def _stream_columns(table_path: str, transforms: dict, step: str) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+  """Aplica as transformações nas colunas bloco a bloco, diretamente na cópia de trabalho."""
+  logging.info(f"Processando '{step}' em blocos na tabela {table_path}.")
+  try:
+    return transform_columns(table_path, transforms)
+  finally:
+    table_cache.invalidate(working_copy_path(table_path))
+
+def _write_columns(table_path: str, step: str, columns: dict[str, pd.Series] | None = None, drop: list[str] | None = None) -> None:
+  """Substitui ou remove colunas na sessão aberta ou, sem sessão, diretamente na cópia de trabalho."""
+  session = sessions.get(table_path)
+  if session is not None:
+    df = session.df.drop(columns=drop or [])
+    for column_name, values in (columns or {}).items():
+      df[column_name] = values
+    _write_table(df, table_path, step)
+    return
+  try:
+    if drop and not columns and should_stream(table_path):
+      rewrite_batches(table_path, lambda batch: batch.drop_columns(drop))
+    else:
+      write_columns(table_path, columns=columns, drop=drop)
+  finally:
+    table_cache.invalidate(working_copy_path(table_path))
 
 def get_data_from_gcs(bucket_name: str) -> str:
-  """Extrai os dados do bucket designado
+  """Extrai os dados do bucket designado. Apenas os arquivos novos ou alterados desde a última extração são baixados.
 
   Args:
     bucket_name(str): O npme do bucket de onde os dados devem ser extraídos.
@@ -40,17 +147,23 @@ def get_data_from_gcs(bucket_name: str) -> str:
   """
   logging.info("Iniciou o processo de extração do bucket")
   try:
+    from google.cloud.storage import Client
+
     gcs_client = Client()
     bucket = gcs_client.bucket(bucket_name)
     temp_path = str((Path(__file__).parent / "temp").resolve())
 
-    blob_names = [blob.name for blob in bucket.list_blobs()]
+    result = sync_bucket(bucket, temp_path)
+    logging.info(f"Objetos {result.downloaded} baixados, {result.skipped} inalterados.")
+
+    for blob_name in result.downloaded:
+      if blob_name.endswith(".csv"):
+        convert_to_working_copy(os.path.join(temp_path, blob_name))
 
-    results = transfer_manager.download_many_to_path(
-        bucket, blob_names, destination_directory=temp_path, max_workers=2
-    )
-    logging.info(f"Objetos {results} baixados.")
-    return f"Blobs {str(blob_names)} baixados em {temp_path}."
+    message = f"Blobs {str(result.downloaded)} baixados em {temp_path}. Blobs {str(result.skipped)} já estavam atualizados."
+    if result.failed:
+      message += f" Falha ao baixar os blobs {str(list(result.failed))}; execute novamente para retomar."
+    return message
   except Exception as e:
     logging.error(f"Falha ao extrair dados do bucket: {e}")
     return f"Ocorreu um erro ao baixar os arquivos do bucket."
@@ -66,8 +179,7 @@ def check_null_columns(table_path: str) -> str:
   """
   logging.info("Iniciando a checagem de colunas nulas.")
   try:
-    df = pd.read_csv(table_path)
-    return str(df.isnull().sum())
+    return str(_null_counts(table_path))
   except Exception as e:
     logging.error(f"Falha ao analisar tabela: {e}")
     return f"Ocorreu um erro ao analisar tabela."
@@ -83,18 +195,14 @@ def drop_null_columns(table_path: str) -> str:
   """
   logging.info(f"Iniciando a remoção das colunas nulas.")
   try:
-    df = pd.read_csv(table_path)
-    
-    nulls_list: list = []
-    for col_name in df.columns:
-      if df[col_name].isnull().sum():
-        nulls_list.append(col_name)
+    null_counts = _null_counts(table_path)
+    nulls_list: list = null_counts[null_counts > 0].index.tolist()
     
-    schema_before = str(df.dtypes)
-    df.drop(columns=nulls_list, inplace=True)
-    schema_after = str(df.dtypes)
+    dtypes = _table_dtypes(table_path)
+    schema_before = str(dtypes)
+    schema_after = str(dtypes.drop(nulls_list))
 
-    df.to_csv(table_path)
+    _write_columns(table_path, f"drop_null_columns: {nulls_list}", drop=nulls_list)
     return "\n".join([str(schema_before), str(schema_after)])
   except Exception as e:
     logging.error(f"Falha ao tentar remover as colunas nulas: {e}")
@@ -111,8 +219,7 @@ def get_table_schema(table_path: str) -> str:
   """
   logging.info("Iniciando a leitura da tabela.")
   try:
-    df = pd.read_csv(table_path)
-    return str(df.dtypes)
+    return str(_table_dtypes(table_path))
   except Exception as e:
     logging.error(f"Falha ao ler a tabela: {e}")
     return f"Ocorreu um erro ao ler a tabela."
@@ -129,17 +236,30 @@ def fill_null(table_path: str, column_name: str, fill_value: str) -> str:
   """
   logging.info(f"Iniciando preenchimento de campos nulos")
   try:
-    df = pd.read_csv(table_path)
+    if _streaming(table_path):
+      if pd.api.types.is_numeric_dtype(_table_dtypes(table_path)[column_name]):
+        fill_value = pd.to_numeric(fill_value)
+      rows_before, rows_after = _stream_columns(
+        table_path, {column_name: lambda values: values.fillna(fill_value)}, f"fill_null: {column_name}={fill_value}"
+      )
+      if rows_before is None:
+        return f"Não foram encontradas linhas nulas na coluna '{column_name}'."
+      return "\n".join([str(rows_before), str(rows_after)])
+
+    df = _read_table(table_path, columns=['id', column_name])
 
     id_list = df['id'].head(3).tolist()
     if not id_list:
       return f"Não foram encontradas linhas nulas na coluna '{column_name}'."
 
     rows_before = df[df['id'].isin(id_list)][['id', column_name]]
-    df[column_name].fillna(fill_value, inplace=True)
+    if pd.api.types.is_numeric_dtype(df[column_name]):
+      fill_value = pd.to_numeric(fill_value)
+    df = df.copy(deep=False)
+    df[column_name] = df[column_name].fillna(fill_value)
     rows_after = df[df['id'].isin(id_list)][['id', column_name]]
 
-    df.to_csv(table_path)
+    _write_columns(table_path, f"fill_null: {column_name}={fill_value}", columns={column_name: df[column_name]})
     return "\n".join([str(rows_before), str(rows_after)])
   except Exception as e:
     logging.error(f"Falha ao tentar preencher campos nulos: {e}")
@@ -156,99 +276,299 @@ def remove_symbols(table_path: str, column_name: str) -> str:
     str: Uma texto (str) demonstrando 3 exemplos de como os valores estavam antes e depois, sendo o primeiro item o id da linha e o segundo a coluna em questão. 
   """
   try:
-    df = pd.read_csv(table_path)
+    if _streaming(table_path):
+      rows_before, rows_after = _stream_columns(
+        table_path,
+        {column_name: lambda values: values.str.replace(SYMBOLS_PATTERN, "", regex=True)},
+        f"remove_symbols: {column_name}"
+      )
+      return "\n".join([str(rows_before), str(rows_after)])
+
+    df = _read_table(table_path, columns=['id', column_name])
     id_list = df['id'].head(3).tolist()
 
     rows_before = df[df['id'].isin(id_list)][['id', column_name]]
-    df[column_name] = df[column_name].str.replace(r"[^0-9.,]+", "", regex=True)
+    df = df.copy(deep=False)
+    df[column_name] = df[column_name].str.replace(SYMBOLS_PATTERN, "", regex=True)
     rows_after = df[df['id'].isin(id_list)][['id', column_name]]
 
-    df.to_csv(table_path)
+    _write_columns(table_path, f"remove_symbols: {column_name}", columns={column_name: df[column_name]})
     return "\n".join([str(rows_before), str(rows_after)])
   except Exception as e:
     logging.error(f"Falha ao tentar transformar dados: {e}")
     return "Ocorreu um erro ao tentar transformar os dados." 
-  
-app = Server("etl_server")
-
-ADK_ETL_TOOLS = {
-  "get_data_from_gcs": FunctionTool(func=get_data_from_gcs),
-  "check_null_columns": FunctionTool(func=check_null_columns),
-  "drop_null_columns": FunctionTool(func=drop_null_columns),
-  "get_table_schema": FunctionTool(func=get_table_schema),
-  "fill_null": FunctionTool(func=fill_null),
-  "remove_symbols": FunctionTool(func=remove_symbols)
-}
-
-@app.list_tools()
-async def list_mcp_tools() -> list[mcp_types.Tool]:
-  """MCP handler que lista as tools que este server expõe."""
-  logging.info("MCP Server: Iniciou a listagem de tools.")
-  mcp_tools_list = []
-  for tool_name, adk_tool_instance in ADK_ETL_TOOLS.items():
-    if not adk_tool_instance.name:
-      adk_tool_instance.name = tool_name
-
-    mcp_tools_schema = adk_to_mcp_tool_type(adk_tool_instance)
-    mcp_tools_list.append(mcp_tools_schema)
-  return mcp_tools_list
-
-@app.call_tool()
-async def call_mcp_tool(name: str, arguments: dict) -> list[mcp_types.TextContent]:
-  """MCP handler para executar a chamada da tool solicitada pelo MCP client."""
-  logging.info(f"MCP Server: Iniciou a chamada da tool {name} com os args: {arguments}")
-
-  if name in ADK_ETL_TOOLS:
-    adk_tool_instance = ADK_ETL_TOOLS[name]
+
+def profile_table(table_path: str) -> str:
+  """Gera o perfil completo da tabela especificada numa única leitura: tipos das colunas, quantidade de nulos, estimativa de valores distintos, mínimo, máximo e linhas de exemplo. Enquanto a tabela não for alterada, get_table_schema, check_null_columns e drop_null_columns respondem a partir deste perfil.
+
+  Args:
+    table_path(str): O caminho completo da tabela que deve ser perfilada.
+
+  Returns:
+    str: Uma texto (str) com o total de linhas, uma tabela com as estatísticas de cada coluna e as linhas de exemplo.
+  """
+  logging.info(f"Iniciando o perfil da tabela {table_path}.")
+  try:
+    session = sessions.get(table_path)
+    if session is not None:
+      table = pa.Table.from_pandas(session.df, preserve_index=False)
+      profile = profile_batches(table.schema, table.to_batches())
+    else:
+      working_path = ensure_working_copy(table_path)
+      profile = profiles.get(working_path)
+      if profile is None:
+        profile = profile_batches(read_schema(table_path), iter_batches(table_path), file_fingerprint(working_path))
+        profiles.put(working_path, profile)
+
+    return "\n".join([
+      f"Total de linhas: {profile.row_count}",
+      str(profile.summary()),
+      str(pd.DataFrame(profile.sample))
+    ])
+  except Exception as e:
+    logging.error(f"Falha ao gerar o perfil da tabela: {e}")
+    return "Ocorreu um erro ao gerar o perfil da tabela."
+
+def _coerce_dtype(values: pd.Series, target_dtype: str) -> pd.Series:
+  """Converte a coluna para o tipo compacto informado. Para tipos numéricos, vírgulas são tratadas como separador de milhar."""
+  if not target_dtype:
+    return values
+  if target_dtype in ("category", "string"):
+    return values.astype(target_dtype)
+  if values.dtype == object or pd.api.types.is_string_dtype(values):
+    values = pd.to_numeric(values.str.replace(",", "", regex=False))
+  return values.astype(target_dtype)
+
+def _apply_batch(table_path: str, column_names: list[str], transform, step: str) -> str:
+  """Aplica `transform(values)` em todas as colunas informadas numa única passada e grava o resultado uma única vez."""
+  if _streaming(table_path):
+    rows_before, rows_after = _stream_columns(table_path, {name: transform for name in column_names}, step)
+    return "\n".join([str(rows_before), str(rows_after)])
+
+  df = _read_table(table_path, columns=['id', *column_names])
+  id_list = df['id'].head(3).tolist()
+  rows_before = df[df['id'].isin(id_list)]
+  new_columns = {name: transform(df[name]) for name in column_names}
+  df = df.assign(**new_columns)
+  rows_after = df[df['id'].isin(id_list)]
+
+  _write_columns(table_path, step, columns=new_columns)
+  return "\n".join([str(rows_before), str(rows_after)])
+
+def _validate_dtype(target_dtype: str, table_path: str) -> str | None:
+  if target_dtype and target_dtype not in COMPACT_DTYPES:
+    return f"Tipo '{target_dtype}' não suportado. Utilize um de {COMPACT_DTYPES} ou '' para manter o tipo atual."
+  if target_dtype == "category" and _streaming(table_path):
+    return "O tipo 'category' não é suportado para tabelas processadas em blocos."
+  return None
+
+def fill_null_batch(table_path: str, column_names: list[str], fill_value: str, target_dtype: str) -> str:
+  """Preenche os campos nulos de várias colunas da tabela com o mesmo valor, numa única passada, opcionalmente convertendo as colunas para um tipo compacto.
+
+  Args:
+    table_path(str): O caminho completo da tabela na qual os campos nulos devem ser preenchidos.
+    column_names(list[str]): Os nomes das colunas nas quais os dados serão alterados.
+    fill_value(str): O valor que substituirá os campos nulos.
+    target_dtype(str): O tipo para o qual as colunas serão convertidas ('float32', 'float64', 'Int8', 'Int16', 'Int32', 'Int64', 'category' ou 'string'), ou '' para manter o tipo atual.
+
+  Returns:
+    str: Uma texto (str) demonstrando 3 exemplos de como os valores estavam antes e depois, sendo o primeiro item o id da linha e os demais as colunas em questão.
+  """
+  logging.info(f"Iniciando preenchimento de campos nulos nas colunas {column_names}.")
+  try:
+    error = _validate_dtype(target_dtype, table_path)
+    if error:
+      return error
+    dtypes = _table_dtypes(table_path)
+
+    def transform(values: pd.Series) -> pd.Series:
+      value = pd.to_numeric(fill_value) if pd.api.types.is_numeric_dtype(dtypes[values.name]) else fill_value
+      return _coerce_dtype(values.fillna(value), target_dtype)
+
+    return _apply_batch(table_path, column_names, transform, f"fill_null_batch: {column_names}={fill_value} ({target_dtype or 'mesmo tipo'})")
+  except Exception as e:
+    logging.error(f"Falha ao tentar preencher campos nulos: {e}")
+    return "Ocorreu um erro ao tentar preencher dados nulos."
+
+def remove_symbols_batch(table_path: str, column_names: list[str], pattern: str, target_dtype: str) -> str:
+  """Remove caracteres não numéricos (como '$') de várias colunas da tabela numa única passada, opcionalmente convertendo as colunas para um tipo numérico compacto.
+
+  Args:
+    table_path(str): O caminho completo da tabela na qual os dados devem ser alterados.
+    column_names(list[str]): Os nomes das colunas nas quais os dados serão alterados.
+    pattern(str): A expressão regular dos caracteres a remover, ou '' para remover tudo que não for dígito, ponto ou vírgula.
+    target_dtype(str): O tipo para o qual as colunas serão convertidas ('float32', 'float64', 'Int8', 'Int16', 'Int32', 'Int64', 'category' ou 'string'), ou '' para manter o tipo atual.
+
+  Returns:
+    str: Uma texto (str) demonstrando 3 exemplos de como os valores estavam antes e depois, sendo o primeiro item o id da linha e os demais as colunas em questão.
+  """
+  logging.info(f"Iniciando a remoção de símbolos nas colunas {column_names}.")
+  try:
+    error = _validate_dtype(target_dtype, table_path)
+    if error:
+      return error
+    pattern = pattern or SYMBOLS_PATTERN
+
+    def transform(values: pd.Series) -> pd.Series:
+      return _coerce_dtype(values.str.replace(pattern, "", regex=True), target_dtype)
+
+    return _apply_batch(table_path, column_names, transform, f"remove_symbols_batch: {column_names} ({target_dtype or 'mesmo tipo'})")
+  except Exception as e:
+    logging.error(f"Falha ao tentar transformar dados: {e}")
+    return "Ocorreu um erro ao tentar transformar os dados."
+
+def build_star_schema(source_directory: str) -> str:
+  """Constrói o star schema (dim_card, dim_user, dim_merchant, dim_date e fact_transaction) a partir das tabelas cards_data.csv, users_data.csv e transactions_data.csv do diretório especificado, gravando as tabelas em Parquet na pasta 'final_datasets' e validando os relacionamentos da tabela fato.
+
+  Args:
+    source_directory(str): O caminho completo do diretório onde estão as tabelas extraídas do bucket.
+
+  Returns:
+    str: Uma mensagem de falha ou sucesso, com a quantidade de linhas de cada tabela gerada e de linhas da tabela fato sem correspondência em cada dimensão.
+  """
+  logging.info(f"Iniciando a construção do star schema a partir de {source_directory}.")
+  try:
+    row_counts, orphans = build_star_schema_tables(source_directory)
+    output_directory = os.path.join(source_directory, "final_datasets")
+    return "\n".join([
+      f"Tabelas gravadas em '{output_directory}':",
+      str(pd.Series(row_counts, name="linhas")),
+      "Linhas da fact_transaction sem correspondência:",
+      str(pd.Series(orphans, name="órfãos"))
+    ])
+  except Exception as e:
+    logging.error(f"Falha ao construir o star schema: {e}")
+    return "Ocorreu um erro ao construir o star schema."
+
+def start_table_session(table_path: str) -> str:
+  """Abre uma sessão de transformação para a tabela especificada. Enquanto a sessão estiver aberta, as ferramentas drop_null_columns, fill_null e remove_symbols alteram apenas a tabela em memória, e as alterações só são gravadas em disco com commit_table ou descartadas com rollback_table.
+
+  Args:
+    table_path(str): O caminho completo da tabela que será transformada.
+
+  Returns:
+    str: Uma mensagem de falha ou sucesso da abertura da sessão.
+  """
+  logging.info(f"Iniciando sessão de transformação da tabela {table_path}.")
+  try:
+    if sessions.get(table_path) is not None:
+      return f"Já existe uma sessão aberta para a tabela '{table_path}'."
+    if should_stream(table_path):
+      return f"A tabela '{table_path}' é grande demais para ser mantida em memória. As ferramentas serão executadas em blocos, gravando diretamente na cópia de trabalho."
+    df = _read_table(table_path)
+    sessions.start(table_path, df, file_fingerprint(working_copy_path(table_path)))
+    return f"Sessão de transformação aberta para a tabela '{table_path}'."
+  except Exception as e:
+    logging.error(f"Falha ao abrir sessão: {e}")
+    return "Ocorreu um erro ao abrir a sessão de transformação."
+
+def commit_table(table_path: str) -> str:
+  """Grava em disco, numa única escrita atômica, todas as transformações acumuladas na sessão da tabela especificada e encerra a sessão.
+
+  Args:
+    table_path(str): O caminho completo da tabela cuja sessão deve ser gravada.
+
+  Returns:
+    str: Uma mensagem de falha ou sucesso, listando os passos gravados.
+  """
+  logging.info(f"Iniciando commit da sessão da tabela {table_path}.")
+  try:
+    session = sessions.get(table_path)
+    if session is None:
+      return f"Não existe sessão aberta para a tabela '{table_path}'."
+    if file_fingerprint(working_copy_path(table_path)) != session.base_fingerprint:
+      return f"A tabela '{table_path}' foi alterada em disco desde a abertura da sessão. Utilize rollback_table e abra uma nova sessão."
+
+    sessions.close(table_path)
     try:
-      adk_tool_response = await adk_tool_instance.run_async(
-        args=arguments,
-        tool_context=None
-      )
-      logging.info(f"MCP Server: Tool {name} executada. Resposta: {adk_tool_response}")
-      response_text = json.dumps(adk_tool_response, indent=2)
-      return [mcp_types.TextContent(type="text", text=response_text)]
-    except Exception as e:
-      logging.error(f"MCP Server: Erro ao executar tool {name}. Resposta: {e}")
-      payload = {
-        "success": False,
-        "message": f"Falha ao executar tool '{name}': {str(e)}"
-      }
-      error_text = json.dumps(payload)
-      return [mcp_types.TextContent(type="text", text=error_text)]
-  else:
-    logging.error(f"MCP Server: Erro ao executar tool. Tool não implementada.")
-    payload = {
-      "success": False,
-      "message": f"Tool não implementada neste servidor."
-    }
-    error_text = json.dumps(payload)
-    return [mcp_types.TextContent(type="text", text=error_text)]
-
-async def run_mcp_stdio_server():
-  """Executa o MCP server, trabalhando no stdio"""
-  async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-    await app.run(
-      read_stream,
-      write_stream,
-      InitializationOptions(
-        server_name=app.name,
-        server_version="0.1.0",
-        capabilities=app.get_capabilities(
-          notification_options=NotificationOptions(),
-          experimental_capabilities={}
-        )
-      )
-    )
+      write_frame(session.df, table_path)
+    except Exception:
+      sessions.restore(session)
+      raise
+    finally:
+      table_cache.invalidate(working_copy_path(table_path))
+    return f"Tabela '{table_path}' gravada com os passos: {session.steps}."
+  except Exception as e:
+    logging.error(f"Falha ao gravar sessão: {e}")
+    return "Ocorreu um erro ao gravar a tabela. A sessão continua aberta."
 
-if __name__ == "__main__":
-  logging.info(f"Iniciando servidor MCP.")
+def rollback_table(table_path: str) -> str:
+  """Descarta todas as transformações acumuladas na sessão da tabela especificada e encerra a sessão, sem alterar o arquivo em disco.
+
+  Args:
+    table_path(str): O caminho completo da tabela cuja sessão deve ser descartada.
+
+  Returns:
+    str: Uma mensagem de falha ou sucesso, listando os passos descartados.
+  """
+  logging.info(f"Iniciando rollback da sessão da tabela {table_path}.")
+  session = sessions.close(table_path)
+  if session is None:
+    return f"Não existe sessão aberta para a tabela '{table_path}'."
+  return f"Passos descartados da tabela '{table_path}': {session.steps}."
+
+def export_table(table_path: str) -> str:
+  """Exporta a tabela transformada de volta para o arquivo CSV de origem. Deve ser executada ao final do tratamento da tabela.
+
+  Args:
+    table_path(str): O caminho completo da tabela (arquivo CSV) que deve ser exportada.
+
+  Returns:
+    str: Uma mensagem de falha ou sucesso da exportação.
+  """
+  logging.info(f"Iniciando a exportação da tabela {table_path} para CSV.")
   try:
-    asyncio.run(run_mcp_stdio_server())
+    if sessions.get(table_path) is not None:
+      return f"Existe uma sessão aberta para a tabela '{table_path}'. Utilize commit_table ou rollback_table antes de exportar."
+    export_csv(table_path)
+    return f"Tabela exportada para '{table_path}'."
   except Exception as e:
-    logging.critical(f"Servidor MCP encontrou um erro não tratado: {e}", exc_info=True)
-  finally:
-    logging.info(f"Servidor MCP encerrando.")
-    logging.info(f"\n\n")
-    
-    
\ No newline at end of file
+    logging.error(f"Falha ao exportar tabela: {e}")
+    return "Ocorreu um erro ao exportar a tabela."
+
+TABLE_WRITE_TOOLS = [
+  "drop_null_columns", "fill_null", "remove_symbols", "fill_null_batch", "remove_symbols_batch",
+  "start_table_session", "commit_table", "rollback_table", "export_table"
+]
+
+def _load_heavy_modules():
+  """Importa os módulos que as tools usam e que não são necessários para o handshake."""
+  import google.cloud.storage
+  import pandas
+  import pyarrow.compute
+  import pyarrow.csv
+  import pyarrow.feather
+  import pyarrow.parquet
+
+warm_up = WarmUp([_load_heavy_modules])
+
+server = ToolServer(
+  "etl_server",
+  tools={
+    "get_data_from_gcs": get_data_from_gcs,
+    "check_null_columns": check_null_columns,
+    "drop_null_columns": drop_null_columns,
+    "get_table_schema": get_table_schema,
+    "fill_null": fill_null,
+    "remove_symbols": remove_symbols,
+    "fill_null_batch": fill_null_batch,
+    "remove_symbols_batch": remove_symbols_batch,
+    "profile_table": profile_table,
+    "build_star_schema": build_star_schema,
+    "start_table_session": start_table_session,
+    "commit_table": commit_table,
+    "rollback_table": rollback_table,
+    "export_table": export_table
+  },
+  policies={
+    **{name: ToolPolicy(max_concurrency=1, group="table_write", timeout_seconds=0) for name in TABLE_WRITE_TOOLS},
+    "get_data_from_gcs": ToolPolicy(max_concurrency=1, timeout_seconds=0),
+    "build_star_schema": ToolPolicy(backend="process", max_concurrency=1, timeout_seconds=0)
+  },
+  default_port=8101,
+  schema_cache_path=Path(__file__).parent / SCHEMA_CACHE_FILE,
+  warm_up=warm_up
+)
+
+if __name__ == "__main__":
+  server.run()
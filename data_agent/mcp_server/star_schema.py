@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+
+from common.lazy import lazy_import
+
+from working_copy import read_frame
+
+np = lazy_import("numpy")
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+pd = lazy_import("pandas")
+
+FINAL_DIR_NAME = "final_datasets"
+CURRENCY_PATTERN = r"[$,]"
+
+
+def _to_number(values: pd.Series) -> pd.Series:
+  if pd.api.types.is_numeric_dtype(values):
+    return values
+  return pd.to_numeric(values.astype("string").str.replace(CURRENCY_PATTERN, "", regex=True))
+
+
+def _to_bool(values: pd.Series) -> pd.Series:
+  if pd.api.types.is_bool_dtype(values):
+    return values
+  return values.astype("string").str.upper().map({"YES": True, "TRUE": True, "NO": False, "FALSE": False}).astype("boolean")
+
+
+def _write_parquet(df: pd.DataFrame, output_directory: str, name: str) -> str:
+  path = os.path.join(output_directory, f"{name}.parquet")
+  tmp_path = path + ".tmp"
+  pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+  os.replace(tmp_path, path)
+  return path
+
+
+def build_dim_card(source_directory: str, output_directory: str) -> dict:
+  df = read_frame(os.path.join(source_directory, "cards_data.csv"))
+  df = df.drop(columns=["cvv"], errors="ignore")
+  df["expires"] = pd.to_datetime(df["expires"], format="%m/%Y").dt.date
+  df["acct_open_date"] = pd.to_datetime(df["acct_open_date"], format="%m/%Y").dt.date
+  df["has_chip"] = _to_bool(df["has_chip"])
+  df["card_on_dark_web"] = _to_bool(df["card_on_dark_web"])
+  df["credit_limit"] = _to_number(df["credit_limit"])
+  df = df.rename(columns={"id": "card_id"})
+  _write_parquet(df, output_directory, "dim_card")
+  return {"dim_card": len(df)}
+
+
+def build_dim_user(source_directory: str, output_directory: str) -> dict:
+  df = read_frame(os.path.join(source_directory, "users_data.csv"))
+  df = df.drop(columns=["latitude", "longitude", "address"], errors="ignore")
+  for column_name in ["per_capita_income", "yearly_income", "total_debt"]:
+    df[column_name] = _to_number(df[column_name])
+  df = df.rename(columns={"id": "user_id"})
+  _write_parquet(df, output_directory, "dim_user")
+  return {"dim_user": len(df)}
+
+
+def date_keys(dates: pd.Series) -> pd.Series:
+  """Chave inteira estável da data, no formato YYYYMMDD."""
+  return (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).astype("int32")
+
+
+def build_dim_date(full_dates: pd.Series) -> pd.DataFrame:
+  """Gera a dimensão de datas com uma linha por dia do calendário, da menor à maior data das transações."""
+  full_dates = pd.to_datetime(full_dates).dt.normalize()
+  calendar = pd.Series(np.arange(
+    full_dates.min().to_datetime64().astype("datetime64[D]"),
+    full_dates.max().to_datetime64().astype("datetime64[D]") + np.timedelta64(1, "D"),
+    dtype="datetime64[D]"
+  ).astype("datetime64[ns]"))
+  return pd.DataFrame({
+    "date_id": date_keys(calendar),
+    "full_date": calendar.dt.date,
+    "year": calendar.dt.year,
+    "month": calendar.dt.month,
+    "month_name": calendar.dt.month_name(),
+    "day": calendar.dt.day,
+    "day_name": calendar.dt.day_name(),
+    "day_of_week": (calendar.dt.dayofweek + 1) % 7 + 1,
+    "day_of_month": calendar.dt.day,
+    "day_of_year": calendar.dt.dayofyear,
+    "week_of_year": calendar.dt.isocalendar().week.astype("int64"),
+    "quarter": calendar.dt.quarter,
+    "month_year": calendar.dt.strftime("%b %Y")
+  })
+
+
+def build_transaction_tables(source_directory: str, output_directory: str) -> dict:
+  df = read_frame(os.path.join(source_directory, "transactions_data.csv"))
+  df = df.drop(columns=["_c0", "Unnamed: 0"], errors="ignore")
+  df = df[df["merchant_state"].notna()]
+  df = df.drop(columns=["zip", "errors"], errors="ignore")
+  df["amount"] = _to_number(df["amount"])
+  df = df.rename(columns={"use_chip": "transaction_type", "id": "transaction_id"})
+
+  dim_merchant = (
+    df[["merchant_id", "merchant_city", "merchant_state", "mcc"]]
+    .drop_duplicates(subset="merchant_id", keep="first")
+  )
+
+  transaction_days = pd.to_datetime(df["date"]).dt.normalize()
+  dim_date = build_dim_date(transaction_days)
+  calendar_keys = pd.DataFrame({"day": pd.to_datetime(dim_date["full_date"]), "date_id": dim_date["date_id"]})
+  df = df.assign(day=transaction_days).merge(calendar_keys, on="day", how="left")
+  fact = df[["transaction_id", "client_id", "card_id", "merchant_id", "date_id", "transaction_type", "amount"]]
+
+  _write_parquet(dim_merchant, output_directory, "dim_merchant")
+  _write_parquet(dim_date, output_directory, "dim_date")
+  _write_parquet(fact, output_directory, "fact_transaction")
+  return {"dim_merchant": len(dim_merchant), "dim_date": len(dim_date), "fact_transaction": len(fact)}
+
+
+def _read_keys(output_directory: str, name: str, column_name: str) -> pd.Series:
+  path = os.path.join(output_directory, f"{name}.parquet")
+  return pq.read_table(path, columns=[column_name]).column(column_name).to_pandas()
+
+
+def check_referential_integrity(output_directory: str) -> dict:
+  """Conta, por anti-join, as linhas da tabela fato sem correspondência em cada dimensão."""
+  relationships = {
+    "dim_user": ("client_id", "user_id"),
+    "dim_card": ("card_id", "card_id"),
+    "dim_merchant": ("merchant_id", "merchant_id"),
+    "dim_date": ("date_id", "date_id")
+  }
+  orphans = {}
+  for dimension, (fact_key, dimension_key) in relationships.items():
+    fact_keys = _read_keys(output_directory, "fact_transaction", fact_key)
+    dimension_keys = _read_keys(output_directory, dimension, dimension_key)
+    orphans[dimension] = int((~fact_keys.isin(dimension_keys)).sum())
+  return orphans
+
+
+def drop_fact_column(output_directory: str, column_name: str) -> None:
+  path = os.path.join(output_directory, "fact_transaction.parquet")
+  table = pq.read_table(path).drop_columns([column_name])
+  pq.write_table(table, path + ".tmp")
+  os.replace(path + ".tmp", path)
+
+
+def build_star_schema(source_directory: str, max_workers: int | None = None) -> tuple[dict, dict]:
+  """Constrói as dimensões e a tabela fato em paralelo, em processos separados, e valida os relacionamentos.
+
+  Returns:
+    tuple: A quantidade de linhas de cada tabela gerada e a quantidade de linhas órfãs da fato por dimensão.
+  """
+  output_directory = os.path.join(source_directory, FINAL_DIR_NAME)
+  os.makedirs(output_directory, exist_ok=True)
+
+  builders = [build_dim_card, build_dim_user, build_transaction_tables]
+  row_counts = {}
+  with ProcessPoolExecutor(max_workers=max_workers or len(builders)) as executor:
+    futures = [executor.submit(builder, source_directory, output_directory) for builder in builders]
+    for future in futures:
+      row_counts.update(future.result())
+
+  orphans = check_referential_integrity(output_directory)
+  drop_fact_column(output_directory, "client_id")
+  logging.info(f"Star schema gerado em {output_directory}: {row_counts}, órfãos: {orphans}.")
+  return row_counts, orphans
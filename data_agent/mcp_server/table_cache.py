@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import os
+import logging
+import threading
+
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from common.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+@dataclass
+class CachedTable:
+  fingerprint: tuple
+  df: pd.DataFrame
+  size_bytes: int
+
+
+def file_fingerprint(table_path: str) -> tuple:
+  """Retorna a impressão digital (mtime, tamanho) do arquivo, usada para invalidar o cache."""
+  stat = os.stat(table_path)
+  return (stat.st_mtime_ns, stat.st_size)
+
+
+class TableCache:
+  """Cache LRU de DataFrames em memória, compartilhado pelo processo do servidor.
+
+  As entradas são indexadas pelo caminho absoluto da tabela e validadas pela
+  impressão digital do arquivo (mtime e tamanho). Quando o total de memória
+  ultrapassa `max_bytes`, as tabelas menos usadas recentemente são removidas.
+  """
+
+  def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+    self.max_bytes = max_bytes
+    self._entries: OrderedDict[str, CachedTable] = OrderedDict()
+    self._total_bytes = 0
+    self._lock = threading.RLock()
+
+  def get(self, table_path: str, loader) -> pd.DataFrame:
+    """Retorna a tabela do cache ou a carrega com `loader(table_path)` caso esteja ausente ou desatualizada."""
+    key = os.path.abspath(table_path)
+    fingerprint = file_fingerprint(key)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and entry.fingerprint == fingerprint:
+        self._entries.move_to_end(key)
+        logging.debug(f"Cache: tabela {key} servida da memória.")
+        return entry.df
+      if entry is not None:
+        logging.info(f"Cache: tabela {key} alterada em disco, recarregando.")
+        self._remove(key)
+
+    df = loader(key)
+    self.put(key, df, fingerprint)
+    return df
+
+  def peek(self, table_path: str) -> pd.DataFrame | None:
+    """Retorna a tabela apenas se ela já estiver em cache e atualizada, sem carregá-la."""
+    key = os.path.abspath(table_path)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None or entry.fingerprint != file_fingerprint(key):
+        return None
+      self._entries.move_to_end(key)
+      return entry.df
+
+  def put(self, table_path: str, df: pd.DataFrame, fingerprint: tuple | None = None) -> None:
+    """Armazena a tabela no cache, associada à impressão digital atual do arquivo."""
+    key = os.path.abspath(table_path)
+    if fingerprint is None:
+      fingerprint = file_fingerprint(key)
+    size_bytes = int(df.memory_usage(deep=True).sum())
+
+    with self._lock:
+      self._remove(key)
+      if size_bytes > self.max_bytes:
+        logging.info(f"Cache: tabela {key} ({size_bytes} bytes) excede o limite do cache e não será armazenada.")
+        return
+      self._entries[key] = CachedTable(fingerprint=fingerprint, df=df, size_bytes=size_bytes)
+      self._total_bytes += size_bytes
+      self._evict()
+
+  def invalidate(self, table_path: str) -> None:
+    """Remove a tabela do cache."""
+    with self._lock:
+      self._remove(os.path.abspath(table_path))
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+      self._total_bytes = 0
+
+  def _remove(self, key: str) -> None:
+    entry = self._entries.pop(key, None)
+    if entry is not None:
+      self._total_bytes -= entry.size_bytes
+
+  def _evict(self) -> None:
+    while self._total_bytes > self.max_bytes and self._entries:
+      key, entry = self._entries.popitem(last=False)
+      self._total_bytes -= entry.size_bytes
+      logging.info(f"Cache: tabela {key} removida do cache (LRU).")
+
+
+table_cache = TableCache(
+  max_bytes=int(os.getenv("ETL_TABLE_CACHE_MAX_BYTES") or DEFAULT_MAX_BYTES)
+)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+
+from dataclasses import dataclass, asdict
+
+from common.lazy import lazy_import
+
+from table_cache import file_fingerprint
+from working_copy import pandas_dtype
+
+np = lazy_import("numpy")
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+pd = lazy_import("pandas")
+
+PROFILE_SUFFIX = ".profile.json"
+DISTINCT_SKETCH_SIZE = 1024
+SAMPLE_SIZE = 5
+
+
+class DistinctSketch:
+  """Estimativa de valores distintos por K-Minimum-Values, combinável entre blocos."""
+
+  def __init__(self, k: int = DISTINCT_SKETCH_SIZE):
+    self.k = k
+    self.hashes = np.empty(0, dtype=np.uint64)
+
+  def update(self, values: pd.Series) -> None:
+    hashes = pd.util.hash_pandas_object(values.dropna(), index=False).to_numpy()
+    if len(self.hashes) == self.k:
+      hashes = hashes[hashes < self.hashes[-1]]
+    self.hashes = np.unique(np.concatenate([self.hashes, hashes]))[:self.k]
+
+  def estimate(self) -> int:
+    if len(self.hashes) < self.k:
+      return len(self.hashes)
+    return int((self.k - 1) / (float(self.hashes[-1]) / 2 ** 64))
+
+
+@dataclass
+class TableProfile:
+  fingerprint: list
+  row_count: int
+  columns: dict
+  sample: list
+
+  def dtypes(self) -> pd.Series:
+    return pd.Series({name: stats["dtype"] for name, stats in self.columns.items()})
+
+  def null_counts(self) -> pd.Series:
+    return pd.Series({name: stats["null_count"] for name, stats in self.columns.items()}, dtype="int64")
+
+  def summary(self) -> pd.DataFrame:
+    return pd.DataFrame.from_dict(self.columns, orient="index")
+
+
+def _to_json_value(value):
+  if value is None or isinstance(value, (bool, int, float, str)):
+    return value
+  return str(value)
+
+
+def profile_batches(schema: pa.Schema, batches, fingerprint: tuple | None = None, sample_size: int = SAMPLE_SIZE) -> TableProfile:
+  """Calcula, numa única passada pelos blocos, tipos, nulos, distintos estimados, mínimo, máximo e linhas de exemplo.
+
+  Os tipos são os do pandas ao ler a cópia de trabalho (`read_frame`), com inteiros anuláveis.
+  """
+  dtypes = schema.empty_table().to_pandas(types_mapper=pandas_dtype).dtypes
+  null_counts = {name: 0 for name in schema.names}
+  minimums = {name: None for name in schema.names}
+  maximums = {name: None for name in schema.names}
+  sketches = {name: DistinctSketch() for name in schema.names}
+  samples = []
+  row_count = 0
+
+  for batch in batches:
+    row_count += batch.num_rows
+    if len(samples) < sample_size:
+      samples.extend(batch.slice(0, sample_size - len(samples)).to_pylist())
+
+    for name, column in zip(batch.schema.names, batch.columns):
+      null_counts[name] += column.null_count
+      if column.null_count == len(column) or pa.types.is_nested(column.type):
+        continue
+      if pa.types.is_dictionary(column.type):
+        # Colunas 'category' são gravadas como dicionário, que não tem kernel de mínimo e máximo.
+        column = column.dictionary_decode()
+      sketches[name].update(column.to_pandas())
+      batch_min_max = pc.min_max(column)
+      batch_min, batch_max = batch_min_max["min"].as_py(), batch_min_max["max"].as_py()
+      if minimums[name] is None or batch_min < minimums[name]:
+        minimums[name] = batch_min
+      if maximums[name] is None or batch_max > maximums[name]:
+        maximums[name] = batch_max
+
+  columns = {
+    name: {
+      "dtype": str(dtypes[name]),
+      "null_count": int(null_counts[name]),
+      "distinct_estimate": sketches[name].estimate(),
+      "min": _to_json_value(minimums[name]),
+      "max": _to_json_value(maximums[name])
+    }
+    for name in schema.names
+  }
+  sample = [{key: _to_json_value(value) for key, value in row.items()} for row in samples]
+  return TableProfile(fingerprint=list(fingerprint or ()), row_count=row_count, columns=columns, sample=sample)
+
+
+class ProfileStore:
+  """Perfis das cópias de trabalho, válidos enquanto a impressão digital do arquivo não mudar.
+
+  Os perfis ficam em memória e também num arquivo JSON ao lado da cópia de trabalho,
+  para sobreviverem a reinícios do servidor.
+  """
+
+  def __init__(self):
+    self._profiles: dict[str, TableProfile] = {}
+    self._lock = threading.Lock()
+
+  def get(self, working_path: str) -> TableProfile | None:
+    fingerprint = list(file_fingerprint(working_path))
+    with self._lock:
+      profile = self._profiles.get(working_path)
+    if profile is None:
+      profile = self._load(working_path)
+    if profile is None or profile.fingerprint != fingerprint:
+      return None
+    with self._lock:
+      self._profiles[working_path] = profile
+    return profile
+
+  def put(self, working_path: str, profile: TableProfile) -> None:
+    with self._lock:
+      self._profiles[working_path] = profile
+    try:
+      with open(working_path + PROFILE_SUFFIX, "w") as profile_file:
+        json.dump(asdict(profile), profile_file)
+    except OSError as e:
+      logging.warning(f"Não foi possível gravar o perfil de {working_path}: {e}")
+
+  def _load(self, working_path: str) -> TableProfile | None:
+    try:
+      with open(working_path + PROFILE_SUFFIX) as profile_file:
+        return TableProfile(**json.load(profile_file))
+    except (OSError, ValueError, TypeError):
+      return None
+
+
+profiles = ProfileStore()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+import threading
+
+from dataclasses import dataclass, field
+
+from common.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+@dataclass
+class TableSession:
+  """Sessão de transformação de uma tabela, mantida em memória até o commit."""
+  table_path: str
+  base_fingerprint: tuple
+  df: pd.DataFrame
+  steps: list[str] = field(default_factory=list)
+
+
+class SessionRegistry:
+  """Registro das sessões de transformação abertas, indexadas pelo caminho absoluto da tabela."""
+
+  def __init__(self):
+    self._sessions: dict[str, TableSession] = {}
+    self._lock = threading.Lock()
+
+  def start(self, table_path: str, df: pd.DataFrame, base_fingerprint: tuple) -> TableSession:
+    key = os.path.abspath(table_path)
+    with self._lock:
+      if key in self._sessions:
+        raise ValueError(f"Já existe uma sessão aberta para a tabela '{table_path}'.")
+      session = TableSession(table_path=key, base_fingerprint=base_fingerprint, df=df)
+      self._sessions[key] = session
+      return session
+
+  def get(self, table_path: str) -> TableSession | None:
+    with self._lock:
+      return self._sessions.get(os.path.abspath(table_path))
+
+  def apply(self, table_path: str, df: pd.DataFrame, step: str) -> None:
+    """Substitui a tabela da sessão pelo resultado de uma transformação e registra o passo."""
+    with self._lock:
+      session = self._sessions[os.path.abspath(table_path)]
+      session.df = df
+      session.steps.append(step)
+
+  def restore(self, session: TableSession) -> None:
+    """Reabre uma sessão encerrada, por exemplo quando a gravação do commit falha."""
+    with self._lock:
+      self._sessions.setdefault(session.table_path, session)
+
+  def close(self, table_path: str) -> TableSession | None:
+    with self._lock:
+      return self._sessions.pop(os.path.abspath(table_path), None)
+
+
+sessions = SessionRegistry()
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import os
+import logging
+import tempfile
+
+from common.lazy import lazy_import
+
+from table_cache import file_fingerprint
+
+pa = lazy_import("pyarrow")
+pa_csv = lazy_import("pyarrow.csv")
+feather = lazy_import("pyarrow.feather")
+pd = lazy_import("pandas")
+
+WORKING_DIR_NAME = ".working"
+WORKING_SUFFIX = ".arrow"
+SOURCE_SUFFIX = ".source"
+
+STREAMING_THRESHOLD_BYTES = int(os.getenv("ETL_STREAMING_THRESHOLD_BYTES") or 1024 ** 3)
+CHUNK_ROWS = int(os.getenv("ETL_STREAMING_CHUNK_ROWS") or 500_000)
+CSV_BLOCK_BYTES = int(os.getenv("ETL_STREAMING_CSV_BLOCK_BYTES") or 64 * 1024 ** 2)
+
+
+def working_copy_path(table_path: str) -> str:
+  """Retorna o caminho da cópia de trabalho colunar (Arrow IPC) associada ao CSV."""
+  table_path = os.path.abspath(table_path)
+  if table_path.endswith(WORKING_SUFFIX):
+    return table_path
+  directory, file_name = os.path.split(table_path)
+  stem, _ = os.path.splitext(file_name)
+  return os.path.join(directory, WORKING_DIR_NAME, stem + WORKING_SUFFIX)
+
+
+def _encode_fingerprint(fingerprint: tuple) -> str:
+  return ":".join(str(value) for value in fingerprint)
+
+
+def _read_source_fingerprint(working_path: str) -> str | None:
+  try:
+    with open(working_path + SOURCE_SUFFIX) as source_file:
+      return source_file.read().strip()
+  except FileNotFoundError:
+    return None
+
+
+def _write_source_fingerprint(working_path: str, csv_path: str) -> None:
+  with open(working_path + SOURCE_SUFFIX, "w") as source_file:
+    source_file.write(_encode_fingerprint(file_fingerprint(csv_path)))
+
+
+def _temp_path_for(path: str) -> str:
+  directory = os.path.dirname(os.path.abspath(path))
+  os.makedirs(directory, exist_ok=True)
+  fd, tmp_path = tempfile.mkstemp(prefix=".etl-", suffix=".tmp", dir=directory)
+  os.close(fd)
+  return tmp_path
+
+
+def _replace_atomically(path: str, write) -> None:
+  """Executa `write(tmp_path)` num arquivo temporário do mesmo diretório e o renomeia sobre `path`."""
+  tmp_path = _temp_path_for(path)
+  try:
+    write(tmp_path)
+    os.replace(tmp_path, path)
+  except Exception:
+    if os.path.exists(tmp_path):
+      os.remove(tmp_path)
+    raise
+
+
+def _atomic_write_arrow(table: pa.Table, working_path: str) -> None:
+  _replace_atomically(
+    working_path,
+    lambda tmp_path: feather.write_feather(table, tmp_path, compression="uncompressed", chunksize=CHUNK_ROWS)
+  )
+
+
+def should_stream(table_path: str) -> bool:
+  """Indica se a tabela ultrapassa o limite a partir do qual as ferramentas processam os dados em blocos."""
+  working_path = working_copy_path(table_path)
+  path = working_path if os.path.exists(working_path) else table_path
+  return os.path.getsize(path) > STREAMING_THRESHOLD_BYTES
+
+
+def _stream_csv_to_arrow(csv_path: str, tmp_path: str) -> None:
+  read_options = pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES)
+  convert_options = pa_csv.ConvertOptions(strings_can_be_null=True)
+  try:
+    _write_csv_batches(csv_path, tmp_path, read_options, convert_options)
+  except pa.ArrowInvalid as e:
+    # Os tipos são inferidos no primeiro bloco; se um bloco posterior divergir, todas as colunas são lidas como texto.
+    logging.warning(f"Tipos inconsistentes entre blocos de {csv_path}, convertendo colunas como texto: {e}")
+    column_names = pa_csv.open_csv(csv_path, read_options=read_options).schema.names
+    convert_options = pa_csv.ConvertOptions(
+      column_types={name: pa.string() for name in column_names},
+      strings_can_be_null=True
+    )
+    _write_csv_batches(csv_path, tmp_path, read_options, convert_options)
+
+
+def _write_csv_batches(csv_path: str, tmp_path: str, read_options, convert_options) -> None:
+  reader = pa_csv.open_csv(csv_path, read_options=read_options, convert_options=convert_options)
+  with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+    for batch in reader:
+      writer.write_table(pa.Table.from_batches([batch]), max_chunksize=CHUNK_ROWS)
+
+
+def convert_to_working_copy(csv_path: str) -> str:
+  """Converte o CSV para a cópia de trabalho colunar, registrando a impressão digital do CSV de origem.
+
+  Arquivos acima de ETL_STREAMING_THRESHOLD_BYTES são convertidos em blocos, sem carregar o CSV inteiro em memória.
+  """
+  working_path = working_copy_path(csv_path)
+  if os.path.getsize(csv_path) > STREAMING_THRESHOLD_BYTES:
+    _replace_atomically(working_path, lambda tmp_path: _stream_csv_to_arrow(csv_path, tmp_path))
+  else:
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True)
+    _atomic_write_arrow(pa_csv.read_csv(csv_path, convert_options=convert_options), working_path)
+  _write_source_fingerprint(working_path, csv_path)
+  logging.info(f"Cópia de trabalho {working_path} criada a partir de {csv_path}.")
+  return working_path
+
+
+def ensure_working_copy(table_path: str) -> str:
+  """Garante que a cópia de trabalho exista e corresponda ao CSV de origem, retornando o seu caminho.
+
+  A cópia só é recriada quando o próprio CSV muda (por exemplo, num novo download);
+  as alterações feitas pelas ferramentas ficam na cópia de trabalho até a exportação.
+  """
+  working_path = working_copy_path(table_path)
+  if working_path == os.path.abspath(table_path):
+    return working_path
+  if os.path.exists(working_path):
+    if not os.path.exists(table_path):
+      return working_path
+    if _read_source_fingerprint(working_path) == _encode_fingerprint(file_fingerprint(table_path)):
+      return working_path
+  return convert_to_working_copy(table_path)
+
+
+def read_arrow(table_path: str, columns: list[str] | None = None) -> pa.Table:
+  """Lê a cópia de trabalho por memory-map, carregando apenas as colunas solicitadas."""
+  return feather.read_table(ensure_working_copy(table_path), columns=columns, memory_map=True)
+
+
+def read_schema(table_path: str) -> pa.Schema:
+  with pa.memory_map(ensure_working_copy(table_path)) as source:
+    return pa.ipc.open_file(source).schema
+
+
+def iter_batches(table_path: str):
+  """Percorre os RecordBatches da cópia de trabalho por memory-map, um bloco por vez."""
+  with pa.memory_map(ensure_working_copy(table_path)) as source:
+    reader = pa.ipc.open_file(source)
+    for index in range(reader.num_record_batches):
+      yield reader.get_batch(index)
+
+
+def pandas_dtype(arrow_type: pa.DataType):
+  """`types_mapper` do `to_pandas`: inteiros viram os tipos anuláveis do pandas (Int8...Int64, UInt8...UInt64).
+
+  Sem ele, uma coluna inteira com nulos (por exemplo, compactada para Int32) volta como float64.
+  """
+  if not pa.types.is_integer(arrow_type):
+    return None
+  prefix = "Int" if pa.types.is_signed_integer(arrow_type) else "UInt"
+  return pd.api.types.pandas_dtype(f"{prefix}{arrow_type.bit_width}")
+
+
+def read_frame(table_path: str, columns: list[str] | None = None) -> pd.DataFrame:
+  return read_arrow(table_path, columns=columns).to_pandas(types_mapper=pandas_dtype)
+
+
+def write_frame(df: pd.DataFrame, table_path: str) -> None:
+  """Substitui a cópia de trabalho pelo DataFrame informado."""
+  working_path = ensure_working_copy(table_path)
+  table = pa.Table.from_pandas(df, preserve_index=False)
+  _atomic_write_arrow(table, working_path)
+
+
+def write_columns(table_path: str, columns: dict[str, pd.Series] | None = None, drop: list[str] | None = None) -> None:
+  """Substitui ou remove colunas da cópia de trabalho sem converter as demais colunas para pandas."""
+  working_path = ensure_working_copy(table_path)
+  table = feather.read_table(working_path, memory_map=True)
+  if drop:
+    table = table.drop_columns(drop)
+  for column_name, values in (columns or {}).items():
+    array = pa.Array.from_pandas(values.reset_index(drop=True))
+    table = table.set_column(table.schema.get_field_index(column_name), column_name, array)
+  _atomic_write_arrow(table, working_path)
+
+
+def _output_schema(source_schema: pa.Schema, transformed_schema: pa.Schema) -> pa.Schema:
+  """Schema do bloco transformado, com o tipo de origem nas colunas que ficaram sem tipo (só nulos no bloco)."""
+  fields = []
+  for field in transformed_schema:
+    index = source_schema.get_field_index(field.name)
+    if pa.types.is_null(field.type) and index >= 0:
+      field = field.with_type(source_schema.field(index).type)
+    fields.append(field)
+  return pa.schema(fields, metadata=transformed_schema.metadata)
+
+
+def rewrite_batches(table_path: str, transform) -> None:
+  """Reescreve a cópia de trabalho bloco a bloco, aplicando `transform(batch)` em cada RecordBatch.
+
+  O schema de saída é definido pelo primeiro bloco transformado; colunas que nele ficaram só com
+  nulos mantêm o tipo da cópia de trabalho, para que os blocos seguintes, com valores, possam ser
+  convertidos para ele. A memória utilizada é limitada pelo tamanho do bloco
+  (ETL_STREAMING_CHUNK_ROWS) e não pelo tamanho da tabela.
+  """
+  working_path = ensure_working_copy(table_path)
+
+  def write(tmp_path: str) -> None:
+    with pa.memory_map(working_path) as source, pa.OSFile(tmp_path, "wb") as sink:
+      reader = pa.ipc.open_file(source)
+      batches = (transform(reader.get_batch(index)) for index in range(reader.num_record_batches))
+      first_batch = next(batches, None)
+      if first_batch is None:
+        first_batch = transform(pa.RecordBatch.from_pylist([], schema=reader.schema))
+      schema = _output_schema(reader.schema, first_batch.schema)
+      with pa.ipc.new_file(sink, schema) as writer:
+        writer.write_batch(first_batch.cast(schema))
+        for batch in batches:
+          writer.write_batch(batch.cast(schema))
+
+  _replace_atomically(working_path, write)
+
+
+def transform_columns(table_path: str, transforms: dict, sample_size: int = 3) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+  """Aplica `transforms[coluna](values)` nas colunas da cópia de trabalho, bloco a bloco.
+
+  Returns:
+    tuple: Exemplos das primeiras `sample_size` linhas (coluna 'id' e colunas transformadas) antes e depois da transformação.
+  """
+  samples_before, samples_after = [], []
+  sampled_rows = 0
+
+  def transform_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    nonlocal sampled_rows
+    missing = sample_size - sampled_rows if batch.num_rows else 0
+    if missing > 0:
+      ids = batch.column("id").to_pandas(types_mapper=pandas_dtype).head(missing)
+      sample_before, sample_after = {"id": ids}, {"id": ids}
+
+    for column_name, transform in transforms.items():
+      index = batch.schema.get_field_index(column_name)
+      values = batch.column(index).to_pandas(types_mapper=pandas_dtype)
+      new_values = transform(values)
+      if missing > 0:
+        sample_before[column_name] = values.head(missing)
+        sample_after[column_name] = new_values.head(missing)
+      batch = batch.set_column(index, column_name, pa.Array.from_pandas(new_values))
+
+    if missing > 0:
+      samples_before.append(pd.DataFrame(sample_before))
+      samples_after.append(pd.DataFrame(sample_after))
+      sampled_rows += len(ids)
+    return batch
+
+  rewrite_batches(table_path, transform_batch)
+  if not samples_before:
+    return None, None
+  return pd.concat(samples_before, ignore_index=True), pd.concat(samples_after, ignore_index=True)
+
+
+def export_csv(table_path: str) -> str:
+  """Exporta a cópia de trabalho de volta para o CSV de origem, bloco a bloco e numa escrita atômica."""
+  working_path = ensure_working_copy(table_path)
+
+  def write(tmp_path: str) -> None:
+    with pa.memory_map(working_path) as source:
+      reader = pa.ipc.open_file(source)
+      with pa_csv.CSVWriter(tmp_path, reader.schema) as writer:
+        for index in range(reader.num_record_batches):
+          writer.write_batch(reader.get_batch(index))
+
+  _replace_atomically(os.path.abspath(table_path), write)
+  _write_source_fingerprint(working_path, table_path)
+  return table_path
@@ -1,28 +1,38 @@
+import os
+
 from dotenv import load_dotenv
 
-from langchain.chat_models import init_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 
+from common.lazy import LazyObject
+from common.llm_cache import TranslationCache
+from common.schema_catalog import SchemaCatalog
+from common.semantic_cache import SemanticCache
+
 load_dotenv()
 
-model = init_chat_model("gemini-2.0-flash", model_provider="google_genai")
+def _new_chat_model():
+    from langchain.chat_models import init_chat_model
+    return init_chat_model("gemini-2.0-flash", model_provider="google_genai")
+
+model = LazyObject(_new_chat_model, "modelo de chat")
+sql_cache = SemanticCache(
+    TranslationCache(
+        os.getenv("LLM_CACHE_PATH") or os.path.join(os.path.dirname(__file__), "llm_cache.sqlite"),
+        namespace="legal_sql"
+    )
+)
+schema_catalog = SchemaCatalog.load(
+    os.getenv("SCHEMA_CATALOG_PATH") or os.path.join(os.path.dirname(__file__), "..", "schema.json")
+)
 
 system_template_sql_convertion = """
 <Contexto>
     Você é um agente autônomo especializado em entender perguntas de negócio da área jurídica e convertê-las para código SQL. Seu papel é receber a pergunta feita pelo usuário, entender quais dados precisam ser buscados e transformar isso em uma query SQL à ser feita na tabela presente no banco de dados, com schema especificado em 'Instruções'"
 </Contexto>
 <Instruções>
-    - As tabelas seguem o formato abaixo:
-        'third-zephyr-464615-d6.legal.contracts' (tabela que armazena os dados da assinatura do contrato):
-            - id (int): Id na tabela.
-            - company_id (int): O id da empresa, FK para a tabela 'company.id'.
-            - signed_date (date): Data em que o contrato foi assinado.
-            - company_signer (str): Nome do responsável pela assinatura do lado da empresa cliente.
-            - av_signer (str): Nome do responsável pela assinatura representando a nossa empresa.
-            - contract_name (str): Nome do arquivo PDF do contrato.
-        'third-zephyr-464615-d6.legal.company_info' (tabela que armazena os dados das empresas clientes):
-            - id (int): Id na tabela.
-            - company_name (str): Nome da empresesa cliente.
+    - As tabelas seguem o formato abaixo (tipos do BigQuery):
+{schema}
     - Monte a query SQL que busca os dados que respondem a pergunta de negócio do usuário, utilizando as tabelas acima.
     - Quando usadas funções de agregação, como 'SUM', 'COUNT', etc, utilize o alias 'total' para o resultado.
     - O retorno deve ser uma query SQL válida, em formatação sql (```sql ... ```).
@@ -34,6 +44,7 @@ system_template_document_extraction = """
     Você é um agente autônomo especializado na extração de cláusulas específicas de um contrato. Seu papel é receber o texto completo de um contrato, e nele, buscar e retornar uma cláusula específica solicitada pelo usuário.
 </Contexto>
 <Instruções>
+    - O contrato pode vir completo ou apenas com as cláusulas mais relacionadas ao pedido do usuário, separadas por '---'.
     - Busque pela cláusula específica, ou da que mais se aproxima do solicitado pelo usuário.
     - Retorne o texto completo, incluindo numeração e título.
 </Instruções>
@@ -42,15 +53,18 @@ system_template_document_extraction = """
 </Contrato>
 """
 
-def convert_natural_language_to_sql(user_input: str) -> str:
+def _translate_to_sql(user_input: str) -> str:
     prompt_template = ChatPromptTemplate.from_messages(
         [("system", system_template_sql_convertion), ("human", "{user_input}")]
     )
     response = model.invoke(
-        prompt_template.format_messages(user_input=user_input)
+        prompt_template.format_messages(schema=schema_catalog.prompt_for(user_input), user_input=user_input)
     )
     return response.content.strip().replace("```sql", "").replace("```", "").strip()
 
+def convert_natural_language_to_sql(user_input: str) -> str:
+    return sql_cache.get_or_create(user_input, system_template_sql_convertion + schema_catalog.fingerprint, lambda: _translate_to_sql(user_input))
+
 def extract_clause_from_document(document_text: str, data_needed: str) -> str:
     formated_prompt = system_template_document_extraction.format(contract=document_text)
     prompt_template = ChatPromptTemplate.from_messages(
@@ -0,0 +1,186 @@
+import hashlib
+import math
+import os
+import re
+import threading
+import unicodedata
+
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+
+DEFAULT_TOP_K = 3
+DEFAULT_MAX_CONTRACTS = 32
+STEM_LENGTH = 6
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+ORDINALS = {
+    "primeira": 1, "segunda": 2, "terceira": 3, "quarta": 4, "quinta": 5, "sexta": 6,
+    "setima": 7, "oitava": 8, "nona": 9, "decima": 10, "vigesima": 20, "trigesima": 30,
+    "quadragesima": 40, "quinquagesima": 50, "unica": 1
+}
+ACCENTED_VOWELS = {"a": "[aáàâã]", "e": "[eéê]", "i": "[ií]", "o": "[oóôõ]", "u": "[uú]"}
+ORDINAL_WORDS = "|".join(
+    "".join(ACCENTED_VOWELS.get(char, char) for char in word) for word in sorted(ORDINALS, key=len, reverse=True)
+)
+# Títulos de cláusula: "CLÁUSULA 5ª - DO PAGAMENTO", "CLÁUSULA DÉCIMA PRIMEIRA: ..." ou "5. DO PAGAMENTO".
+# Em minúsculas, só vale como título se houver um separador após o número ("Cláusula quinta - Do pagamento"),
+# para não confundir com referências no meio do texto ("cláusula quinta deste instrumento.").
+CLAUSE_HEADING_PATTERN = re.compile(
+    rf"^[ \t]*(?P<word>(?i:cl[aá]usula))\s+(?P<number>\d+|(?i:(?:(?:{ORDINAL_WORDS})\b\s*)+))"
+    rf"(?:(?<=\d)\s*[ªºo°])?\s*(?P<separator>[-–—:.)]*)[ \t]*(?P<title>[^\n]*)$",
+    re.MULTILINE
+)
+NUMBERED_HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?P<number>\d{1,3})\s*[.)\-–—]\s+(?P<title>[A-ZÀ-Ý][^\n]{0,120})$",
+    re.MULTILINE
+)
+CLAUSE_REFERENCE_PATTERN = re.compile(
+    rf"\bcl[aá]usula\s+(?:n[ºo°.]*\s*)?(?P<number>\d+|(?:(?:{ORDINAL_WORDS})\b\s*)+)",
+    re.IGNORECASE
+)
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de da do das dos em na no nas nos ao aos pela pelo pelas pelos por para "
+    "com sem e ou que qual quais quando onde como se sua seu suas seus este esta isso essa esse sobre "
+    "entre ser sera sao foi contrato clausula clausulas partes parte presente me mostre diz dizer".split()
+)
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list[str]:
+    """Palavras sem acento e sem stopwords, reduzidas aos primeiros caracteres (flexões viram o mesmo termo)."""
+    words = re.findall(r"[a-z0-9]+", _strip_accents(text.lower()))
+    return [word[:STEM_LENGTH] for word in words if word not in STOPWORDS and len(word) > 1]
+
+
+def parse_clause_number(number: str) -> int | None:
+    """Converte '5' ou 'décima primeira' em 5 e 11."""
+    number = number.strip()
+    if number.isdigit():
+        return int(number)
+    words = _strip_accents(number.lower()).split()
+    values = [ORDINALS[word] for word in words if word in ORDINALS]
+    return sum(values) or None
+
+
+@dataclass
+class Clause:
+    number: int | None
+    title: str
+    text: str
+
+    @property
+    def heading(self) -> str:
+        return self.text.split("\n", 1)[0].strip()
+
+
+def _is_clause_heading(match: re.Match) -> bool:
+    """Título em maiúsculas ('CLÁUSULA QUINTA DO PAGAMENTO') ou com separador após o número."""
+    if match.group("separator"):
+        return True
+    return match.group("word").isupper() and match.group("title") == match.group("title").upper()
+
+
+def segment_clauses(text: str) -> list[Clause]:
+    """Divide o contrato nas cláusulas numeradas; o texto antes da primeira cláusula vira o preâmbulo.
+
+    Usa os títulos 'CLÁUSULA ...' quando existem, e senão os títulos numerados ('5. DO PAGAMENTO').
+    Subitens (5.1, 5.2, ...) ficam dentro da cláusula principal.
+    """
+    matches = [match for match in CLAUSE_HEADING_PATTERN.finditer(text) if _is_clause_heading(match)]
+    matches = matches or list(NUMBERED_HEADING_PATTERN.finditer(text))
+    if not matches:
+        return [Clause(number=None, title="", text=text.strip())]
+
+    clauses = []
+    preamble = text[:matches[0].start()].strip()
+    if preamble:
+        clauses.append(Clause(number=0, title="Preâmbulo", text=preamble))
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        end = next_match.start() if next_match else len(text)
+        clauses.append(Clause(
+            number=parse_clause_number(match.group("number")),
+            title=match.group("title").strip(" -–—:."),
+            text=text[match.start():end].strip()
+        ))
+    return clauses
+
+
+class ClauseIndex:
+    """Índice BM25 das cláusulas de um contrato, com o título de cada cláusula valendo em dobro."""
+
+    def __init__(self, clauses: list[Clause]):
+        self.clauses = clauses
+        self._documents = [Counter(tokenize(clause.title) * 2 + tokenize(clause.text)) for clause in clauses]
+        self._lengths = [sum(document.values()) for document in self._documents]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0
+        document_frequency = Counter(term for document in self._documents for term in document)
+        total = len(self._documents)
+        self._idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> list[tuple[float, Clause]]:
+        """Retorna as `top_k` cláusulas com maior pontuação BM25 para a consulta (só as com pontuação > 0)."""
+        terms = set(tokenize(query))
+        scored = []
+        for clause, document, length in zip(self.clauses, self._documents, self._lengths):
+            score = 0.0
+            for term in terms & document.keys():
+                frequency = document[term]
+                normalization = BM25_K1 * (1 - BM25_B + BM25_B * length / (self._average_length or 1))
+                score += self._idf[term] * frequency * (BM25_K1 + 1) / (frequency + normalization)
+            if score > 0:
+                scored.append((score, clause))
+        scored.sort(key=lambda item: -item[0])
+        return scored[:top_k]
+
+    def by_number(self, number: int) -> Clause | None:
+        """Cláusula com o número `number`, ou None se não houver exatamente uma."""
+        matches = [clause for clause in self.clauses if clause.number == number]
+        return matches[0] if len(matches) == 1 else None
+
+    def direct_answer(self, query: str) -> Clause | None:
+        """Cláusula que responde a consulta sem precisar do LLM, ou None.
+
+        Isso acontece quando a consulta cita a cláusula pelo número ('cláusula 5', 'cláusula quinta'),
+        e só uma cláusula tem esse número, ou quando todos os termos da consulta aparecem no título de uma única cláusula ('rescisão').
+        """
+        reference = CLAUSE_REFERENCE_PATTERN.search(query)
+        if reference:
+            number = parse_clause_number(reference.group("number"))
+            clause = self.by_number(number) if number is not None else None
+            if clause is not None:
+                return clause
+
+        terms = set(tokenize(query))
+        if not terms:
+            return None
+        matches = [clause for clause in self.clauses if clause.title and terms <= set(tokenize(clause.title))]
+        return matches[0] if len(matches) == 1 else None
+
+
+class ClauseIndexCache:
+    """Índices dos contratos consultados recentemente, identificados pelo hash do texto extraído."""
+
+    def __init__(self, max_contracts: int | None = None):
+        self.max_contracts = max_contracts or int(os.getenv("CLAUSE_INDEX_MAX_CONTRACTS") or DEFAULT_MAX_CONTRACTS)
+        self._indexes: OrderedDict[str, ClauseIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> ClauseIndex:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+        index = ClauseIndex(segment_clauses(text))
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_contracts:
+                self._indexes.popitem(last=False)
+        return index
@@ -1,39 +1,45 @@
 import asyncio
-import json
 import os
+import sys
 import logging
 
-import mcp.server.stdio
+from concurrent.futures import ThreadPoolExecutor
 
 from pathlib import Path
 
-from google.adk.tools.function_tool import FunctionTool
-from google.adk.tools.mcp_tool.conversion_utils import adk_to_mcp_tool_type
-from mcp import types as mcp_types
-from mcp.server.lowlevel import NotificationOptions, Server
-from mcp.server.models import InitializationOptions
-from google.cloud import bigquery
-
 from dotenv import load_dotenv
 
-from chain import convert_natural_language_to_sql, extract_clause_from_document
-from ocr import process_documents
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.bq_cache import BigQueryResultCache
+from common.bq_results import InvalidContinuationToken, ResultPager
+from common.executor import ToolPolicy
+from common.lazy import LazyObject, WarmUp
+from common.log_pipeline import configure_logging
+from common.local_backend import DuckDBBackend
+from common.tool_server import SCHEMA_CACHE_FILE, ToolServer
+
+from chain import convert_natural_language_to_sql, extract_clause_from_document, model, schema_catalog
+from clauses import DEFAULT_TOP_K, ClauseIndexCache
+from ocr import process_documents, warm_up_ocr
 
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str((Path(__file__).parent / "credentials" / "credentials.json").resolve())
 LOG_FILE_PATH = os.path.join(os.path.dirname(__file__), "mcp_server_activity.log")
 
 load_dotenv()
 
-logging.basicConfig(
-  level=logging.DEBUG,
-  format="%(asctime)s - %(levelname)s -[%(filename)s:%(lineno)d] - %(message)s",
-  handlers=[
-    logging.FileHandler(LOG_FILE_PATH, mode="a")
-  ] 
-)
+configure_logging(LOG_FILE_PATH)
 
-app = Server("analytics_server")
-client = bigquery.Client()
+def new_bigquery_client():
+    from google.cloud import bigquery
+    return bigquery.Client()
+
+client = LazyObject(new_bigquery_client, "bigquery.Client")
+schema_catalog.sync_with(client)
+result_cache = BigQueryResultCache(client)
+result_pager = ResultPager(result_cache, local_backend=DuckDBBackend())
+clause_indexes = ClauseIndexCache()
+warm_up = WarmUp([client.get, model.get, schema_catalog.ensure_synced, warm_up_ocr])
+batch_pool = ThreadPoolExecutor(max_workers=int(os.getenv("CLAUSE_BATCH_WORKERS", 8)), thread_name_prefix="clause-batch")
 
 def convert_to_sql(user_input: str) -> str:
     """Gera uma query SQL que busca a resposta para o problema de negócio questionado pelo usuário.
@@ -49,18 +55,32 @@ def convert_to_sql(user_input: str) -> str:
     return sql
 
 def query_to_bq(query: str) -> str:
-    """Executa a query SQL no BigQuery e retorna o resultado.
+    """Executa a query SQL no BigQuery e retorna a primeira página do resultado, em markdown ou CSV.
 
     Args:
     query(str): Query SQL a ser executada.
 
     Returns:
-    str: Resultado da execução da query.
+    str: Primeira página do resultado da query e, se houver mais linhas, o token para buscar as próximas.
+    """
+    result = result_pager.first_page(query)
+    logging.info(f"Resultado da busca no BQ: {result}")
+    return result
+
+def fetch_more_results(continuation_token: str) -> str:
+    """Busca a próxima página do resultado de uma consulta anterior, sem executar a query novamente.
+
+    Args:
+    continuation_token(str): Token de continuação retornado junto da página anterior.
+
+    Returns:
+    str: A próxima página do resultado e, se ainda houver linhas, um novo token de continuação.
     """
-    query_job = client.query(query)
-    rows = list(query_job.result())
-    logging.info(f"Resultado da busca no BQ: {str(rows)}")
-    return str(rows)
+    try:
+        return result_pager.next_page(continuation_token)
+    except InvalidContinuationToken as e:
+        logging.error(f"Erro ao buscar mais resultados: {e}")
+        return str(e)
 
 def get_contract_info(user_input: str) -> str:
     """Executa a cadeia de comandos para gerar uma query SQL e executá-la no BigQuery, retornando o resultado da busca.
@@ -86,83 +106,80 @@ def get_specific_clause(contract_name: str, clause_data_needed: str) -> str:
     str: O texto extraído do contrato com a cláusula solicitada pelo usuário.
     """
     document_text = process_documents(contract_name)
+    index = clause_indexes.get(document_text)
+
+    direct_clause = index.direct_answer(clause_data_needed)
+    if direct_clause is not None:
+        logging.info(f"Cláusula '{direct_clause.heading}' encontrada pelo índice, sem chamar o LLM.")
+        return direct_clause.text
+
+    candidates = index.search(clause_data_needed, int(os.getenv("CLAUSE_TOP_K", DEFAULT_TOP_K)))
+    if candidates:
+        logging.info(f"Cláusulas candidatas enviadas ao LLM: {[clause.heading for _, clause in candidates]}")
+        document_text = "\n---\n".join(clause.text for _, clause in candidates)
     clause = extract_clause_from_document(document_text, clause_data_needed)
 
     return clause
 
-ADK_ANALYTICS_TOOLS = {
-    "get_contract_info": FunctionTool(func=get_contract_info),
-    "get_specific_clause": FunctionTool(func=get_specific_clause)
-}
-
-@app.list_tools()
-async def list_mcp_tools() -> list[mcp_types.Tool]:
-    """MCP handler que lista as tools que este server expõe."""
-    logging.info("MCP Server: Iniciou a listagem de tools.")
-    mcp_tools_list = []
-    for tool_name, adk_tool_instance in ADK_ANALYTICS_TOOLS.items():
-        if not adk_tool_instance.name:
-            adk_tool_instance.name = tool_name
-        
-        mcp_tools_schema = adk_to_mcp_tool_type(adk_tool_instance)
-        mcp_tools_list.append(mcp_tools_schema)
-    return mcp_tools_list
-
-@app.call_tool()
-async def call_mcp_tool(name: str, arguments: dict) -> list[mcp_types.TextContent]:
-    """MCP handler para executar a chamada da tool solicitada pelo MCP client."""
-    logging.info(f"MCP Server: Iniciou a chamada da tool {name} com os args: {arguments}")
-
-    if name in ADK_ANALYTICS_TOOLS:
-        adk_tool_instance = ADK_ANALYTICS_TOOLS[name]
+async def _report_progress(progress: int, total: int, message: str) -> None:
+    """Envia ao cliente MCP o resultado parcial de um lote, se ele tiver pedido notificações de progresso."""
+    try:
+        context = server.app.request_context
+    except LookupError:
+        return
+    progress_token = context.meta.progressToken if context.meta else None
+    if progress_token is not None:
+        await context.session.send_progress_notification(progress_token, progress, total=total, message=message)
+
+async def get_clauses_from_contracts(contract_names: list[str], clause_data_needed: str) -> str:
+    """Extrai a mesma cláusula ou informação de vários contratos ao mesmo tempo.
+
+    Args:
+    contract_names(list[str]): Os nomes dos contratos (coluna 'contract_name' retornada por 'get_contract_info').
+    clause_data_needed(str): A cláusula ou os dados que o usuário deseja extrair de cada contrato.
+
+    Returns:
+    str: O texto extraído de cada contrato, identificado pelo nome do contrato.
+    """
+    contract_names = list(dict.fromkeys(contract_names))
+    loop = asyncio.get_running_loop()
+
+    async def extract(contract_name: str) -> tuple[str, str]:
         try:
-            adk_tool_response = await adk_tool_instance.run_async(
-               args=arguments,
-               tool_context=None
-            )
-            logging.info(f"MCP Server: Tool {name} executada. Resposta: {adk_tool_response}")
-            response_text = json.dumps(adk_tool_response, indent=2)
-            return [mcp_types.TextContent(type="text", text=response_text)]
+            clause = await loop.run_in_executor(batch_pool, get_specific_clause, contract_name, clause_data_needed)
         except Exception as e:
-            logging.error(f"MCP Server: Erro ao executar tool {name}. Resposta: {e}")
-            payload = {
-                "success": False,
-                "message": f"Falha ao executar tool '{name}': {str(e)}"
-            }
-            error_text = json.dumps(payload)
-            return [mcp_types.TextContent(type="text", text=error_text)]
-    else:
-        logging.error(f"MCP Server: Erro ao executar tool. Tool não implementada.")
-        payload = {
-        "success": False,
-        "message": f"Tool não implementada neste servidor."
-        }
-        error_text = json.dumps(payload)
-        return [mcp_types.TextContent(type="text", text=error_text)]
-
-async def run_mcp_stdio_server():
-    """Executa o MCP server, trabalhando no stdio"""
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name=app.name,
-                server_version="0.1.0",
-                capabilities=app.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={}
-                )
-            )
-        )
-
+            logging.error(f"Erro ao extrair a cláusula do contrato {contract_name}: {e}")
+            clause = f"Ocorreu um erro ao processar o contrato {contract_name}: {e}"
+        return contract_name, clause
+
+    results = {}
+    for completed in asyncio.as_completed([extract(contract_name) for contract_name in contract_names]):
+        contract_name, clause = await completed
+        results[contract_name] = clause
+        logging.info(f"Lote: contrato {contract_name} concluído ({len(results)}/{len(contract_names)}).")
+        await _report_progress(len(results), len(contract_names), f"### {contract_name}\n{clause}")
+
+    return "\n\n".join(f"### {contract_name}\n{results[contract_name]}" for contract_name in contract_names)
+
+server = ToolServer(
+    "legal_server",
+    tools={
+        "get_contract_info": get_contract_info,
+        "get_specific_clause": get_specific_clause,
+        "get_clauses_from_contracts": get_clauses_from_contracts,
+        "fetch_more_results": fetch_more_results
+    },
+    policies={
+        "get_contract_info": ToolPolicy(max_concurrency=8),
+        "get_specific_clause": ToolPolicy(max_concurrency=4, cache_ttl_seconds=600),
+        "get_clauses_from_contracts": ToolPolicy(max_concurrency=2, timeout_seconds=900),
+        "fetch_more_results": ToolPolicy(max_concurrency=8)
+    },
+    default_port=8103,
+    schema_cache_path=Path(__file__).parent / SCHEMA_CACHE_FILE,
+    warm_up=warm_up,
+    on_shutdown=[lambda: batch_pool.shutdown(wait=False, cancel_futures=True)]
+)
 
 if __name__ == "__main__":
-  logging.info(f"Iniciando servidor MCP.")
-  try:
-    asyncio.run(run_mcp_stdio_server())
-  except Exception as e:
-    logging.critical(f"Servidor MCP encontrou um erro não tratado: {e}", exc_info=True)
-  finally:
-    logging.info(f"Servidor MCP encerrando.")
-    logging.info(f"\n\n")
\ No newline at end of file
+  server.run()
@@ -1,34 +1,241 @@
+"""OCR dos contratos com o Document AI, com cache em disco do texto e do layout extraídos.
+
+O cache é endereçado pelo conteúdo do PDF: a chave combina o processador com o `md5_hash` do
+objeto no GCS (ou com o nome e a `generation`, se o md5 não estiver disponível), então um
+contrato só é processado de novo quando o arquivo muda. O bucket só precisa expor `get_blob(name)`, com os
+atributos `name`, `generation` e `md5_hash`, e o processador `name` e `process(gcs_uri, mime_type)`,
+que retorna um documento com `text` e `pages`. Assim, um bucket e um processador falsos (ver
+`tests/fakes.py`) podem substituir os clientes do GCS e do Document AI em testes.
+"""
+import gzip
+import hashlib
+import json
+import logging
 import os
+import tempfile
+import threading
+
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from google.cloud import documentai
-from google.cloud import storage
 from google.api_core.client_options import ClientOptions
 
+from common.lazy import LazyObject, lazy_import
+
+documentai = lazy_import("google.cloud.documentai")
+
 project_id = os.getenv("PROJECT_ID")
 location = os.getenv("LOCATION")
 processor_id = os.getenv("PROCESSOR_ID")
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str((Path(__file__).parent / "credentials" / "credentials.json").resolve())
 
-gcs_client = storage.Client()
+CONTRACTS_BUCKET = "signed_contracts_adk"
+CONTRACTS_PREFIX = "signed_contracts/"
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+
+def _new_storage_client():
+    from google.cloud import storage
+    return storage.Client()
+
+
+gcs_client = LazyObject(_new_storage_client, "storage.Client")
+
+
+@dataclass
+class OcrResult:
+    """Texto extraído do contrato e o layout das páginas.
+
+    Cada página tem `page_number`, `width`, `height` e `paragraphs`, cada parágrafo com os
+    offsets `start`/`end` no texto e a caixa normalizada `box` ([x0, y0, x1, y1]).
+    """
+    text: str
+    pages: list[dict] = field(default_factory=list)
+    from_cache: bool = False
+
+
+def _text_span(layout) -> tuple[int, int]:
+    segments = list(layout.text_anchor.text_segments)
+    if not segments:
+        return 0, 0
+    return int(segments[0].start_index or 0), int(segments[-1].end_index or 0)
+
+
+def _bounding_box(layout) -> list[float] | None:
+    vertices = list(layout.bounding_poly.normalized_vertices)
+    if not vertices:
+        return None
+    xs = [vertex.x for vertex in vertices]
+    ys = [vertex.y for vertex in vertices]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def extract_layout(document) -> list[dict]:
+    """Resume as páginas do documento do Document AI em parágrafos com offsets no texto e posição."""
+    pages = []
+    for page in document.pages:
+        paragraphs = []
+        for paragraph in page.paragraphs:
+            start, end = _text_span(paragraph.layout)
+            paragraphs.append({"start": start, "end": end, "box": _bounding_box(paragraph.layout)})
+        pages.append({
+            "page_number": page.page_number,
+            "width": page.dimension.width,
+            "height": page.dimension.height,
+            "paragraphs": paragraphs
+        })
+    return pages
+
+
+class OcrCache:
+    """Resultados de OCR em disco (JSON compactado com gzip), com descarte dos usados há mais tempo."""
+
+    def __init__(self, directory: str | None = None, max_bytes: int | None = None):
+        self.directory = directory or os.getenv("OCR_CACHE_DIR") or os.path.join(os.path.dirname(__file__), "ocr_cache")
+        self.max_bytes = max_bytes or int(os.getenv("OCR_CACHE_MAX_BYTES") or DEFAULT_CACHE_MAX_BYTES)
+        self.enabled = os.getenv("OCR_CACHE_ENABLED", "true").lower() != "false"
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json.gz")
+
+    def get(self, key: str) -> OcrResult | None:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return OcrResult(text=data["text"], pages=data["pages"], from_cache=True)
+
+    def put(self, key: str, result: OcrResult) -> None:
+        if not self.enabled:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            with os.fdopen(fd, "wb") as raw_file, gzip.open(raw_file, "wt", encoding="utf-8") as cache_file:
+                json.dump({"text": result.text, "pages": result.pages}, cache_file)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logging.warning(f"Cache OCR: não foi possível gravar o resultado em disco: {e}")
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove os resultados usados há mais tempo até o diretório caber em `max_bytes`."""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json.gz"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class DocumentAiProcessor:
+    """Processador do Document AI. O nome é montado a partir das variáveis de ambiente, sem criar o cliente."""
+
+    def __init__(self, name: str | None = None, client=None):
+        self.name = name or f"projects/{project_id}/locations/{location}/processors/{processor_id}"
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Cliente do Document AI, criado uma única vez e compartilhado entre as chamadas (é thread-safe)."""
+        with self._lock:
+            if self._client is None:
+                opts = ClientOptions(api_endpoint="us-documentai.googleapis.com")
+                self._client = documentai.DocumentProcessorServiceClient(client_options=opts)
+            return self._client
+
+    def process(self, gcs_uri: str, mime_type: str = "application/pdf"):
+        """Processa o arquivo `gcs_uri` e retorna o documento extraído pelo Document AI."""
+        gcs_document = documentai.GcsDocument(gcs_uri=gcs_uri, mime_type=mime_type)
+        request = documentai.ProcessRequest(name=self.name, gcs_document=gcs_document)
+        return self.client.process_document(request=request).document
+
+
+class DocumentOcr:
+    """Faz o OCR dos contratos do bucket, reaproveitando o processador do Document AI e o cache em disco.
+
+    Chamadas simultâneas para o mesmo arquivo esperam o primeiro OCR terminar, em vez de
+    processá-lo em paralelo.
+    """
+
+    def __init__(self, bucket, processor=None, cache: OcrCache | None = None):
+        self.bucket = bucket
+        self.processor = processor or DocumentAiProcessor()
+        self.cache = cache or OcrCache()
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    def cache_key(self, blob) -> str:
+        if blob.md5_hash:
+            source = f"{self.processor.name}|md5:{blob.md5_hash}"
+        else:
+            source = f"{self.processor.name}|{self.bucket.name}/{blob.name}|generation:{blob.generation}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def process(self, blob_name: str) -> OcrResult:
+        """Retorna o texto e o layout do PDF `blob_name`, do cache ou processando-o no Document AI.
+
+        Raises:
+            FileNotFoundError: Se o arquivo não existir no bucket.
+        """
+        blob = self.bucket.get_blob(blob_name)
+        if blob is None:
+            raise FileNotFoundError(f"O arquivo {blob_name} não existe no bucket {self.bucket.name}.")
+
+        key = self.cache_key(blob)
+        with self._key_lock(key):
+            cached = self.cache.get(key)
+            if cached is not None:
+                logging.info(f"OCR: {blob_name} lido do cache.")
+                return cached
+
+            document = self.processor.process(f"gs://{self.bucket.name}/{blob.name}", "application/pdf")
+            result = OcrResult(text=document.text, pages=extract_layout(document))
+            self.cache.put(key, result)
+            logging.info(f"OCR: {blob_name} processado no Document AI ({len(result.pages)} páginas).")
+            return result
+
+
+_document_ocr = None
+_document_ocr_lock = threading.Lock()
 
-def process_documents(contract_name: str):
-    opts = ClientOptions(api_endpoint="us-documentai.googleapis.com")
-    client = documentai.DocumentProcessorServiceClient(client_options=opts)
 
-    gcs_input_uri = f"signed_contracts_adk/signed_contracts/{contract_name}"
-    gcs_document = documentai.GcsDocument(
-        gcs_uri=gcs_input_uri, mime_type='application/pdf'
-    )
+def document_ocr() -> DocumentOcr:
+    global _document_ocr
+    with _document_ocr_lock:
+        if _document_ocr is None:
+            _document_ocr = DocumentOcr(gcs_client.bucket(CONTRACTS_BUCKET))
+        return _document_ocr
 
-    name = client.processor_path(project_id, location, processor_id)
 
-    request = documentai.ProcessRequest(
-        name=name,
-        gcs_document=gcs_document
-    )
+def process_documents(contract_name: str) -> str:
+    return document_ocr().process(CONTRACTS_PREFIX + contract_name).text
 
-    result = client.process_document(request=request)
-    document = result.document
 
-    return document.text
\ No newline at end of file
+def warm_up_ocr() -> None:
+    """Cria antecipadamente os clientes do GCS e do Document AI."""
+    document_ocr().processor.client
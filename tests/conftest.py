@@ -0,0 +1,26 @@
+import sys
+
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Os módulos dos servidores MCP são importados sem pacote, a partir da pasta de cada servidor.
+sys.path[:0] = [
+    str(ROOT),
+    str(ROOT / "data_agent" / "mcp_server"),
+    str(ROOT / "analytics_agent" / "mcp_server"),
+    str(ROOT / "legal_agent" / "mcp_server")
+]
+
+
+@pytest.fixture(scope="session")
+def etl():
+    """Servidor ETL importado sem configurar o log em arquivo na pasta do servidor."""
+    import common.log_pipeline as log_pipeline
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(log_pipeline, "configure_logging", lambda log_file_path: None)
+        import etl
+    return etl
@@ -0,0 +1,141 @@
+"""Substitutos em memória dos serviços do Google Cloud usados nos testes."""
+import base64
+import datetime
+import hashlib
+
+from types import SimpleNamespace
+
+import pyarrow as pa
+
+
+class FakeBlob:
+    """Objeto do GCS em memória, com a mesma interface usada por `gcs_sync`."""
+
+    def __init__(self, name: str, data: bytes, generation: int = 1):
+        self.name = name
+        self.data = data
+        self.generation = generation
+        self.size = len(data)
+        self.md5_hash = base64.b64encode(hashlib.md5(data).digest()).decode()
+        self.full_downloads = 0
+        self.ranges: list[tuple[int, int]] = []
+        self.fail_ranges: set[int] = set()
+
+    def download_to_filename(self, path: str) -> None:
+        self.full_downloads += 1
+        with open(path, "wb") as file:
+            file.write(self.data)
+
+    def download_as_bytes(self, start: int, end: int, if_generation_match: int | None = None) -> bytes:
+        if if_generation_match is not None and if_generation_match != self.generation:
+            raise RuntimeError("412 Precondition Failed")
+        if start in self.fail_ranges:
+            self.fail_ranges.discard(start)
+            raise ConnectionError(f"falha simulada na fatia {start}")
+        self.ranges.append((start, end))
+        return self.data[start:end + 1]
+
+
+class FakeBucket:
+    """Bucket do GCS em memória: `upload` cria ou substitui um objeto, incrementando a geração."""
+
+    def __init__(self, name: str = "bucket-teste"):
+        self.name = name
+        self.blobs: dict[str, FakeBlob] = {}
+
+    def upload(self, name: str, data: bytes) -> FakeBlob:
+        previous = self.blobs.get(name)
+        blob = FakeBlob(name, data, generation=previous.generation + 1 if previous else 1)
+        self.blobs[name] = blob
+        return blob
+
+    def list_blobs(self) -> list[FakeBlob]:
+        return list(self.blobs.values())
+
+    def get_blob(self, name: str) -> FakeBlob | None:
+        return self.blobs.get(name)
+
+
+class FakeProcessor:
+    """Processador do Document AI em memória: o texto de cada arquivo é o seu próprio URI, em uma página."""
+
+    def __init__(self, name: str = "projects/projeto/locations/us/processors/ocr"):
+        self.name = name
+        self.calls: list[str] = []
+
+    def process(self, gcs_uri: str, mime_type: str = "application/pdf"):
+        self.calls.append(gcs_uri)
+        layout = SimpleNamespace(
+            text_anchor=SimpleNamespace(text_segments=[SimpleNamespace(start_index=0, end_index=len(gcs_uri))]),
+            bounding_poly=SimpleNamespace(normalized_vertices=[SimpleNamespace(x=0.1, y=0.2), SimpleNamespace(x=0.9, y=0.3)])
+        )
+        page = SimpleNamespace(
+            page_number=1,
+            dimension=SimpleNamespace(width=612.0, height=792.0),
+            paragraphs=[SimpleNamespace(layout=layout)]
+        )
+        return SimpleNamespace(text=gcs_uri, pages=[page])
+
+
+class FakeRowIterator:
+    def __init__(self, table, start_index: int | None, max_results: int | None):
+        self.total_rows = table.num_rows
+        start_index = start_index or 0
+        self._table = table.slice(start_index, max_results if max_results is not None else table.num_rows)
+
+    def to_arrow(self):
+        return self._table
+
+
+class FakeQueryJob:
+    def __init__(self, job_id: str, table, total_bytes_processed: int):
+        self.job_id = job_id
+        self.location = "US"
+        self.total_bytes_processed = total_bytes_processed
+        self._table = table
+
+    def result(self, start_index: int | None = None, max_results: int | None = None) -> FakeRowIterator:
+        return FakeRowIterator(self._table, start_index, max_results)
+
+
+class FakeTable:
+    def __init__(self, modified):
+        self.modified = modified
+
+
+class FakeBigQueryClient:
+    """Cliente do BigQuery em memória: toda query devolve `result`, e cada tabela tem a sua data de modificação.
+
+    Jobs com `job_config.dry_run` só informam `bytes_processed`; as demais queries ficam em `queries`.
+    """
+
+    def __init__(self, result=None, project: str = "projeto", bytes_processed: int = 1000):
+        self.project = project
+        self.result = result if result is not None else pa.table({"estado": ["SP", "RJ"], "total": [10, 20]})
+        self.bytes_processed = bytes_processed
+        self.queries: list[str] = []
+        self.job_configs: list = []
+        self.dry_runs: list[str] = []
+        self.jobs: dict[str, FakeQueryJob] = {}
+        self.modified: dict[str, object] = {}
+
+    def touch(self, table_id: str) -> None:
+        """Simula uma escrita na tabela, avançando a sua data de modificação."""
+        current = self.modified.get(table_id) or datetime.datetime(2024, 1, 1)
+        self.modified[table_id] = current + datetime.timedelta(seconds=1)
+
+    def query(self, sql: str, job_config=None):
+        if job_config is not None and getattr(job_config, "dry_run", False):
+            self.dry_runs.append(sql)
+            return FakeQueryJob(f"dry-run-{len(self.dry_runs)}", self.result.slice(0, 0), self.bytes_processed)
+        self.queries.append(sql)
+        self.job_configs.append(job_config)
+        job = FakeQueryJob(f"job-{len(self.queries)}", self.result, self.bytes_processed)
+        self.jobs[job.job_id] = job
+        return job
+
+    def get_job(self, job_id: str, location: str | None = None) -> FakeQueryJob:
+        return self.jobs[job_id]
+
+    def get_table(self, table_id: str) -> FakeTable:
+        return FakeTable(self.modified.setdefault(table_id, datetime.datetime(2024, 1, 1)))
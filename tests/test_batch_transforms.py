@@ -0,0 +1,37 @@
+import pytest
+
+from working_copy import read_arrow, read_frame
+
+
+@pytest.fixture
+def table_path(tmp_path) -> str:
+    path = tmp_path / "usuarios.csv"
+    path.write_text("id,yearly_income,total_debt,gender\n1,$1000,$10,F\n2,,$20,M\n3,\"$2,500\",,F\n")
+    return str(path)
+
+
+def test_compact_integers_with_nulls_keep_their_type(etl, table_path):
+    etl.remove_symbols_batch(table_path, ["yearly_income", "total_debt"], "[$]", "Int32")
+
+    assert str(read_arrow(table_path).schema.field("yearly_income").type) == "int32"
+    df = read_frame(table_path)
+    assert str(df["yearly_income"].dtype) == "Int32"
+    assert df["yearly_income"].isna().tolist() == [False, True, False]
+    assert df["yearly_income"].dropna().tolist() == [1000, 2500]
+    schema = dict(line.split() for line in etl.get_table_schema(table_path).splitlines()[:-1])
+    assert schema == {"id": "Int64", "yearly_income": "Int32", "total_debt": "Int32", "gender": "object"}
+
+
+def test_fill_null_batch_fills_and_converts_every_column_in_one_write(etl, table_path):
+    etl.remove_symbols_batch(table_path, ["yearly_income", "total_debt"], "", "float64")
+
+    result = etl.fill_null_batch(table_path, ["yearly_income", "total_debt"], "0", "float32")
+
+    df = read_frame(table_path)
+    assert df[["yearly_income", "total_debt"]].to_dict("list") == {"yearly_income": [1000.0, 0.0, 2500.0], "total_debt": [10.0, 20.0, 0.0]}
+    assert str(df["total_debt"].dtype) == "float32"
+    assert "yearly_income" in result
+
+
+def test_unsupported_dtype_is_rejected(etl, table_path):
+    assert "não suportado" in etl.fill_null_batch(table_path, ["gender"], "X", "int128")
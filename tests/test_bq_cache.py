@@ -0,0 +1,124 @@
+import pyarrow as pa
+import pytest
+
+import common.bq_cache as bq_cache
+
+from common.bq_cache import BigQueryResultCache, qualified_tables
+from tests.fakes import FakeBigQueryClient
+
+SQL = "SELECT estado, SUM(amount) AS total FROM `projeto.fraude.transacoes` GROUP BY estado"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(bq_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def client() -> FakeBigQueryClient:
+    return FakeBigQueryClient()
+
+
+def new_cache(client, **kwargs) -> BigQueryResultCache:
+    return BigQueryResultCache(client, metadata_ttl_seconds=0, **kwargs)
+
+
+def test_repeated_query_is_served_from_cache(client):
+    cache = new_cache(client)
+
+    first = cache.query(SQL)
+    second = cache.query(f"{SQL};")
+
+    assert not first.from_cache and second.from_cache
+    assert second.table.equals(first.table)
+    assert len(client.queries) == 1
+
+
+def test_modified_table_invalidates_the_result(client):
+    cache = new_cache(client)
+    cache.query(SQL)
+
+    client.touch("projeto.fraude.transacoes")
+    result = cache.query(SQL)
+
+    assert not result.from_cache
+    assert len(client.queries) == 2
+    assert cache.query(SQL).from_cache
+
+
+def test_result_expires_after_ttl(client, clock):
+    cache = new_cache(client, ttl_seconds=60)
+    cache.query(SQL)
+
+    clock.now += 59
+    assert cache.query(SQL).from_cache
+    clock.now += 2
+    assert not cache.query(SQL).from_cache
+    assert len(client.queries) == 2
+
+
+def test_least_recently_used_result_is_evicted(client):
+    page_bytes = client.result.nbytes
+    cache = new_cache(client, max_bytes=2 * page_bytes)
+    queries = [f"{SQL} LIMIT {limit}" for limit in (1, 2, 3)]
+
+    cache.query(queries[0])
+    cache.query(queries[1])
+    cache.query(queries[0])
+    cache.query(queries[2])
+
+    assert cache.stats()["entries"] == 2
+    assert cache.query(queries[0]).from_cache
+    assert not cache.query(queries[1]).from_cache
+
+
+def test_partially_qualified_tables_use_the_client_project(client):
+    cache = new_cache(client)
+    sql = "SELECT COUNT(*) AS total FROM fraude.transacoes t JOIN `projeto.fraude.cartoes` c ON t.card_id = c.id"
+    cache.query(sql)
+
+    client.touch("projeto.fraude.transacoes")
+
+    assert not cache.query(sql).from_cache
+
+
+def test_queries_with_unresolved_tables_are_not_cached(client):
+    cache = new_cache(client)
+    sql = "SELECT COUNT(*) AS total FROM transacoes"
+
+    cache.query(sql)
+    cache.query(sql)
+
+    assert len(client.queries) == 2
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("sql, tables", [
+    ("SELECT EXTRACT(YEAR FROM t.date) FROM `p.d.t` t", ["p.d.t"]),
+    ("WITH x AS (SELECT * FROM d.t) SELECT * FROM x", ["projeto.d.t"]),
+    ("SELECT * FROM `p.d.t`, UNNEST(t.items) AS item", ["p.d.t"]),
+    ("SELECT 'FROM tabela' AS texto FROM `p`.`d`.`t`", ["p.d.t"]),
+    ("SELECT * FROM t", None)
+])
+def test_qualified_tables(sql, tables):
+    assert qualified_tables(sql, "projeto") == tables
+
+
+def test_disk_cache_survives_a_new_instance(client, tmp_path):
+    new_cache(client, disk_directory=str(tmp_path)).query(SQL)
+
+    result = new_cache(client, disk_directory=str(tmp_path)).query(SQL)
+
+    assert result.from_cache
+    assert result.table.equals(pa.table({"estado": ["SP", "RJ"], "total": [10, 20]}))
+    assert len(client.queries) == 1
@@ -0,0 +1,87 @@
+import pytest
+
+from common.bq_cache import BigQueryResultCache
+from common.bq_guard import QueryBudgetExceeded, QueryGuard
+from tests.fakes import FakeBigQueryClient
+
+TABLE = "`projeto.fraude.transacoes`"
+
+
+@pytest.fixture
+def guard() -> QueryGuard:
+    return QueryGuard(FakeBigQueryClient(), max_bytes=10_000, auto_limit=100)
+
+
+@pytest.mark.parametrize("sql", [
+    f"SELECT estado, SUM(amount) AS total FROM {TABLE} GROUP BY estado",
+    f"SELECT COUNT(*) AS total FROM {TABLE}",
+    f"SELECT estado FROM {TABLE} GROUP BY estado",
+    f"SELECT * FROM {TABLE} LIMIT 10",
+    f"SELECT * FROM {TABLE} ORDER BY amount DESC LIMIT 10 OFFSET 20",
+    f"DELETE FROM {TABLE} WHERE TRUE"
+])
+def test_apply_limit_keeps_queries_that_do_not_need_it(guard, sql):
+    assert guard.apply_limit(sql) == sql
+
+
+@pytest.mark.parametrize("sql", [
+    f"SELECT * FROM {TABLE}",
+    f"select id, amount from {TABLE} where amount > 10;",
+    f"WITH altas AS (SELECT * FROM {TABLE} WHERE amount > 100) SELECT * FROM altas"
+])
+def test_apply_limit_adds_limit_to_listings(guard, sql):
+    limited = guard.apply_limit(sql)
+
+    assert limited.endswith("\nLIMIT 100")
+    assert ";" not in limited
+
+
+def test_apply_limit_disabled_with_zero(guard):
+    guard.auto_limit = 0
+
+    assert guard.apply_limit(f"SELECT * FROM {TABLE}") == f"SELECT * FROM {TABLE}"
+
+
+def test_check_rejects_queries_over_budget(guard):
+    guard.client.bytes_processed = 10_001
+
+    with pytest.raises(QueryBudgetExceeded):
+        guard.check(f"SELECT * FROM {TABLE}")
+    assert guard.client.queries == []
+
+
+def test_check_uses_a_dry_run_and_caps_billing(guard):
+    plan = guard.check(f"SELECT * FROM {TABLE}")
+
+    assert plan.estimated_bytes == 1000
+    assert plan.job_config.maximum_bytes_billed == 10_000
+    assert guard.client.dry_runs == [f"SELECT * FROM {TABLE}"]
+
+
+def test_dry_run_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("BQ_DRY_RUN_ENABLED", "false")
+    guard = QueryGuard(FakeBigQueryClient(), max_bytes=10)
+
+    plan = guard.check(f"SELECT * FROM {TABLE}")
+
+    assert plan.estimated_bytes is None and plan.job_config is None
+    assert guard.client.dry_runs == []
+
+
+def test_result_cache_runs_queries_with_the_guard_job_config():
+    client = FakeBigQueryClient()
+    cache = BigQueryResultCache(client, guard=QueryGuard(client, max_bytes=10_000))
+
+    result = cache.query(f"SELECT * FROM {TABLE}")
+
+    assert result.estimated_bytes == 1000
+    assert client.job_configs[0].maximum_bytes_billed == 10_000
+
+
+def test_result_cache_does_not_run_rejected_queries():
+    client = FakeBigQueryClient(bytes_processed=50_000)
+    cache = BigQueryResultCache(client, guard=QueryGuard(client, max_bytes=10_000))
+
+    with pytest.raises(QueryBudgetExceeded):
+        cache.query(f"SELECT * FROM {TABLE}")
+    assert client.queries == []
@@ -0,0 +1,82 @@
+import re
+
+import pyarrow as pa
+import pytest
+
+from common.bq_cache import BigQueryResultCache
+from common.bq_results import CSV, InvalidContinuationToken, ResultPager, decode_token, encode_token, render_rows
+from tests.fakes import FakeBigQueryClient
+
+SQL = "SELECT estado, total FROM `projeto.fraude.resumo` ORDER BY estado"
+ROWS = pa.table({"estado": [f"E{i:02d}" for i in range(7)], "total": list(range(7))})
+
+
+def new_pager(client, **kwargs) -> ResultPager:
+    cache = BigQueryResultCache(client, metadata_ttl_seconds=0)
+    return ResultPager(cache, result_format=CSV, **kwargs)
+
+
+def page_rows(page: str) -> list[str]:
+    return [line for line in page.splitlines() if line.startswith("E")]
+
+
+def page_token(page: str) -> str | None:
+    match = re.search(r"continuation_token: (\S+)", page)
+    return match.group(1) if match else None
+
+
+def test_token_round_trip():
+    state = {"sql": SQL, "offset": 3, "job_id": "job-1", "location": "US"}
+
+    assert decode_token(encode_token(state)) == state
+    with pytest.raises(InvalidContinuationToken):
+        decode_token("nao-e-um-token")
+    with pytest.raises(InvalidContinuationToken):
+        decode_token(encode_token({"offset": 3}))
+
+
+def test_pages_cover_the_result_once_and_reuse_the_job():
+    client = FakeBigQueryClient(result=ROWS)
+    pager = new_pager(client, page_rows=3)
+
+    first = pager.first_page(SQL)
+    token = page_token(first)
+    assert page_rows(first) == ["E00,0", "E01,1", "E02,2"]
+    assert "Linhas 1-3 de 7." in first
+    assert decode_token(token) == {"sql": SQL, "offset": 3, "job_id": "job-1", "location": "US"}
+
+    second = pager.next_page(token)
+    assert page_rows(second) == ["E03,3", "E04,4", "E05,5"]
+    assert "Linhas 4-6 de 7." in second
+
+    last = pager.next_page(page_token(second))
+    assert page_rows(last) == ["E06,6"]
+    assert "Linhas 7-7 de 7." in last
+    assert page_token(last) is None
+    assert len(client.queries) == 1
+
+
+def test_page_is_cut_at_max_chars_and_continues_from_the_next_row():
+    client = FakeBigQueryClient(result=ROWS)
+    header = len("estado,total\n")
+    pager = new_pager(client, page_rows=5, max_chars=header + 2 * len("E00,0\n"))
+
+    first = pager.first_page(SQL)
+    assert page_rows(first) == ["E00,0", "E01,1"]
+    assert decode_token(page_token(first))["offset"] == 2
+
+    second = pager.next_page(page_token(first))
+    assert page_rows(second) == ["E02,2", "E03,3"]
+
+
+def test_render_rows_always_includes_one_row():
+    text, rendered_rows = render_rows(ROWS, CSV, max_chars=1)
+
+    assert rendered_rows == 1
+    assert text == "estado,total\nE00,0\n"
+
+
+def test_empty_result():
+    client = FakeBigQueryClient(result=ROWS.slice(0, 0))
+
+    assert new_pager(client).first_page(SQL).startswith("A query não retornou linhas.")
@@ -0,0 +1,59 @@
+import pytest
+
+from clauses import ClauseIndex, parse_clause_number, segment_clauses
+
+CONTRACT = """CONTRATO DE PRESTAÇÃO DE SERVIÇOS
+As partes abaixo qualificadas celebram o presente contrato.
+CLÁUSULA PRIMEIRA - DO OBJETO
+O objeto deste contrato é a prestação de serviços de consultoria.
+CLÁUSULA 2ª: DO PAGAMENTO
+O pagamento será feito até o dia 10 de cada mês, observado o disposto na
+cláusula quinta deste instrumento.
+Cláusula terceira. Da vigência
+O contrato vigora por 12 meses.
+CLÁUSULA QUINTA DA RESCISÃO
+Qualquer das partes pode rescindir o contrato com aviso prévio de 30 dias.
+"""
+
+
+def test_segments_headings_but_not_references_in_the_text():
+    clauses = segment_clauses(CONTRACT)
+
+    assert [(clause.number, clause.title) for clause in clauses] == [
+        (0, "Preâmbulo"),
+        (1, "DO OBJETO"),
+        (2, "DO PAGAMENTO"),
+        (3, "Da vigência"),
+        (5, "DA RESCISÃO")
+    ]
+    assert "cláusula quinta deste instrumento." in clauses[2].text
+
+
+@pytest.mark.parametrize("number, value", [("5", 5), ("décima primeira", 11), ("Vigésima", 20), ("única", 1)])
+def test_parse_clause_number(number, value):
+    assert parse_clause_number(number) == value
+
+
+def test_direct_answer_by_number_and_title():
+    index = ClauseIndex(segment_clauses(CONTRACT))
+
+    assert index.direct_answer("o que diz a cláusula quinta?").title == "DA RESCISÃO"
+    assert index.direct_answer("cláusula 2").title == "DO PAGAMENTO"
+    assert index.direct_answer("vigência").number == 3
+
+
+def test_ambiguous_number_has_no_direct_answer():
+    text = CONTRACT + "ANEXO I\nCLÁUSULA PRIMEIRA - DAS DEFINIÇÕES\nTermos usados no contrato.\n"
+    index = ClauseIndex(segment_clauses(text))
+
+    assert index.by_number(1) is None
+    assert index.direct_answer("cláusula primeira") is None
+    assert index.by_number(5).title == "DA RESCISÃO"
+
+
+def test_search_ranks_the_matching_clause_first():
+    index = ClauseIndex(segment_clauses(CONTRACT))
+
+    score, clause = index.search("aviso prévio para rescindir")[0]
+
+    assert score > 0 and clause.number == 5
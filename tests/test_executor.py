@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from common.executor import ToolExecutor, ToolPolicy, ToolTimeout, parse_policy_overrides
+
+
+def test_timed_out_worker_keeps_the_concurrency_slot_until_it_finishes():
+    events = []
+    lock = threading.Lock()
+
+    def write(value: str) -> str:
+        with lock:
+            events.append(f"inicio {value}")
+        time.sleep(0.2)
+        with lock:
+            events.append(f"fim {value}")
+        return value
+
+    executor = ToolExecutor({
+        "lenta": ToolPolicy(max_concurrency=1, group="escrita", timeout_seconds=0.05),
+        "rapida": ToolPolicy(max_concurrency=1, group="escrita", timeout_seconds=0)
+    })
+
+    async def main():
+        with pytest.raises(ToolTimeout):
+            await executor.run("lenta", write, {"value": "a"})
+        return await executor.run("rapida", write, {"value": "b"})
+
+    try:
+        assert asyncio.run(main()) == "b"
+    finally:
+        executor.shutdown()
+    assert events == ["inicio a", "fim a", "inicio b", "fim b"]
+
+
+def test_missing_arguments_are_reported():
+    executor = ToolExecutor()
+
+    result = asyncio.run(executor.run("tool", lambda table_name: table_name, {}))
+
+    assert "table_name" in result["error"]
+
+
+def test_async_tools_run_on_the_event_loop():
+    async def tool(value: int) -> int:
+        return value * 2
+
+    assert asyncio.run(ToolExecutor().run("tool", tool, {"value": 2, "extra": 1})) == 4
+
+
+def test_policy_overrides_keep_the_fields_they_do_not_set(monkeypatch):
+    monkeypatch.setenv("MCP_TOOL_POLICIES", "commit_table=::60, build_star_schema=thread:2,nova=process")
+
+    executor = ToolExecutor({
+        "commit_table": ToolPolicy(max_concurrency=1, group="table_write", timeout_seconds=0),
+        "build_star_schema": ToolPolicy(backend="process", max_concurrency=1, timeout_seconds=0)
+    })
+
+    assert executor.policy("commit_table") == ToolPolicy(max_concurrency=1, group="table_write", timeout_seconds=60)
+    assert executor.policy("build_star_schema") == ToolPolicy(backend="thread", max_concurrency=2, timeout_seconds=0)
+    assert executor.policy("nova") == ToolPolicy(backend="process")
+
+
+def test_parse_policy_overrides_ignores_empty_fields():
+    assert parse_policy_overrides("a=thread, b=:3, c=") == {"a": {"backend": "thread"}, "b": {"max_concurrency": 3}, "c": {}}
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+import gcs_sync
+
+from gcs_sync import sync_bucket
+from tests.fakes import FakeBucket
+
+
+@pytest.fixture
+def bucket() -> FakeBucket:
+    bucket = FakeBucket()
+    bucket.upload("vendas.csv", b"id,valor\n1,10\n2,20\n")
+    bucket.upload("pasta/clientes.csv", b"id,nome\n1,Ana\n")
+    return bucket
+
+
+def read(path) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_first_sync_downloads_every_object(bucket, tmp_path):
+    result = sync_bucket(bucket, str(tmp_path), max_workers=2)
+
+    assert sorted(result.downloaded) == ["pasta/clientes.csv", "vendas.csv"]
+    assert result.skipped == [] and result.failed == {}
+    assert read(tmp_path / "vendas.csv") == bucket.blobs["vendas.csv"].data
+    assert read(tmp_path / "pasta" / "clientes.csv") == bucket.blobs["pasta/clientes.csv"].data
+
+
+def test_unchanged_objects_are_skipped(bucket, tmp_path):
+    sync_bucket(bucket, str(tmp_path), max_workers=2)
+    result = sync_bucket(bucket, str(tmp_path), max_workers=2)
+
+    assert result.downloaded == []
+    assert sorted(result.skipped) == ["pasta/clientes.csv", "vendas.csv"]
+    assert all(blob.full_downloads == 1 for blob in bucket.blobs.values())
+
+
+def test_changed_or_missing_objects_are_downloaded_again(bucket, tmp_path):
+    sync_bucket(bucket, str(tmp_path), max_workers=2)
+    bucket.upload("vendas.csv", b"id,valor\n1,15\n")
+    os.remove(tmp_path / "pasta" / "clientes.csv")
+
+    result = sync_bucket(bucket, str(tmp_path), max_workers=2)
+
+    assert sorted(result.downloaded) == ["pasta/clientes.csv", "vendas.csv"]
+    assert read(tmp_path / "vendas.csv") == b"id,valor\n1,15\n"
+
+
+def test_large_objects_are_downloaded_in_slices(tmp_path, monkeypatch):
+    monkeypatch.setattr(gcs_sync, "SLICED_THRESHOLD_BYTES", 16)
+    monkeypatch.setattr(gcs_sync, "SLICE_BYTES", 10)
+    bucket = FakeBucket()
+    blob = bucket.upload("grande.csv", bytes(range(35)))
+
+    result = sync_bucket(bucket, str(tmp_path), max_workers=3)
+
+    assert result.downloaded == ["grande.csv"]
+    assert blob.full_downloads == 0
+    assert sorted(blob.ranges) == [(0, 9), (10, 19), (20, 29), (30, 34)]
+    assert read(tmp_path / "grande.csv") == blob.data
+    assert not os.path.exists(tmp_path / f"grande.csv{gcs_sync.PART_SUFFIX}.json")
+
+
+def test_interrupted_sliced_download_resumes_missing_slices(tmp_path, monkeypatch):
+    monkeypatch.setattr(gcs_sync, "SLICED_THRESHOLD_BYTES", 16)
+    monkeypatch.setattr(gcs_sync, "SLICE_BYTES", 10)
+    bucket = FakeBucket()
+    blob = bucket.upload("grande.csv", bytes(range(35)))
+    blob.fail_ranges = {20}
+
+    first = sync_bucket(bucket, str(tmp_path), max_workers=1)
+    assert list(first.failed) == ["grande.csv"]
+    assert not os.path.exists(tmp_path / "grande.csv")
+
+    blob.ranges.clear()
+    second = sync_bucket(bucket, str(tmp_path), max_workers=1)
+
+    assert second.downloaded == ["grande.csv"]
+    assert blob.ranges == [(20, 29)]
+    assert read(tmp_path / "grande.csv") == blob.data
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+import textwrap
+
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def run_fresh(code: str) -> None:
+    """Executa o código num interpretador novo, em que nenhum módulo pesado foi importado ainda."""
+    subprocess.run([sys.executable, "-c", textwrap.dedent(code)], cwd=ROOT, check=True)
+
+
+def test_submodule_does_not_load_the_lazy_parent():
+    run_fresh("""
+        import sys
+        import types
+
+        from common.lazy import lazy_import
+
+        pa = lazy_import("pyarrow")
+        pa_csv = lazy_import("pyarrow.csv")
+        assert type(sys.modules["pyarrow"]) is not types.ModuleType
+        assert type(sys.modules["pyarrow.csv"]) is not types.ModuleType
+
+        assert pa_csv.ReadOptions(block_size=1024).block_size == 1024
+        assert pa.csv is pa_csv
+        import pyarrow.csv
+        assert pyarrow.csv is pa_csv
+    """)
+
+
+def test_etl_modules_import_without_loading_pyarrow():
+    run_fresh("""
+        import sys
+        import types
+
+        sys.path.insert(0, "data_agent/mcp_server")
+        import star_schema, table_profile, working_copy
+
+        assert all(
+            type(sys.modules[name]) is not types.ModuleType
+            for name in ["numpy", "pandas", "pyarrow", "pyarrow.compute", "pyarrow.csv", "pyarrow.parquet"]
+        )
+    """)
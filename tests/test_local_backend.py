@@ -0,0 +1,96 @@
+import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from common.bq_cache import BigQueryResultCache
+from common.bq_results import CSV, ResultPager
+from common.local_backend import AUTO, BIGQUERY, LOCAL, DuckDBBackend, LocalQueryError
+from common.sql_dialect import bigquery_to_duckdb
+from tests.fakes import FakeBigQueryClient
+
+TABLE_ID = "projeto.fraud_detection.fact-transaction"
+TRANSACTIONS = pa.table({
+    "date": [datetime.date(2024, 1, 5), datetime.date(2024, 1, 20), datetime.date(2024, 2, 3), datetime.date(2024, 2, 9)],
+    "state": ["SP", "RJ", "SP", "SP"],
+    "amount": [10.0, 20.0, 30.0, 0.0],
+    "errors": ["", "it's bad", "", ""]
+})
+MONTHLY_SQL = f"""
+SELECT FORMAT_DATE('%Y-%m', DATE_TRUNC(date, MONTH)) AS month,
+       SUM(amount) AS total,
+       SAFE_DIVIDE(SUM(amount), COUNT(*)) AS average,
+       SAFE_CAST(COUNT(*) AS FLOAT64) AS transactions
+FROM `{TABLE_ID}`
+WHERE state = 'SP'
+GROUP BY month
+ORDER BY month
+"""
+
+
+@pytest.fixture
+def backend(tmp_path) -> DuckDBBackend:
+    (tmp_path / "fraud_detection").mkdir()
+    pq.write_table(TRANSACTIONS, tmp_path / "fraud_detection" / "fact_transaction.parquet")
+    return DuckDBBackend(str(tmp_path), mode=LOCAL)
+
+
+def test_dialect_rewrite():
+    sql = (
+        f"SELECT DATE_DIFF(DATE_ADD(date, INTERVAL 1 DAY), date, DAY), SAFE_DIVIDE(a, b), "
+        f"'DATE_TRUNC(x, MONTH)' AS text FROM `{TABLE_ID}` WHERE errors = \"it's\""
+    )
+
+    assert bigquery_to_duckdb(sql, {TABLE_ID: "view"}) == (
+        "SELECT date_diff('day', date, (date + INTERVAL 1 DAY)), ((a) / NULLIF(b, 0)), "
+        "'DATE_TRUNC(x, MONTH)' AS text FROM \"view\" WHERE errors = 'it''s'"
+    )
+
+
+def test_snapshot_lookup_accepts_underscored_names(backend, tmp_path):
+    assert backend.snapshot_path(TABLE_ID) == str(tmp_path / "fraud_detection" / "fact_transaction.parquet")
+    assert backend.snapshot_path("projeto.fraud_detection.dim_user") is None
+    assert backend.can_run(f"SELECT * FROM `{TABLE_ID}`")
+    assert not backend.can_run("SELECT * FROM `projeto.fraud_detection.dim_user`")
+    assert not DuckDBBackend(backend.snapshot_directory, mode=BIGQUERY).can_run(f"SELECT * FROM `{TABLE_ID}`")
+
+
+def test_bigquery_query_runs_on_duckdb(backend):
+    result = backend.query(MONTHLY_SQL)
+
+    assert result.total_rows == 2
+    assert result.table.to_pylist() == [
+        {"month": "2024-01", "total": 10.0, "average": 10.0, "transactions": 1.0},
+        {"month": "2024-02", "total": 30.0, "average": 15.0, "transactions": 2.0}
+    ]
+
+
+def test_query_pages(backend):
+    sql = f"SELECT amount FROM `{TABLE_ID}` ORDER BY amount"
+
+    result = backend.query(sql, start_index=1, max_results=2)
+
+    assert result.total_rows == 4
+    assert result.table.column("amount").to_pylist() == [10.0, 20.0]
+
+
+def test_local_errors(backend):
+    with pytest.raises(LocalQueryError):
+        backend.query("SELECT * FROM `projeto.fraud_detection.dim_user`")
+    with pytest.raises(LocalQueryError):
+        backend.query(f"SELECT missing_column FROM `{TABLE_ID}`")
+
+
+def test_pager_falls_back_to_bigquery_in_auto_mode(backend):
+    client = FakeBigQueryClient()
+    cache = BigQueryResultCache(client, metadata_ttl_seconds=0)
+    auto = DuckDBBackend(backend.snapshot_directory, mode=AUTO)
+    pager = ResultPager(cache, result_format=CSV, local_backend=auto)
+
+    local_page = pager.first_page(f"SELECT state, amount FROM `{TABLE_ID}` ORDER BY amount DESC LIMIT 1")
+    remote_page = pager.first_page("SELECT estado, total FROM `projeto.fraud_detection.dim_user`")
+
+    assert "SP,30.0" in local_page
+    assert "SP,10" in remote_page
+    assert client.queries == ["SELECT estado, total FROM `projeto.fraud_detection.dim_user`"]
@@ -0,0 +1,126 @@
+import atexit
+import json
+import logging
+import queue
+
+import pytest
+
+import common.log_pipeline as log_pipeline
+
+from common.log_pipeline import LevelRateLimiter, NonBlockingQueueHandler, configure_logging, parse_rate_limits, stop_logging
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def new_record(level: int = logging.INFO, message: str = "mensagem") -> logging.LogRecord:
+    return logging.LogRecord("teste", level, __file__, 1, message, None, None)
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits(" debug=100, INFO=2.5,") == {logging.DEBUG: 100.0, logging.INFO: 2.5}
+    assert parse_rate_limits("") == {}
+
+
+def test_rate_limiter_drops_excess_and_reports_it_in_the_next_message(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(log_pipeline.time, "monotonic", clock)
+    limiter = LevelRateLimiter({logging.INFO: 2})
+
+    passed = [limiter.filter(new_record()) for _ in range(5)]
+    warning = new_record(logging.WARNING)
+
+    assert passed == [True, True, False, False, False]
+    assert limiter.filter(warning) and not hasattr(warning, "dropped")
+
+    clock.now += 0.5
+    record = new_record()
+    assert limiter.filter(record)
+    assert record.dropped == {"INFO": 3}
+    assert not limiter.filter(new_record())
+
+
+def test_queue_handler_truncates_and_never_blocks():
+    log_queue = queue.Queue(maxsize=1)
+    handler = NonBlockingQueueHandler(log_queue, max_message_chars=10)
+
+    for message in ["a" * 25, "segunda", "terceira"]:
+        handler.handle(new_record(message=message))
+
+    assert log_queue.get_nowait().msg == "aaaaaaaaaa... (+15 caracteres)"
+    handler.handle(new_record(message="quarta"))
+    record = log_queue.get_nowait()
+    assert (record.msg, record.dropped) == ("quarta", {"fila cheia": 2})
+
+
+def test_dropped_message_passes_its_counts_to_the_next_one():
+    log_queue = queue.Queue(maxsize=1)
+    handler = NonBlockingQueueHandler(log_queue, max_message_chars=100)
+    handler.handle(new_record(message="primeira"))
+
+    late = new_record(message="segunda")
+    late.dropped = {"INFO": 4}
+    handler.handle(late)
+    log_queue.get_nowait()
+    handler.handle(new_record(message="terceira"))
+
+    assert log_queue.get_nowait().dropped == {"INFO": 4, "fila cheia": 1}
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    """Configura o log do zero, sem os handlers do pytest no logger raiz, e o encerra ao final do teste."""
+    def configure(log_file_path: str) -> None:
+        monkeypatch.setattr(logging.root, "handlers", [])
+        monkeypatch.setattr(logging.root, "level", logging.root.level)
+        configure_logging(log_file_path)
+
+    yield configure
+    stop_logging()
+    atexit.unregister(stop_logging)
+    for handler in logging.root.handlers:
+        handler.close()
+
+
+def test_configure_logging_writes_rotated_json_lines(configure, tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_LOG_MAX_BYTES", "2000")
+    monkeypatch.setenv("MCP_LOG_BACKUP_COUNT", "2")
+    monkeypatch.setenv("MCP_LOG_MAX_MESSAGE_CHARS", "100")
+    monkeypatch.setenv("MCP_LOG_RATE_LIMITS", "")
+    log_path = tmp_path / "server.log"
+
+    configure(str(log_path))
+    for index in range(60):
+        logging.info(f"mensagem {index} " + "x" * 200)
+    stop_logging()
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert files == ["server.log", "server.log.1", "server.log.2"]
+    entries = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+    assert all(path.stat().st_size <= 2000 for path in tmp_path.iterdir())
+    assert entries[-1]["message"] == "mensagem 59 " + "x" * 88 + "... (+112 caracteres)"
+    assert entries[-1]["level"] == "INFO" and entries[-1]["file"] == "test_log_pipeline.py"
+
+
+def test_configure_logging_applies_rate_limits(configure, tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(log_pipeline.time, "monotonic", clock)
+    monkeypatch.setenv("MCP_LOG_RATE_LIMITS", "DEBUG=1,INFO=2")
+    log_path = tmp_path / "server.log"
+
+    configure(str(log_path))
+    for index in range(5):
+        logging.info(f"info {index}")
+    logging.warning("aviso")
+    clock.now += 1
+    logging.info("depois")
+    stop_logging()
+
+    entries = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["message"] for entry in entries] == ["info 0", "info 1", "aviso", "depois"]
+    assert entries[-1]["dropped"] == {"INFO": 3}
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from ocr import DocumentOcr, OcrCache
+from tests.fakes import FakeBucket, FakeProcessor
+
+
+@pytest.fixture
+def bucket() -> FakeBucket:
+    bucket = FakeBucket("contratos")
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        bucket.upload(name, f"conteúdo de {name}".encode())
+    return bucket
+
+
+@pytest.fixture
+def cache(tmp_path) -> OcrCache:
+    return OcrCache(str(tmp_path))
+
+
+def test_miss_processes_the_document_and_stores_the_layout(bucket, cache):
+    processor = FakeProcessor()
+
+    result = DocumentOcr(bucket, processor, cache).process("a.pdf")
+
+    assert not result.from_cache
+    assert result.text == "gs://contratos/a.pdf"
+    assert result.pages == [{
+        "page_number": 1,
+        "width": 612.0,
+        "height": 792.0,
+        "paragraphs": [{"start": 0, "end": len(result.text), "box": [0.1, 0.2, 0.9, 0.3]}]
+    }]
+    assert processor.calls == ["gs://contratos/a.pdf"]
+    assert cache.stats() == {"hits": 0, "misses": 1}
+
+
+def test_hit_is_served_from_disk_by_a_new_instance(bucket, cache, tmp_path):
+    DocumentOcr(bucket, FakeProcessor(), cache).process("a.pdf")
+    processor = FakeProcessor()
+
+    result = DocumentOcr(bucket, processor, OcrCache(str(tmp_path))).process("a.pdf")
+
+    assert result.from_cache
+    assert result.text == "gs://contratos/a.pdf"
+    assert processor.calls == []
+
+
+def test_changed_file_or_processor_is_processed_again(bucket, cache):
+    DocumentOcr(bucket, FakeProcessor(), cache).process("a.pdf")
+
+    other_processor = FakeProcessor("projects/projeto/locations/us/processors/outro")
+    DocumentOcr(bucket, other_processor, cache).process("a.pdf")
+    bucket.upload("a.pdf", b"nova versao")
+    processor = FakeProcessor()
+    DocumentOcr(bucket, processor, cache).process("a.pdf")
+
+    assert other_processor.calls == processor.calls == ["gs://contratos/a.pdf"]
+
+
+def test_least_recently_used_result_is_evicted(bucket, cache):
+    processor = FakeProcessor()
+    ocr = DocumentOcr(bucket, processor, cache)
+    ocr.process("a.pdf")
+    ocr.process("b.pdf")
+    paths = {name: cache._path(ocr.cache_key(bucket.get_blob(name))) for name in ("a.pdf", "b.pdf", "c.pdf")}
+    os.utime(paths["a.pdf"], (1000, 1000))
+    os.utime(paths["b.pdf"], (2000, 2000))
+    cache.max_bytes = os.path.getsize(paths["a.pdf"]) + os.path.getsize(paths["b.pdf"]) + 10
+
+    assert ocr.process("a.pdf").from_cache
+    ocr.process("c.pdf")
+
+    assert os.path.exists(paths["a.pdf"]) and os.path.exists(paths["c.pdf"])
+    assert not os.path.exists(paths["b.pdf"])
+    assert not ocr.process("b.pdf").from_cache
+    assert processor.calls == ["gs://contratos/a.pdf", "gs://contratos/b.pdf", "gs://contratos/c.pdf", "gs://contratos/b.pdf"]
+
+
+def test_missing_file_raises(bucket, cache):
+    with pytest.raises(FileNotFoundError):
+        DocumentOcr(bucket, FakeProcessor(), cache).process("inexistente.pdf")
+
+
+def test_default_processor_name_does_not_create_the_client(bucket, cache):
+    ocr = DocumentOcr(bucket, cache=cache)
+
+    ocr.cache_key(bucket.get_blob("a.pdf"))
+
+    assert ocr.processor._client is None
@@ -0,0 +1,118 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from common.local_backend import LOCAL, DuckDBBackend
+from rollups import DATASET, ROLLUPS, RollupRouter
+
+FACT = f"`{DATASET}.fact-transaction` t"
+DATE_JOIN = f"LEFT JOIN `{DATASET}.dim-date` d ON t.date_id = d.date_id"
+CARD_JOIN = f"LEFT JOIN `{DATASET}.dim-card` c ON t.card_id = c.card_id"
+MERCHANT_JOIN = f"LEFT JOIN `{DATASET}.dim-merchant` m ON t.merchant_id = m.merchant_id"
+
+
+@pytest.fixture
+def router() -> RollupRouter:
+    return RollupRouter(ROLLUPS)
+
+
+def test_routes_monthly_totals_to_the_smallest_rollup(router):
+    sql = f"SELECT d.year, d.month, SUM(t.amount) AS total FROM {FACT} {DATE_JOIN} GROUP BY d.year, d.month ORDER BY total DESC"
+
+    routed = router.route(sql)
+
+    assert routed == (
+        f"SELECT year, month, SUM(sum_amount) AS total FROM `{DATASET}.rollup_month_card` "
+        "GROUP BY year, month ORDER BY total DESC"
+    )
+
+
+def test_routes_average_and_count_with_filters(router):
+    sql = (
+        f"SELECT c.card_brand, AVG(amount) AS media, COUNT(*) AS quantidade FROM {FACT} {CARD_JOIN} "
+        "WHERE t.transaction_type = 'Online' GROUP BY c.card_brand HAVING COUNT(*) > 10"
+    )
+
+    routed = router.route(sql)
+
+    assert f"FROM `{DATASET}.rollup_month_card`" in routed
+    assert "SAFE_DIVIDE(SUM(sum_amount), SUM(transaction_count)) AS media" in routed
+    assert routed.endswith("HAVING SUM(transaction_count) > 10")
+
+
+def test_routes_to_a_rollup_with_every_column(router):
+    sql = f"SELECT d.day, SUM(amount) AS total FROM {FACT} {DATE_JOIN} GROUP BY d.day"
+
+    assert f"FROM `{DATASET}.rollup_date_state`" in router.route(sql)
+
+
+def test_routes_to_a_rollup_with_every_joined_dimension(router):
+    sql = f"SELECT d.year, SUM(t.amount) AS total FROM {FACT} {DATE_JOIN} {MERCHANT_JOIN} GROUP BY d.year"
+
+    assert f"FROM `{DATASET}.rollup_date_state`" in router.route(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    f"SELECT d.year, COUNT(d.date_id) AS dias FROM {FACT} {DATE_JOIN} GROUP BY d.year",
+    f"SELECT d.year, COUNTIF(t.amount > 100) AS altas FROM {FACT} {DATE_JOIN} GROUP BY d.year",
+    f"SELECT d.year, SUM(t.amount * 2) AS total FROM {FACT} {DATE_JOIN} GROUP BY d.year",
+    f"SELECT d.year, d.month FROM {FACT} {DATE_JOIN}",
+    f"SELECT t.use_chip, SUM(t.amount) AS total FROM {FACT} GROUP BY t.use_chip",
+    f"SELECT t.use_chip AS use_chip, COUNT(*) AS total FROM {FACT} GROUP BY use_chip",
+    f"SELECT t.transaction_type, SUM(t.amount) AS total FROM {FACT} WHERE t.amount > 100 GROUP BY t.transaction_type",
+    f"SELECT d.year, SUM(t.amount) AS total FROM {FACT} {DATE_JOIN} GROUP BY d.year ORDER BY media",
+    f"SELECT c.card_brand, SUM(t.amount) AS total FROM {FACT} {CARD_JOIN.replace('LEFT JOIN', 'JOIN')} GROUP BY c.card_brand",
+    f"SELECT c.card_brand, SUM(t.amount) AS total FROM {FACT} {CARD_JOIN.replace('LEFT', 'INNER')} GROUP BY c.card_brand",
+    f"SELECT c.card_brand, SUM(t.amount) AS total FROM {FACT} {CARD_JOIN} {MERCHANT_JOIN} GROUP BY c.card_brand"
+])
+def test_keeps_queries_the_rollups_cannot_answer(router, sql):
+    assert router.route(sql) == sql
+
+
+def test_stale_rollups_are_ignored():
+    modified = {rollup.table_id: 0 for rollup in ROLLUPS}
+    router = RollupRouter(ROLLUPS, table_modified=lambda table_id: modified.get(table_id, 1))
+    sql = f"SELECT d.year, SUM(t.amount) AS total FROM {FACT} {DATE_JOIN} GROUP BY d.year"
+
+    assert router.route(sql) == sql
+
+
+def test_orphan_keys_give_the_same_totals_on_the_rollup(tmp_path):
+    dataset_directory = tmp_path / DATASET.split(".")[1]
+    dataset_directory.mkdir()
+    tables = {
+        "fact-transaction": pa.table({
+            "transaction_id": [1, 2, 3, 4],
+            "card_id": [10, 10, 20, 99],
+            "date_id": [20240101, 20240102, 20240201, 20240201],
+            "amount": [5.0, 7.0, 11.0, 13.0],
+            "transaction_type": ["Online", "Online", "Chip", "Online"]
+        }),
+        "dim-date": pa.table({
+            "date_id": [20240101, 20240102, 20240201],
+            "year": [2024, 2024, 2024],
+            "month": [1, 1, 2],
+            "month_name": ["January", "January", "February"],
+            "quarter": [1, 1, 1],
+            "month_year": ["01-2024", "01-2024", "02-2024"]
+        }),
+        "dim-card": pa.table({"card_id": [10, 20], "card_brand": ["Visa", "Amex"], "card_type": ["Credit", "Debit"]})
+    }
+    for name, table in tables.items():
+        pq.write_table(table, dataset_directory / f"{name}.parquet")
+    backend = DuckDBBackend(str(tmp_path), mode=LOCAL)
+    rollup = ROLLUPS[0]
+    pq.write_table(backend.query(rollup.build_sql()).table, dataset_directory / f"{rollup.name}.parquet")
+    router = RollupRouter([rollup])
+
+    def run(sql: str) -> list[tuple]:
+        rows = backend.query(sql).table.to_pylist()
+        return sorted(((row["card_brand"] or ""), row["total"]) for row in rows)
+
+    left = f"SELECT c.card_brand, SUM(t.amount) AS total FROM {FACT} {CARD_JOIN} GROUP BY c.card_brand"
+    inner = f"SELECT c.card_brand, SUM(t.amount) AS total FROM {FACT} {CARD_JOIN.replace('LEFT', 'INNER')} GROUP BY c.card_brand"
+
+    assert router.route(left) != left
+    assert run(router.route(left)) == run(left) == [("", 13.0), ("Amex", 11.0), ("Visa", 12.0)]
+    assert router.route(inner) == inner
+    assert run(inner) == [("Amex", 11.0), ("Visa", 12.0)]
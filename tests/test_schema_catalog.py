@@ -0,0 +1,110 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from common.schema_catalog import Column, SchemaCatalog, Table
+
+SCHEMA_PATH = Path(__file__).parent.parent / "analytics_agent" / "schema.json"
+DATASET = "third-zephyr-464615-d6.fraud_detection"
+
+
+@pytest.fixture
+def catalog() -> SchemaCatalog:
+    return SchemaCatalog.load(str(SCHEMA_PATH))
+
+
+def table_names(table_ids: list[str]) -> list[str]:
+    return [table_id.rsplit(".", 1)[1] for table_id in table_ids]
+
+
+def test_selects_the_tables_of_the_matching_columns(catalog):
+    table_ids, columns = catalog.select("valor total das transações por estado do comerciante")
+
+    assert set(table_names(table_ids)) == {"dim-merchant", "fact-transaction"}
+    assert (f"{DATASET}.dim-merchant", "merchant_state") in columns
+
+
+def test_adds_the_tables_that_connect_the_selection(catalog):
+    table_ids, columns = catalog.select("qual a dívida total por gênero do usuário nas transações?")
+
+    assert (f"{DATASET}.dim-user", "gender") in columns
+    assert set(table_names(table_ids)) == {"dim-user", "dim-card", "fact-transaction"}
+
+
+def test_question_without_terms_uses_every_table(catalog):
+    assert catalog.select("olá") == (list(catalog.tables), set())
+
+
+def test_prompt_describes_only_the_relevant_columns(catalog):
+    prompt = catalog.prompt_for("valor total por estado do comerciante")
+
+    assert f"`{DATASET}.dim-merchant`" in prompt
+    assert "  merchant_state STRING: Estado do comerciante." in prompt
+    assert "  merchant_id INT64\n" in prompt
+    assert f"`{DATASET}.dim-user`" not in prompt
+    assert len(prompt) < len(catalog.render()) / 4
+
+
+def test_render_lists_only_relationships_between_rendered_tables(catalog):
+    table_ids = [f"{DATASET}.fact-transaction", f"{DATASET}.dim-card"]
+
+    relationships = catalog.render(table_ids).split("Relacionamentos:\n")[1].splitlines()
+
+    assert relationships == [f"  {DATASET}.fact-transaction.card_id = {DATASET}.dim-card.card_id"]
+
+
+class FakeMetadataClient:
+    def __init__(self, schemas: dict):
+        self.schemas = schemas
+        self.calls = 0
+
+    def get_table(self, table_id: str):
+        self.calls += 1
+        if table_id not in self.schemas:
+            raise KeyError(table_id)
+        return SimpleNamespace(schema=self.schemas[table_id], description=None)
+
+
+def test_sync_refreshes_columns_once_and_keeps_known_descriptions(monkeypatch):
+    monkeypatch.setenv("SCHEMA_CATALOG_SYNC", "true")
+    catalog = SchemaCatalog(
+        [
+            Table("p.d.conta", "Contas.", [Column("saldo", "INT64", "Saldo da conta."), Column("antiga", "STRING")]),
+            Table("p.d.cliente", "Clientes.", [Column("nome", "STRING", "Nome do cliente.")])
+        ],
+        [["p.d.conta.cliente_id", "p.d.cliente.cliente_id"]]
+    )
+    fingerprint = catalog.fingerprint
+    client = FakeMetadataClient({"p.d.conta": [
+        SimpleNamespace(name="saldo", field_type="NUMERIC", description=None),
+        SimpleNamespace(name="cliente_id", field_type="INT64", description="Cliente dono da conta.")
+    ]})
+
+    catalog.sync_with(client)
+    catalog.ensure_synced()
+    catalog.ensure_synced()
+
+    assert client.calls == 2
+    assert catalog.tables["p.d.conta"].columns == [
+        Column("saldo", "NUMERIC", "Saldo da conta."),
+        Column("cliente_id", "INT64", "Cliente dono da conta.")
+    ]
+    assert catalog.tables["p.d.conta"].description == "Contas."
+    assert catalog.tables["p.d.cliente"].columns == [Column("nome", "STRING", "Nome do cliente.")]
+    assert catalog.fingerprint != fingerprint
+    assert catalog.summary() == (
+        "- `p.d.conta` (Contas): saldo, cliente_id\n"
+        "- `p.d.cliente` (Clientes): nome"
+    )
+
+
+def test_sync_is_skipped_unless_enabled(monkeypatch):
+    monkeypatch.delenv("SCHEMA_CATALOG_SYNC", raising=False)
+    catalog = SchemaCatalog([Table("p.d.conta", "Contas.", [Column("saldo", "INT64")])], [])
+    client = FakeMetadataClient({})
+
+    catalog.sync_with(client)
+    catalog.ensure_synced()
+
+    assert client.calls == 0
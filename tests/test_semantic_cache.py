@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from common.llm_cache import TranslationCache
+from common.semantic_cache import HashingEmbedder, SemanticCache
+
+TEMPLATE = "template de teste"
+
+
+class ConceptEmbedder:
+    """Simula um modelo de embeddings: sinônimos e nomes de coluna caem no mesmo conceito."""
+
+    CONCEPTS = {
+        "total": "soma", "soma": "soma", "gasto": "valor", "gastou": "valor", "amount": "valor",
+        "estado": "estado", "merchant_state": "estado", "chip": "chip", "sem": "sem"
+    }
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        concepts = sorted(set(self.CONCEPTS.values()))
+        vectors = np.zeros((len(texts), len(concepts)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().replace("?", "").split():
+                if word in self.CONCEPTS:
+                    vectors[row, concepts.index(self.CONCEPTS[word])] = 1.0
+        return vectors
+
+
+@pytest.fixture
+def cache(tmp_path) -> TranslationCache:
+    return TranslationCache(str(tmp_path / "llm_cache.sqlite"), namespace="teste")
+
+
+def translate(sql: str):
+    calls = []
+
+    def create() -> str:
+        calls.append(sql)
+        return sql
+    return create, calls
+
+
+def test_disabled_without_embedding_model(cache, monkeypatch):
+    monkeypatch.delenv("SEMANTIC_CACHE_EMBEDDING_MODEL", raising=False)
+    semantic_cache = SemanticCache(cache)
+
+    assert not semantic_cache.enabled
+    semantic_cache.get_or_create("total de transações por estado", TEMPLATE, translate("SELECT 1")[0])
+    create, calls = translate("SELECT 2")
+    assert semantic_cache.get_or_create("transações total por estado", TEMPLATE, create) == "SELECT 2"
+    assert calls == ["SELECT 2"]
+
+
+def test_reuses_sql_for_reordered_question(cache):
+    semantic_cache = SemanticCache(cache, embedder=HashingEmbedder())
+    semantic_cache.get_or_create("total de transações por estado", TEMPLATE, translate("SELECT 1")[0])
+
+    create, calls = translate("SELECT 2")
+    assert semantic_cache.get_or_create("por estado, o total das transações?", TEMPLATE, create) == "SELECT 1"
+    assert calls == []
+
+
+@pytest.mark.parametrize("question", [
+    "soma de amount por merchant_state",
+    "quanto cada estado gastou no total?"
+])
+def test_reuses_sql_for_paraphrase(cache, question):
+    semantic_cache = SemanticCache(cache, embedder=ConceptEmbedder())
+    semantic_cache.get_or_create("total gasto por estado", TEMPLATE, translate("SELECT 1")[0])
+
+    create, calls = translate("SELECT 2")
+    assert semantic_cache.get_or_create(question, TEMPLATE, create) == "SELECT 1"
+    assert calls == []
+    assert semantic_cache.stats()["semantic_hits"] == 1
+
+
+def test_reuses_sql_for_inflected_question(cache):
+    semantic_cache = SemanticCache(cache, embedder=HashingEmbedder(), threshold=0.8)
+    semantic_cache.get_or_create("total gasto por estado", TEMPLATE, translate("SELECT 1")[0])
+
+    assert semantic_cache.get_or_create("total gastou por estado", TEMPLATE, translate("SELECT 2")[0]) == "SELECT 1"
+
+
+def test_never_reuses_sql_for_negated_paraphrase(cache):
+    semantic_cache = SemanticCache(cache, embedder=ConceptEmbedder())
+    semantic_cache.get_or_create("total gasto por estado com chip", TEMPLATE, translate("SELECT 1")[0])
+
+    assert semantic_cache.get_or_create("soma de amount por merchant_state sem chip", TEMPLATE, translate("SELECT 2")[0]) == "SELECT 2"
+
+
+def test_never_reuses_sql_with_other_numbers(cache):
+    semantic_cache = SemanticCache(cache, embedder=ConceptEmbedder())
+    semantic_cache.get_or_create("total gasto por estado em 2019", TEMPLATE, translate("SELECT 1")[0])
+
+    assert semantic_cache.get_or_create("soma de amount por merchant_state em 2020", TEMPLATE, translate("SELECT 2")[0]) == "SELECT 2"
+
+
+@pytest.mark.parametrize("cached_question, question", [
+    ("quantidade de transações online por estado", "quantidade de transações não online por estado"),
+    ("clientes ordenados pelo gasto crescente", "clientes ordenados pelo gasto decrescente"),
+    ("total gasto no cartão de crédito por mês", "total gasto no cartão de débito por mês"),
+    ("transações com chip por estado", "transações sem chip por estado")
+])
+def test_never_reuses_sql_for_opposite_question(cache, cached_question, question):
+    semantic_cache = SemanticCache(cache, embedder=HashingEmbedder())
+    semantic_cache.get_or_create(cached_question, TEMPLATE, translate("SELECT 1")[0])
+
+    create, calls = translate("SELECT 2")
+    assert semantic_cache.get_or_create(question, TEMPLATE, create) == "SELECT 2"
+    assert calls == ["SELECT 2"]
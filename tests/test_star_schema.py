@@ -0,0 +1,60 @@
+import pyarrow.parquet as pq
+import pytest
+
+from star_schema import FINAL_DIR_NAME, build_star_schema
+
+
+@pytest.fixture
+def source_directory(tmp_path) -> str:
+    (tmp_path / "cards_data.csv").write_text(
+        "id,client_id,card_brand,card_type,card_number,expires,cvv,has_chip,num_cards_issued,credit_limit,"
+        "acct_open_date,year_pin_last_changed,card_on_dark_web\n"
+        "10,1,Visa,Debit,4344676511950444,12/2022,623,YES,2,$24295,09/2002,2008,No\n"
+        "20,2,Amex,Credit,379174331235680,03/2024,393,NO,1,$9100,04/2014,2014,No\n"
+    )
+    (tmp_path / "users_data.csv").write_text(
+        "id,current_age,retirement_age,birth_year,birth_month,gender,address,latitude,longitude,"
+        "per_capita_income,yearly_income,total_debt,credit_score,num_credit_cards\n"
+        "1,53,66,1966,11,Female,462 Rose Lane,34.15,-117.76,$29278,$59696,$127613,787,5\n"
+        "2,40,67,1984,1,Male,3606 Federal Boulevard,40.76,-73.74,$37891,$77254,$191349,701,1\n"
+    )
+    (tmp_path / "transactions_data.csv").write_text(
+        "id,date,client_id,card_id,amount,use_chip,merchant_id,merchant_city,merchant_state,zip,mcc,errors\n"
+        "100,2010-01-01 00:01:00,1,10,$-77.00,Swipe Transaction,59935,Beulah,ND,58523,5499,\n"
+        "101,2010-01-01 10:30:00,2,20,$14.57,Chip Transaction,67570,La Verne,CA,91750,5311,\n"
+        "102,2010-01-03 12:00:00,77,99,$80.00,Swipe Transaction,59935,Beulah,ND,58523,5499,\n"
+        "103,2010-01-02 08:00:00,1,10,$5.00,Online Transaction,27092,ONLINE,,,4829,\n"
+    )
+    return str(tmp_path)
+
+
+def read(source_directory: str, name: str) -> dict:
+    return pq.read_table(f"{source_directory}/{FINAL_DIR_NAME}/{name}.parquet").to_pydict()
+
+
+def test_builds_the_tables_and_counts_orphan_keys(source_directory):
+    row_counts, orphans = build_star_schema(source_directory, max_workers=1)
+
+    assert row_counts == {"dim_card": 2, "dim_user": 2, "dim_merchant": 2, "dim_date": 3, "fact_transaction": 3}
+    assert orphans == {"dim_user": 1, "dim_card": 1, "dim_merchant": 0, "dim_date": 0}
+
+
+def test_fact_keys_are_remapped_to_the_dimensions(source_directory):
+    build_star_schema(source_directory, max_workers=1)
+
+    fact = read(source_directory, "fact_transaction")
+    assert list(fact) == ["transaction_id", "card_id", "merchant_id", "date_id", "transaction_type", "amount"]
+    assert fact["transaction_id"] == [100, 101, 102]
+    assert fact["date_id"] == [20100101, 20100101, 20100103]
+    assert fact["amount"] == [-77.0, 14.57, 80.0]
+    assert fact["transaction_type"] == ["Swipe Transaction", "Chip Transaction", "Swipe Transaction"]
+
+    dim_date = read(source_directory, "dim_date")
+    assert dim_date["date_id"] == [20100101, 20100102, 20100103]
+    assert dim_date["day_name"] == ["Friday", "Saturday", "Sunday"]
+
+    dim_card = read(source_directory, "dim_card")
+    assert dim_card["card_id"] == [10, 20] and "cvv" not in dim_card
+    assert dim_card["has_chip"] == [True, False] and dim_card["credit_limit"] == [24295, 9100]
+    assert read(source_directory, "dim_user")["user_id"] == [1, 2]
+    assert read(source_directory, "dim_merchant")["merchant_id"] == [59935, 67570]
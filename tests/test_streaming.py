@@ -0,0 +1,42 @@
+import pytest
+
+import working_copy
+
+from working_copy import iter_batches, read_arrow
+
+
+@pytest.fixture
+def table_path(tmp_path, monkeypatch) -> str:
+    monkeypatch.setattr(working_copy, "STREAMING_THRESHOLD_BYTES", 0)
+    monkeypatch.setattr(working_copy, "CHUNK_ROWS", 2)
+    path = tmp_path / "transacoes.csv"
+    path.write_text("id,amount,mcc\n1,,5411\n2,,\n3,$5.10,5812\n4,$1.00,\n5,,4829\n")
+    return str(path)
+
+
+def test_streaming_transform_keeps_the_type_of_columns_null_in_the_first_chunk(etl, table_path):
+    result = etl.remove_symbols(table_path, "amount")
+
+    assert [batch.num_rows for batch in iter_batches(table_path)] == [2, 2, 1]
+    assert read_arrow(table_path).column("amount").to_pylist() == [None, None, "5.10", "1.00", None]
+    assert "5.10" in result and etl.sessions.get(table_path) is None
+
+
+def test_streaming_batch_transform_converts_every_chunk(etl, table_path):
+    etl.fill_null_batch(table_path, ["mcc"], "0", "Int32")
+    etl.remove_symbols_batch(table_path, ["amount"], "", "float32")
+
+    table = read_arrow(table_path)
+    assert str(table.schema.field("mcc").type) == "int32"
+    assert table.column("mcc").to_pylist() == [5411, 0, 5812, 0, 4829]
+    assert str(table.schema.field("amount").type) == "float"
+    assert table.column("amount").to_pylist()[2:4] == pytest.approx([5.1, 1.0])
+
+
+def test_streaming_drop_and_export(etl, table_path, tmp_path):
+    etl.fill_null(table_path, "amount", "$0")
+    etl.drop_null_columns(table_path)
+
+    assert read_arrow(table_path).column_names == ["id", "amount"]
+    etl.export_table(table_path)
+    assert (tmp_path / "transacoes.csv").read_text().splitlines()[:2] == ['"id","amount"', '1,"$0"']
@@ -0,0 +1,62 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from table_profile import DistinctSketch, ProfileStore, profile_batches
+from working_copy import working_copy_path
+
+
+def test_profile_combines_every_batch():
+    table = pa.table({"id": [1, 2, 3, 4, 5], "city": ["SP", None, "RJ", "SP", None]})
+
+    profile = profile_batches(table.schema, table.to_batches(max_chunksize=2), sample_size=3)
+
+    assert profile.row_count == 5
+    assert profile.columns["id"] == {"dtype": "Int64", "null_count": 0, "distinct_estimate": 5, "min": 1, "max": 5}
+    assert profile.columns["city"] == {"dtype": "object", "null_count": 2, "distinct_estimate": 2, "min": "RJ", "max": "SP"}
+    assert profile.sample == [{"id": 1, "city": "SP"}, {"id": 2, "city": None}, {"id": 3, "city": "RJ"}]
+
+
+def test_distinct_sketch_estimates_large_cardinalities():
+    sketch = DistinctSketch(k=256)
+    for start in range(0, 20_000, 5_000):
+        sketch.update(pd.Series(range(start, start + 5_000)))
+
+    assert abs(sketch.estimate() - 20_000) / 20_000 < 0.2
+
+
+def test_profile_store_survives_a_restart_and_expires_with_the_file(tmp_path):
+    working_path = tmp_path / "tabela.arrow"
+    working_path.write_bytes(b"dados")
+    fingerprint = (os.stat(working_path).st_mtime_ns, os.stat(working_path).st_size)
+    table = pa.table({"id": [1]})
+    ProfileStore().put(str(working_path), profile_batches(table.schema, table.to_batches(), fingerprint))
+
+    assert ProfileStore().get(str(working_path)).row_count == 1
+    working_path.write_bytes(b"dados alterados")
+    assert ProfileStore().get(str(working_path)) is None
+
+
+def test_schema_and_null_tools_answer_from_the_profile(etl, tmp_path):
+    table_path = tmp_path / "usuarios.csv"
+    table_path.write_text("id,idade\n1,30\n2,\n")
+    table_path = str(table_path)
+
+    assert "Total de linhas: 2" in etl.profile_table(table_path)
+    assert etl.profiles.get(working_copy_path(table_path)) is not None
+    assert "idade    1" in etl.check_null_columns(table_path)
+    assert etl.get_table_schema(table_path).split("\n")[:2] == ["id       Int64", "idade    Int64"]
+
+
+def test_profile_after_converting_columns_to_category(etl, tmp_path):
+    table_path = tmp_path / "cartoes.csv"
+    table_path.write_text("id,card_brand\n1,Visa\n2,\n3,Amex\n")
+    table_path = str(table_path)
+
+    etl.fill_null_batch(table_path, ["card_brand"], "Desconhecida", "category")
+    profile = etl.profile_table(table_path)
+
+    assert "Ocorreu um erro" not in profile
+    stats = etl.profiles.get(working_copy_path(table_path)).columns["card_brand"]
+    assert stats == {"dtype": "category", "null_count": 0, "distinct_estimate": 3, "min": "Amex", "max": "Visa"}
@@ -0,0 +1,87 @@
+import os
+
+import pandas as pd
+import pytest
+
+from table_cache import TableCache
+from working_copy import read_frame, working_copy_path
+
+
+@pytest.fixture
+def table_path(tmp_path) -> str:
+    path = tmp_path / "transacoes.csv"
+    path.write_text("id,amount,city\n1,$10.50,SP\n2,,RJ\n3,$7.00,\n")
+    return str(path)
+
+
+def amounts(table_path: str) -> list:
+    return read_frame(table_path, columns=["amount"])["amount"].tolist()
+
+
+def test_rollback_discards_the_session_steps(etl, table_path):
+    etl.start_table_session(table_path)
+    etl.fill_null(table_path, "amount", "$0")
+    etl.remove_symbols(table_path, "amount")
+
+    assert etl.sessions.get(table_path).df["amount"].tolist() == ["10.50", "0", "7.00"]
+    assert amounts(table_path) == ["$10.50", None, "$7.00"]
+    assert "remove_symbols: amount" in etl.rollback_table(table_path)
+    assert etl.sessions.get(table_path) is None
+    assert amounts(table_path) == ["$10.50", None, "$7.00"]
+
+
+def test_commit_writes_every_step_once_and_export_updates_the_csv(etl, table_path):
+    etl.start_table_session(table_path)
+    etl.fill_null(table_path, "amount", "$0")
+    etl.remove_symbols(table_path, "amount")
+    etl.drop_null_columns(table_path)
+
+    message = etl.commit_table(table_path)
+
+    assert "fill_null: amount=$0" in message and "drop_null_columns: ['city']" in message
+    assert etl.sessions.get(table_path) is None
+    assert amounts(table_path) == ["10.50", "0", "7.00"]
+    assert etl.export_table(table_path) == f"Tabela exportada para '{table_path}'."
+    assert pd.read_csv(table_path, dtype=str).to_dict("list") == {"id": ["1", "2", "3"], "amount": ["10.50", "0", "7.00"]}
+
+
+def test_commit_refuses_a_table_changed_on_disk(etl, table_path):
+    etl.start_table_session(table_path)
+    etl.fill_null(table_path, "amount", "$0")
+    working_path = working_copy_path(table_path)
+    stat = os.stat(working_path)
+    os.utime(working_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert "foi alterada em disco" in etl.commit_table(table_path)
+    assert etl.sessions.get(table_path) is not None
+    etl.rollback_table(table_path)
+    assert amounts(table_path) == ["$10.50", None, "$7.00"]
+
+
+def test_table_cache_reloads_changed_files_and_evicts_the_oldest(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.csv"
+        path.write_text("id\n1\n")
+        paths.append(str(path))
+    loads = []
+
+    def loader(path: str) -> pd.DataFrame:
+        loads.append(path)
+        return pd.read_csv(path)
+
+    size = int(loader(paths[0]).memory_usage(deep=True).sum())
+    loads.clear()
+    cache = TableCache(max_bytes=2 * size)
+    cache.get(paths[0], loader)
+    cache.get(paths[1], loader)
+    cache.get(paths[0], loader)
+    cache.get(paths[2], loader)
+
+    assert loads == paths[:2] + paths[2:]
+    assert cache.peek(paths[1]) is None and cache.peek(paths[0]) is not None
+
+    with open(paths[0], "a") as csv_file:
+        csv_file.write("2\n")
+    assert cache.get(paths[0], loader)["id"].tolist() == [1, 2]
+    assert loads[-1] == paths[0]
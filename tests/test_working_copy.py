@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+import pytest
+
+import working_copy
+
+from working_copy import ensure_working_copy, export_csv, read_arrow, read_frame, read_schema, write_columns
+
+
+def write_csv(path, text: str) -> str:
+    path.write_text(text)
+    return str(path)
+
+
+def test_working_copy_is_created_next_to_the_csv(tmp_path):
+    table_path = write_csv(tmp_path / "cartoes.csv", "id,limite\n1,100\n2,\n")
+
+    working_path = ensure_working_copy(table_path)
+
+    assert working_path == str(tmp_path / ".working" / "cartoes.arrow")
+    assert read_schema(table_path).names == ["id", "limite"]
+    assert read_arrow(table_path, columns=["limite"]).column("limite").to_pylist() == [100, None]
+
+
+def test_edits_survive_until_the_csv_itself_changes(tmp_path):
+    table_path = write_csv(tmp_path / "cartoes.csv", "id,limite\n1,100\n2,\n")
+    write_columns(table_path, columns={"limite": pd.Series([100, 0])})
+
+    assert read_frame(table_path)["limite"].tolist() == [100, 0]
+
+    write_csv(tmp_path / "cartoes.csv", "id,limite\n1,100\n2,\n3,300\n")
+    stat = os.stat(table_path)
+    os.utime(table_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert read_arrow(table_path).column("limite").to_pylist() == [100, None, 300]
+
+
+def test_export_writes_the_working_copy_back_without_reconverting(tmp_path, monkeypatch):
+    table_path = write_csv(tmp_path / "cartoes.csv", "id,limite\n1,100\n2,\n")
+    write_columns(table_path, drop=["limite"])
+
+    export_csv(table_path)
+    monkeypatch.setattr(working_copy, "convert_to_working_copy", lambda csv_path: pytest.fail("cópia de trabalho recriada"))
+
+    assert pd.read_csv(table_path).to_dict("list") == {"id": [1, 2]}
+    assert read_schema(table_path).names == ["id"]
+